@@ -66,7 +66,10 @@ def run_migrations_offline() -> None:
 
 def do_run_migrations(connection: Connection) -> None:
     context.configure(
-        connection=connection, target_metadata=target_metadata, process_revision_directives=process_revision_directives
+        connection=connection,
+        target_metadata=target_metadata,
+        process_revision_directives=process_revision_directives,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -85,7 +88,7 @@ async def run_async_migrations() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
         with context.begin_transaction():
             context.run_migrations()
 
@@ -102,6 +105,11 @@ def run_migrations_online() -> None:
 # when there are no changes to the schema
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # the FTS5 search index and its shadow tables are created by raw DDL, not from the models
+    return not (type_ == "table" and reflected and name.startswith("search_index"))
+
+
 def process_revision_directives(context, revision, directives):
     if config.cmd_opts.autogenerate:
         script = directives[0]
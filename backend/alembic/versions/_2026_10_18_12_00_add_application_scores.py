@@ -0,0 +1,72 @@
+"""add application scores
+
+Revision ID: 3b9d2c41a7e5
+Revises: 7e518ef7f36a
+Create Date: 2026-10-18 12:00:41.512093
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b9d2c41a7e5"
+down_revision: str | None = "7e518ef7f36a"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "application_scores",
+        sa.Column("application_id", sa.Integer(), nullable=False),
+        sa.Column("rrf_score", sa.Float(), nullable=False),
+        sa.Column("positive_votes", sa.Integer(), nullable=False),
+        sa.Column("negative_votes", sa.Integer(), nullable=False),
+        sa.Column("neutral_votes", sa.Integer(), nullable=False),
+        sa.Column("unrated_votes", sa.Integer(), nullable=False),
+        sa.Column("rater_count", sa.Integer(), nullable=False),
+        sa.Column("last_updated", sa.DateTime(), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=False),
+        sa.ForeignKeyConstraint(["application_id"], ["applications.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("application_id"),
+    )
+    op.create_index(op.f("ix_application_scores_rrf_score"), "application_scores", ["rrf_score"], unique=False)
+
+    # RRF constant is 60, rank is 0-based
+    op.execute("""
+        INSERT INTO application_scores (
+            application_id, rrf_score, positive_votes, negative_votes, neutral_votes, unrated_votes, rater_count
+        )
+        SELECT
+            applications.id,
+            COALESCE(rankings.rrf_score, 0.0),
+            COALESCE(votes.positive_votes, 0),
+            COALESCE(votes.negative_votes, 0),
+            COALESCE(votes.neutral_votes, 0),
+            COALESCE(votes.unrated_votes, 0),
+            COALESCE(votes.rater_count, 0)
+        FROM applications
+        LEFT JOIN (
+            SELECT application_id, SUM(1.0 / (61 + rank)) AS rrf_score
+            FROM patron_ranking
+            GROUP BY application_id
+        ) AS rankings ON rankings.application_id = applications.id
+        LEFT JOIN (
+            SELECT
+                application_id,
+                SUM(rate = 'POSITIVE') AS positive_votes,
+                SUM(rate = 'NEGATIVE') AS negative_votes,
+                SUM(rate = 'NEUTRAL') AS neutral_votes,
+                SUM(rate = 'UNRATED') AS unrated_votes,
+                COUNT(*) AS rater_count
+            FROM patron_x_application
+            GROUP BY application_id
+        ) AS votes ON votes.application_id = applications.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_application_scores_rrf_score"), table_name="application_scores")
+    op.drop_table("application_scores")
@@ -0,0 +1,24 @@
+"""index application submitted_at
+
+Revision ID: 9f4a1e6b7c38
+Revises: c5e80f13d2a6
+Create Date: 2026-10-18 15:10:41.218093
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9f4a1e6b7c38"
+down_revision: str | None = "c5e80f13d2a6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_applications_submitted_at"), "applications", ["submitted_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_applications_submitted_at"), table_name="applications")
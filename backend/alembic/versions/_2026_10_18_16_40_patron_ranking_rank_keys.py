@@ -0,0 +1,82 @@
+"""patron ranking rank keys
+
+Revision ID: 4d2b7a9c1e05
+Revises: 9f4a1e6b7c38
+Create Date: 2026-10-18 16:40:27.508314
+"""
+
+import itertools
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4d2b7a9c1e05"
+down_revision: str | None = "9f4a1e6b7c38"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# copy of `src.services.patron_ranking.evenly_spaced_keys`, so that the migration does not change with it
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+def evenly_spaced_keys(count: int) -> list[str]:
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    step = len(DIGITS) ** width // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value, digits = i * step, []
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip(DIGITS[0]))
+    return keys
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("patron_ranking") as batch_op:
+        batch_op.add_column(sa.Column("rank_key", sa.String(), nullable=True))
+
+    connection = op.get_bind()
+    rankings = connection.execute(
+        sa.text("SELECT patron_id, application_id FROM patron_ranking ORDER BY patron_id, rank, application_id")
+    ).all()
+    for patron_id, ranking in itertools.groupby(rankings, key=lambda row: row.patron_id):
+        application_ids = [row.application_id for row in ranking]
+        connection.execute(
+            sa.text(
+                "UPDATE patron_ranking SET rank_key = :rank_key "
+                "WHERE patron_id = :patron_id AND application_id = :application_id"
+            ),
+            [
+                {"rank_key": key, "patron_id": patron_id, "application_id": application_id}
+                for application_id, key in zip(application_ids, evenly_spaced_keys(len(application_ids)), strict=True)
+            ],
+        )
+
+    with op.batch_alter_table("patron_ranking", recreate="always") as batch_op:
+        batch_op.alter_column("rank_key", existing_type=sa.String(), nullable=False)
+        batch_op.drop_column("rank")
+        batch_op.create_index("ix_patron_ranking_patron_id_rank_key", ["patron_id", "rank_key"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("patron_ranking") as batch_op:
+        batch_op.add_column(sa.Column("rank", sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE patron_ranking
+        SET rank = (
+            SELECT COUNT(*) FROM patron_ranking AS earlier
+            WHERE earlier.patron_id = patron_ranking.patron_id AND earlier.rank_key < patron_ranking.rank_key
+        )
+    """)
+
+    with op.batch_alter_table("patron_ranking", recreate="always") as batch_op:
+        batch_op.drop_index("ix_patron_ranking_patron_id_rank_key")
+        batch_op.alter_column("rank", existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_column("rank_key")
@@ -0,0 +1,90 @@
+"""add search index
+
+Revision ID: 8c3e5f1a2d47
+Revises: 4d2b7a9c1e05
+Create Date: 2026-10-18 17:30:12.804517
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c3e5f1a2d47"
+down_revision: str | None = "4d2b7a9c1e05"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# copy of `src.db.models.search.SEARCH_INDEX_DDL`, so that the migration does not change with it
+SEARCH_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE search_index USING fts5("
+    "text, content='search_documents', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER search_documents_after_insert AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_index (rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER search_documents_after_delete AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_index (search_index, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER search_documents_after_update AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_index (search_index, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO search_index (rowid, text) VALUES (new.id, new.text); END",
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_documents",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("application_id", sa.Integer(), nullable=False),
+        sa.Column("patron_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "kind",
+            sa.Enum("APPLICANT", "CV", "MOTIVATIONAL_LETTER", "COMMENT", name="searchdocumentkind"),
+            nullable=False,
+        ),
+        sa.Column("text", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["application_id"], ["applications.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["patron_id"], ["patron.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_search_documents_application_id_kind", "search_documents", ["application_id", "kind"], unique=False
+    )
+    for statement in SEARCH_INDEX_DDL:
+        op.execute(statement)
+
+    # text of PDFs is not extracted here, run `scripts/rebuild_search_index.py` after the upgrade for that
+    op.execute("""
+        INSERT INTO search_documents (application_id, patron_id, kind, text)
+        SELECT id, NULL, 'APPLICANT', full_name || ' ' || email
+        FROM applications
+    """)
+    op.execute("""
+        INSERT INTO search_documents (application_id, patron_id, kind, text)
+        SELECT application_id, patron_id, 'COMMENT', text
+        FROM (
+            SELECT
+                application_id,
+                patron_id,
+                (
+                    SELECT group_concat(part, char(10))
+                    FROM (
+                        SELECT patron_x_application.comment AS part
+                        UNION ALL
+                        SELECT value FROM json_each(patron_x_application.docs) WHERE key LIKE '%\\_comments' ESCAPE '\\'
+                    )
+                    WHERE trim(part) != ''
+                ) AS text
+            FROM patron_x_application
+        )
+        WHERE text IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS search_documents_after_update")
+    op.execute("DROP TRIGGER IF EXISTS search_documents_after_delete")
+    op.execute("DROP TRIGGER IF EXISTS search_documents_after_insert")
+    op.execute("DROP TABLE IF EXISTS search_index")
+    op.drop_index("ix_search_documents_application_id_kind", table_name="search_documents")
+    op.drop_table("search_documents")
@@ -0,0 +1,28 @@
+"""index application names
+
+Revision ID: 2f7b9d4e6a13
+Revises: 8c3e5f1a2d47
+Create Date: 2026-10-18 18:20:05.713294
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2f7b9d4e6a13"
+down_revision: str | None = "8c3e5f1a2d47"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_applications_lower_full_name", "applications", [sa.text("lower(full_name)")], unique=False)
+    op.create_index("ix_applications_lower_email", "applications", [sa.text("lower(email)")], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_applications_lower_email", table_name="applications")
+    op.drop_index("ix_applications_lower_full_name", table_name="applications")
@@ -0,0 +1,28 @@
+"""index application documents
+
+Revision ID: 6e1a3c8f5b92
+Revises: 2f7b9d4e6a13
+Create Date: 2026-10-18 19:10:42.318406
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6e1a3c8f5b92"
+down_revision: str | None = "2f7b9d4e6a13"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+DOCUMENT_COLUMNS = ("cv", "motivational_letter", "recommendation_letter", "transcript", "almost_a_student")
+
+
+def upgrade() -> None:
+    for column in DOCUMENT_COLUMNS:
+        op.create_index(op.f(f"ix_applications_{column}"), "applications", [column], unique=False)
+
+
+def downgrade() -> None:
+    for column in reversed(DOCUMENT_COLUMNS):
+        op.drop_index(op.f(f"ix_applications_{column}"), table_name="applications")
@@ -0,0 +1,63 @@
+"""
+Measure rank aggregation methods on a synthetic patron x application rank matrix.
+
+Usage: `uv run scripts/benchmark_aggregation.py`
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.schemas import RankingMethod  # noqa: E402
+from src.services.aggregation import aggregate_rankings, build_rank_matrix, ranked_candidates  # noqa: E402
+
+APPLICATIONS = 5000
+PATRONS = 50
+RANKING_LENGTHS = [20, 50, 100, 200]
+REPEATS = 3
+
+
+def synthetic_rankings(ranking_length: int) -> np.ndarray:
+    """Patrons rank the best applications by a shared quality with personal noise"""
+    rng = np.random.default_rng(ranking_length)
+    quality = rng.normal(size=APPLICATIONS)
+    rows = []
+    for patron_id in range(1, PATRONS + 1):
+        opinion = quality + rng.normal(scale=0.5, size=APPLICATIONS)
+        top = np.argsort(-opinion)[:ranking_length]
+        rows.append(np.column_stack([np.full(ranking_length, patron_id), top + 1, np.arange(ranking_length)]))
+    return np.concatenate(rows)
+
+
+def measure(fn, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    application_ids = np.arange(1, APPLICATIONS + 1)
+    patron_ids = np.arange(1, PATRONS + 1)
+    methods = list(RankingMethod)
+    print(f"{APPLICATIONS} applications x {PATRONS} patrons, best of {REPEATS}, ms")
+    print(f"{'length':>6} {'ranked':>6} {'matrix':>8}" + "".join(f" {method:>8}" for method in methods))
+    for ranking_length in RANKING_LENGTHS:
+        rankings = synthetic_rankings(ranking_length)
+        matrix_time = measure(build_rank_matrix, application_ids, patron_ids, rankings)
+        matrix = build_rank_matrix(application_ids, patron_ids, rankings)
+        times = [measure(aggregate_rankings, matrix, method) for method in methods]
+        print(
+            f"{ranking_length:>6} {len(ranked_candidates(matrix)):>6} {matrix_time * 1000:>8.1f}"
+            + "".join(f" {t * 1000:>8.1f}" for t in times)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Latency of the first and a later page of `GET /patron/applications` against loading the whole list,
+for every sorting, with and without filters.
+
+Usage: `uv run scripts/benchmark_applications.py`
+"""
+
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.db.models import Application, Base, Patron, PatronRanking, PatronRateApplication, TimeWindow  # noqa: E402
+from src.schemas import ApplicationSort, ApplicationsQuery, Rating  # noqa: E402
+from src.services import list_applications  # noqa: E402
+from src.services.patron_ranking import evenly_spaced_keys  # noqa: E402
+
+PATRON_ID = 1
+APPLICATION_COUNTS = [1000, 10000, 50000]
+PAGE_SIZE = 50
+REPEATS = 5
+FIRST_NAMES = ["Ivan", "Anna", "Oleg", "Maria", "Timur", "Alina", "Kirill", "Elena", "Artem", "Diana"]
+QUERIES = {
+    "submitted_at": {},
+    "full_name": {"sort": ApplicationSort.FULL_NAME},
+    "my_rank": {"sort": ApplicationSort.MY_RANK},
+    "prefix": {"prefix": "ann", "sort": ApplicationSort.FULL_NAME},
+    "unrated, no transcript": {"rated": False, "has_transcript": False},
+    "positive, by name": {"rating": [Rating.POSITIVE], "sort": ApplicationSort.FULL_NAME, "descending": True},
+}
+
+
+def seed(session: Session, applications: int) -> TimeWindow:
+    random.seed(applications)
+    now = datetime.datetime.now(datetime.UTC)
+    timewindow = TimeWindow(
+        title="bench", start=now - datetime.timedelta(days=365), end=now + datetime.timedelta(days=1)
+    )
+    session.add(timewindow)
+    session.flush()
+    session.add(Patron(id=PATRON_ID, telegram_id=str(PATRON_ID)))
+    session.add_all(
+        Application(
+            id=i,
+            submitted_at=now - datetime.timedelta(minutes=i),
+            session_id=str(i),
+            email=f"applicant{i}@innopolis.university",
+            full_name=f"{random.choice(FIRST_NAMES)} Applicant{i}",
+            cv=f"blobs/{i}.pdf",
+            motivational_letter=f"blobs/{i}.pdf",
+            transcript=f"blobs/{i}.xlsx" if random.random() < 0.5 else None,
+            timewindow_id=timewindow.id,
+        )
+        for i in range(1, applications + 1)
+    )
+    session.flush()
+    ids = range(1, applications + 1)
+    session.add_all(
+        PatronRateApplication(patron_id=PATRON_ID, application_id=i, rate=random.choice(list(Rating)))
+        for i in random.sample(ids, applications // 2)
+    )
+    session.add_all(
+        PatronRanking(patron_id=PATRON_ID, application_id=i, rank_key=key)
+        for key, i in zip(evenly_spaced_keys(applications // 5), random.sample(ids, applications // 5), strict=True)
+    )
+    session.commit()
+    return timewindow
+
+
+def measure(fn, *args) -> tuple[float, object]:
+    """Best of the repeats, in milliseconds, and the result"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    print(f"{'applications':>12} {'query':>24} {'whole list, ms':>15} {'first page, ms':>15} {'page 10, ms':>12}")
+    for applications in APPLICATION_COUNTS:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine, expire_on_commit=False) as session:
+            timewindow = seed(session, applications)
+
+        with Session(engine) as session:
+            for name, params in QUERIES.items():
+                whole_time, (whole, _) = measure(
+                    list_applications, session, PATRON_ID, ApplicationsQuery(**params), timewindow
+                )
+                page = ApplicationsQuery(**params, limit=PAGE_SIZE)
+                first_time, (first, cursor) = measure(list_applications, session, PATRON_ID, page, timewindow)
+                paged = list(first)
+                for _ in range(8):
+                    if cursor is None:
+                        break
+                    more, cursor = list_applications(
+                        session, PATRON_ID, page.model_copy(update={"cursor": cursor}), timewindow
+                    )
+                    paged += more
+                later_time, later = 0.0, []
+                if cursor is not None:
+                    later_page = page.model_copy(update={"cursor": cursor})
+                    later_time, (later, _) = measure(list_applications, session, PATRON_ID, later_page, timewindow)
+                assert [a.id for a in paged + later] == [a.id for a in whole][: len(paged) + len(later)]
+                print(f"{applications:>12} {name:>24} {whole_time:>15.2f} {first_time:>15.2f} {later_time:>12.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare the per-application ranking computation with the grouped SQL engine.
+
+Usage: `uv run scripts/benchmark_ranking.py`
+"""
+
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.db.models import Application, Base, Patron, PatronRanking, PatronRateApplication, TimeWindow  # noqa: E402
+from src.schemas import Rating  # noqa: E402
+from src.services import RRF_CONST, compute_application_ranking_stats, dense_rankings  # noqa: E402
+from src.services.patron_ranking import evenly_spaced_keys  # noqa: E402
+
+PATRONS = 30
+APPLICATION_COUNTS = [100, 500, 1000, 2500, 5000]
+
+
+def seed(session: Session, applications: int) -> TimeWindow:
+    random.seed(applications)
+    now = datetime.datetime.now(datetime.UTC)
+    timewindow = TimeWindow(
+        title="bench", start=now - datetime.timedelta(days=30), end=now + datetime.timedelta(days=30)
+    )
+    session.add(timewindow)
+    session.flush()
+    session.add_all(Patron(id=i, telegram_id=str(i)) for i in range(1, PATRONS + 1))
+    session.add_all(
+        Application(
+            id=i,
+            submitted_at=now - datetime.timedelta(minutes=i),
+            session_id=str(i),
+            email=f"{i}@innopolis.university",
+            full_name=f"Applicant {i}",
+            timewindow_id=timewindow.id,
+        )
+        for i in range(1, applications + 1)
+    )
+    session.flush()
+    ids = range(1, applications + 1)
+    for patron_id in range(1, PATRONS + 1):
+        session.add_all(
+            PatronRateApplication(patron_id=patron_id, application_id=i, rate=random.choice(list(Rating)))
+            for i in random.sample(ids, applications // 2)
+        )
+        session.add_all(
+            PatronRanking(patron_id=patron_id, application_id=i, rank_key=key)
+            for key, i in zip(evenly_spaced_keys(applications // 5), random.sample(ids, applications // 5), strict=True)
+        )
+    session.commit()
+    return timewindow
+
+
+def legacy(session: Session, timewindow: TimeWindow) -> list[tuple[int, float, int]]:
+    """Previous implementation: two queries per application and sums in Python"""
+    applications = session.query(Application).all()
+    applications = [a for a in applications if timewindow.start <= a.submitted_at <= timewindow.end]
+    # ranks were stored in the rows back then
+    ranks = {(row.patron_id, row.application_id): row.rank for row in session.execute(select(dense_rankings()))}
+    result = []
+    for application in applications:
+        rankings = session.query(PatronRanking).filter(PatronRanking.application_id == application.id).all()
+        rrf_score = sum(1 / (RRF_CONST + ranks[ranking.patron_id, ranking.application_id] + 1) for ranking in rankings)
+        votes = (
+            session.query(PatronRateApplication).filter(PatronRateApplication.application_id == application.id).all()
+        )
+        total_votes = sum(1 for v in votes if v.rate != Rating.UNRATED)
+        result.append((application.id, rrf_score, total_votes))
+    result.sort(key=lambda x: x[1], reverse=True)
+    return result
+
+
+def measure(fn, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    print(f"{'applications':>12} {'legacy, ms':>12} {'grouped, ms':>12}")
+    for applications in APPLICATION_COUNTS:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine, expire_on_commit=False) as session:
+            timewindow = seed(session, applications)
+
+        with Session(engine) as session:
+            legacy_time, legacy_result = measure(legacy, session, timewindow)
+        with Session(engine) as session:
+            grouped_time, grouped_result = measure(compute_application_ranking_stats, session, timewindow)
+
+        expected = {app_id: (rrf_score, total_votes) for app_id, rrf_score, total_votes in legacy_result}
+        for stats in grouped_result:
+            rrf_score, total_votes = expected[stats.application.id]
+            assert abs(stats.rrf_score - rrf_score) < 1e-9 and stats.total_votes == total_votes
+        assert len(expected) == len(grouped_result)
+
+        print(f"{applications:>12} {legacy_time * 1000:>12.1f} {grouped_time * 1000:>12.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Compare saving a patron ranking by deleting and re-inserting it and reading it back
+with writing only the difference and building the response from the payload,
+and with `PATCH /patron/ranking` for edits that are a single operation.
+
+Usage: `uv run scripts/benchmark_ranking_writes.py`
+"""
+
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, delete, event, select
+from sqlalchemy.orm import Session
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.api.routes.patron import _patch_ranking, _put_ranking  # noqa: E402
+from src.db.loaders import APPLICATION_RESPONSE  # noqa: E402
+from src.db.models import Application, ApplicationScore, Base, Patron, PatronRanking, TimeWindow  # noqa: E402
+from src.schemas import (  # noqa: E402
+    ApplicationResponse,
+    PatronRankingResponse,
+    RankingOperation,
+    RankingOperationType,
+)
+from src.services import apply_ranking_delta, timewindow_filter, update_daily_stats  # noqa: E402
+from src.services.patron_ranking import evenly_spaced_keys  # noqa: E402
+
+RANKING_SIZES = [10, 50, 100, 300, 1000]
+REPEATS = 5
+PATRON_ID = 1
+
+
+def seed(session: Session, size: int) -> TimeWindow:
+    now = datetime.datetime.now(datetime.UTC)
+    timewindow = TimeWindow(title="bench", start=now - datetime.timedelta(days=30), end=now)
+    session.add(timewindow)
+    session.flush()
+    session.add(Patron(id=PATRON_ID, telegram_id=str(PATRON_ID)))
+    session.add_all(
+        Application(
+            id=i,
+            submitted_at=now - datetime.timedelta(minutes=i),
+            session_id=str(i),
+            email=f"{i}@innopolis.university",
+            full_name=f"Applicant {i}",
+            timewindow_id=timewindow.id,
+            score=ApplicationScore(),
+        )
+        for i in range(1, size + 2)
+    )
+    session.flush()
+    apply_ranking_delta(session, {}, {i: i - 1 for i in range(1, size + 1)})
+    session.add_all(
+        PatronRanking(patron_id=PATRON_ID, application_id=i, rank_key=key)
+        for i, key in enumerate(evenly_spaced_keys(size), start=1)
+    )
+    session.commit()
+    return timewindow
+
+
+def edits(size: int) -> dict[str, tuple[list[int], list[RankingOperation] | None]]:
+    """Rankings submitted after the stored one `1..size`, and the same edit as PATCH operations if it is one"""
+    stored = list(range(1, size + 1))
+    rng = random.Random(size)
+    i = rng.randrange(size - 1)
+    shuffled = stored.copy()
+    rng.shuffle(shuffled)
+    move, insert = RankingOperationType.MOVE, RankingOperationType.INSERT
+    return {
+        "swap neighbours": (
+            stored[:i] + [stored[i + 1], stored[i]] + stored[i + 2 :],
+            [RankingOperation(op=move, application_id=stored[i + 1], after=stored[i - 1] if i > 0 else None)],
+        ),
+        "move to top": (stored[-1:] + stored[:-1], [RankingOperation(op=move, application_id=stored[-1])]),
+        "append one": (stored + [size + 1], [RankingOperation(op=insert, application_id=size + 1, after=stored[-1])]),
+        "shuffle": (shuffled, None),
+    }
+
+
+def legacy(
+    session: Session, patron_id: int, application_ids: list[int], timewindow: TimeWindow
+) -> PatronRankingResponse:
+    """Previous implementation: delete and re-add every row, then read the ranking back"""
+    existing_ids = set(session.scalars(select(Application.id).where(Application.id.in_(application_ids))))
+    assert len(existing_ids) == len(application_ids)
+    old_ranks = {
+        application_id: rank
+        for rank, application_id in enumerate(
+            session.scalars(
+                select(PatronRanking.application_id)
+                .where(PatronRanking.patron_id == patron_id)
+                .order_by(PatronRanking.rank_key)
+            )
+        )
+    }
+    apply_ranking_delta(
+        session, old_ranks, {application_id: rank for rank, application_id in enumerate(application_ids)}
+    )
+    session.execute(delete(PatronRanking).where(PatronRanking.patron_id == patron_id))
+    for application_id, key in zip(application_ids, evenly_spaced_keys(len(application_ids)), strict=True):
+        session.add(PatronRanking(patron_id=patron_id, application_id=application_id, rank_key=key))
+    update_daily_stats(session, patron_id, ranking_increment=1)
+    session.flush()
+
+    ranked_applications = session.scalars(
+        select(Application)
+        .join(PatronRanking, PatronRanking.application_id == Application.id)
+        .where(PatronRanking.patron_id == patron_id, timewindow_filter(timewindow))
+        .order_by(PatronRanking.rank_key)
+        .options(*APPLICATION_RESPONSE)
+    )
+    return PatronRankingResponse(
+        patron_id=patron_id,
+        applications=[ApplicationResponse.model_validate(a, from_attributes=True) for a in ranked_applications],
+    )
+
+
+def diff(session: Session, patron_id: int, application_ids: list[int], timewindow: TimeWindow) -> PatronRankingResponse:
+    response = _put_ranking(session, patron_id, application_ids, timewindow)
+    session.flush()
+    return response
+
+
+def patch(
+    session: Session, patron_id: int, operations: list[RankingOperation], timewindow: TimeWindow
+) -> PatronRankingResponse:
+    response = _patch_ranking(session, patron_id, operations, timewindow)
+    session.flush()
+    return response
+
+
+def measure(engine, fn, payload: list, timewindow: TimeWindow) -> tuple[float, int, int, object]:
+    """
+    Best time of the write in a transaction that is rolled back,
+    numbers of statements and of rows changed as counted by SQLite, and the response
+    """
+    statements = 0
+
+    def on_execute(*_):
+        nonlocal statements
+        statements += 1
+
+    best = float("inf")
+    for _ in range(REPEATS):
+        with Session(engine, autoflush=False) as session:
+            dbapi_connection = session.connection().connection.dbapi_connection
+            changes = dbapi_connection.total_changes
+            statements = 0
+            event.listen(engine, "before_cursor_execute", on_execute)
+            start = time.perf_counter()
+            response = fn(session, PATRON_ID, payload, timewindow)
+            best = min(best, time.perf_counter() - start)
+            event.remove(engine, "before_cursor_execute", on_execute)
+            changes = dbapi_connection.total_changes - changes
+            session.rollback()
+    return best, statements, changes, response
+
+
+def main():
+    print("time in ms / SQL statements / rows changed")
+    print(f"{'size':>6} {'edit':<16} {'delete and re-add':>22} {'diff':>18} {'patch':>18}")
+    for size in RANKING_SIZES:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine, expire_on_commit=False) as session:
+            timewindow = seed(session, size)
+
+        for edit, (application_ids, operations) in edits(size).items():
+            results = [measure(engine, fn, application_ids, timewindow) for fn in (legacy, diff)]
+            if operations is not None:
+                results.append(measure(engine, patch, operations, timewindow))
+            assert all(result[-1] == results[0][-1] for result in results)
+            print(
+                f"{size:>6} {edit:<16}"
+                + "".join(
+                    f" {f'{seconds * 1000:.1f} / {statements} / {rows}':>{width}}"
+                    for (seconds, statements, rows, _), width in zip(results, (22, 18, 18), strict=False)
+                )
+                + ("" if operations is not None else f" {'-':>18}")
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
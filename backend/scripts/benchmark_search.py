@@ -0,0 +1,120 @@
+"""
+Latency of `search_applications` over the FTS5 index against a `LIKE` scan of the same texts.
+
+Usage: `uv run scripts/benchmark_search.py`
+"""
+
+import datetime
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.db.models import Application, Base, Patron, SearchDocument, TimeWindow  # noqa: E402
+from src.schemas import SearchDocumentKind  # noqa: E402
+from src.services import search_applications, set_search_texts  # noqa: E402
+
+PATRONS = 20
+APPLICATION_COUNTS = [1000, 5000, 12500]
+"Each application has 3 documents and about a comment, so the largest count gives about 50 000 documents"
+DOCUMENT_WORDS = 400
+REPEATS = 20
+QUERIES = ["python", "machine learning", "olympiad winner", "Applicant 42", "rob"]
+
+VOCABULARY = [f"word{i}" for i in range(5000)] + [
+    "python",
+    "machine",
+    "learning",
+    "olympiad",
+    "winner",
+    "robotics",
+    "robust",
+    "mathematics",
+    "physics",
+]
+
+
+def text(words: int) -> str:
+    return " ".join(random.choices(VOCABULARY, k=words))
+
+
+def seed(session: Session, applications: int) -> TimeWindow:
+    random.seed(applications)
+    now = datetime.datetime.now(datetime.UTC)
+    timewindow = TimeWindow(
+        title="bench", start=now - datetime.timedelta(days=30), end=now + datetime.timedelta(days=30)
+    )
+    session.add(timewindow)
+    session.flush()
+    session.add_all(Patron(id=i, telegram_id=str(i)) for i in range(1, PATRONS + 1))
+    session.add_all(
+        Application(
+            id=i,
+            submitted_at=now - datetime.timedelta(minutes=i),
+            session_id=str(i),
+            email=f"{i}@innopolis.university",
+            full_name=f"Applicant {i}",
+            timewindow_id=timewindow.id,
+        )
+        for i in range(1, applications + 1)
+    )
+    session.flush()
+    texts = []
+    for i in range(1, applications + 1):
+        texts.append((i, None, SearchDocumentKind.APPLICANT, f"Applicant {i} {i}@innopolis.university"))
+        texts.append((i, None, SearchDocumentKind.CV, text(DOCUMENT_WORDS)))
+        texts.append((i, None, SearchDocumentKind.MOTIVATIONAL_LETTER, text(DOCUMENT_WORDS)))
+        texts.append((i, random.randint(1, PATRONS), SearchDocumentKind.COMMENT, text(20)))
+    set_search_texts(session, texts)
+    session.commit()
+    return timewindow
+
+
+def like_scan(session: Session, patron_id: int, query: str, limit: int) -> list[int]:
+    """The same texts without the index: every document is read for every word"""
+    statement = (
+        select(SearchDocument.application_id)
+        .distinct()
+        .where((SearchDocument.patron_id.is_(None)) | (SearchDocument.patron_id == patron_id))
+    )
+    for word in query.split():
+        statement = statement.where(SearchDocument.text.icontains(word))
+    return list(session.scalars(statement.limit(limit)))
+
+
+def measure(fn, *args) -> float:
+    """Median of the repeats, in milliseconds"""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    print(f"{'documents':>10} {'query':>18} {'results':>8} {'fts5, ms':>10} {'like, ms':>10}")
+    for applications in APPLICATION_COUNTS:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with Session(engine, expire_on_commit=False) as session:
+            timewindow = seed(session, applications)
+            documents = session.query(SearchDocument).count()
+
+        with Session(engine) as session:
+            for query in QUERIES:
+                results = search_applications(session, 1, query, timewindow, 20)
+                fts_time = measure(search_applications, session, 1, query, timewindow, 20)
+                like_time = measure(like_scan, session, 1, query, 20)
+                print(f"{documents:>10} {query:>18} {len(results):>8} {fts_time:>10.2f} {like_time:>10.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Page through `GET /patron/applications` in every sorting on a temporary database and check that
+each application is returned exactly once, in the same order as the whole list. Most applications are submitted
+in the same second: `submitted_at` is then equal for all of them and only the ID tells them apart.
+
+Usage: `uv run scripts/check_pagination.py`
+"""
+
+import datetime
+import sys
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.db.models import Application, ApplicationScore, Base, PatronRanking, TimeWindow  # noqa: E402
+from src.schemas import ApplicationSort, ApplicationsQuery  # noqa: E402
+from src.services import list_applications  # noqa: E402
+from src.services.patron_ranking import evenly_spaced_keys  # noqa: E402
+
+PATRON_ID = 1
+APPLICATIONS = 7
+PAGE_SIZES = [1, 2, 3, APPLICATIONS]
+
+
+def seed(session: Session) -> TimeWindow:
+    now = datetime.datetime.now(datetime.UTC)
+    timewindow = TimeWindow(
+        id=1, title="check", start=now - datetime.timedelta(days=1), end=now + datetime.timedelta(days=1)
+    )
+    session.add(timewindow)
+    # `submitted_at` is left to the server default, as for submitted applications: the same second for all of them
+    session.add_all(
+        Application(
+            id=i,
+            session_id=str(i),
+            email=f"{i}@innopolis.university",
+            full_name="Same Name" if i % 2 else f"Applicant {i}",
+            timewindow_id=1,
+            score=ApplicationScore(),
+        )
+        for i in range(1, APPLICATIONS + 1)
+    )
+    session.flush()
+    session.add_all(
+        PatronRanking(patron_id=PATRON_ID, application_id=i, rank_key=key)
+        for key, i in zip(evenly_spaced_keys(3), [5, 2, 7], strict=True)
+    )
+    session.commit()
+    return timewindow
+
+
+def main() -> None:
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/check.db")
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            timewindow = seed(session)
+            for sort in ApplicationSort:
+                for descending in (False, True):
+                    whole, _ = list_applications(
+                        session, PATRON_ID, ApplicationsQuery(sort=sort, descending=descending), timewindow
+                    )
+                    expected = [application.id for application in whole]
+                    for limit in PAGE_SIZES:
+                        query = ApplicationsQuery(sort=sort, descending=descending, limit=limit)
+                        paged = []
+                        while True:
+                            page, cursor = list_applications(session, PATRON_ID, query, timewindow)
+                            paged.extend(application.id for application in page)
+                            if cursor is None or len(paged) > APPLICATIONS:
+                                break
+                            query = query.model_copy(update={"cursor": cursor})
+                        status = "ok" if paged == expected and len(expected) == APPLICATIONS else "FAIL"
+                        print(f"{sort.value:>14} {'desc' if descending else 'asc':>4} limit={limit}: {paged} {status}")
+                        if status != "ok":
+                            failures.append((sort.value, descending, limit, paged, expected))
+        engine.dispose()
+    if failures:
+        for sort, descending, limit, paged, expected in failures:
+            print(f"{sort} descending={descending} limit={limit}: got {paged}, expected {expected}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
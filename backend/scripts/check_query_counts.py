@@ -0,0 +1,175 @@
+"""
+Count SQL queries and ORM objects loaded by read endpoints on a small and a large temporary database.
+Fails if the number of queries grows with the number of rows, i.e. the endpoint loads something row by row,
+or if an endpoint loads more objects than it returns, i.e. it pulls in relationships it does not need.
+
+Usage: `uv run scripts/check_query_counts.py`
+"""
+
+import datetime
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.api.app import app  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.db.models import (  # noqa: E402
+    Application,
+    ApplicationScore,
+    Base,
+    Patron,
+    PatronDailyStats,
+    PatronRanking,
+    PatronRateApplication,
+    TimeWindow,
+)
+from src.dependencies import get_db_session  # noqa: E402
+from src.schemas import Rating  # noqa: E402
+from src.services import principal_cache, timewindow_registry  # noqa: E402
+from src.services.patron_ranking import evenly_spaced_keys  # noqa: E402
+
+SIZES = [(5, 20), (10, 200)]
+"Numbers of patrons and applications"
+EXTRA_OBJECTS = 0
+"Objects loaded besides the returned ones: the authenticated patron and timewindows are cached in memory"
+ENDPOINTS = [
+    ("/patron/me", {}),
+    ("/patron/applications", {}),
+    ("/patron/applications", {"show_last_timewindow": False}),
+    ("/patron/applications/1", {}),
+    ("/patron/me/rated-applications", {}),
+    ("/patron/ranking", {}),
+    ("/admin/applications/ranking", {}),
+    ("/admin/applications/ranking", {"method": "schulze"}),
+    ("/admin/patrons", {}),
+    ("/admin/patrons", {"timewindow_id": 1, "limit": 3}),
+    ("/admin/stats", {}),
+    ("/admin/patron-stats/1", {}),
+    ("/admin/timewindows", {}),
+    ("/admin/timewindows/1", {}),
+]
+
+
+def seed(session: Session, patrons: int, applications: int) -> None:
+    random.seed(applications)
+    now = datetime.datetime.now(datetime.UTC)
+    session.add(TimeWindow(id=1, title="check", start=now - datetime.timedelta(days=30), end=now))
+    session.add_all(
+        Patron(id=i, telegram_id=str(i), telegram_data={"username": f"p{i}"}, is_admin=i == 1)
+        for i in range(1, patrons + 1)
+    )
+    session.add_all(
+        Application(
+            id=i,
+            submitted_at=now - datetime.timedelta(minutes=i),
+            session_id=str(i),
+            email=f"{i}@innopolis.university",
+            full_name=f"Applicant {i}",
+            timewindow_id=1,
+            score=ApplicationScore(),
+        )
+        for i in range(1, applications + 1)
+    )
+    ids = range(1, applications + 1)
+    for patron_id in range(1, patrons + 1):
+        session.add(PatronDailyStats(patron_id=patron_id, rating_count=1, ranking_count=1))
+        session.add_all(
+            PatronRateApplication(patron_id=patron_id, application_id=i, rate=random.choice(list(Rating)))
+            for i in random.sample(ids, applications // 2)
+        )
+        session.add_all(
+            PatronRanking(patron_id=patron_id, application_id=i, rank_key=key)
+            for key, i in zip(evenly_spaced_keys(applications // 5), random.sample(ids, applications // 5), strict=True)
+        )
+    session.commit()
+
+
+def count_items(data) -> int:
+    """Number of JSON objects in the response"""
+    if isinstance(data, list):
+        return sum(count_items(item) for item in data)
+    if isinstance(data, dict):
+        return 1 + sum(count_items(value) for value in data.values())
+    return 0
+
+
+def count_queries(patrons: int, applications: int) -> list[tuple[int, int, int]]:
+    """Number of queries, loaded objects and returned JSON objects of every endpoint"""
+    tmp = tempfile.TemporaryDirectory()
+    path = Path(tmp.name) / "db.sqlite"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(sync_engine)
+    with Session(sync_engine) as session:
+        seed(session, patrons, applications)
+    sync_engine.dispose()
+    timewindow_registry.invalidate()
+    principal_cache.invalidate()
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_maker = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def get_test_session():
+        async with session_maker() as session:
+            yield session
+
+    queries = objects = 0
+
+    def on_execute(*_):
+        nonlocal queries
+        queries += 1
+
+    def on_load(*_):
+        nonlocal objects
+        objects += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    event.listen(Base, "load", on_load, propagate=True)
+    app.dependency_overrides[get_db_session] = get_test_session
+    counts = []
+    try:
+        with TestClient(app, base_url="https://testserver") as client:
+            password = f"1_{settings.secret_key.get_secret_value()}"
+            client.post("/auth/login-by-password", params={"telegram_id": "1", "password": password})
+            for url, params in ENDPOINTS:
+                queries = objects = 0
+                response = client.get(url, params=params)
+                assert response.status_code == 200, (url, response.text)
+                counts.append((queries, objects, count_items(response.json())))
+    finally:
+        event.remove(Base, "load", on_load)
+        app.dependency_overrides.pop(get_db_session)
+        tmp.cleanup()
+    return counts
+
+
+def main():
+    results = [count_queries(patrons, applications) for patrons, applications in SIZES]
+    print("queries / loaded objects / returned objects")
+    print(f"{'endpoint':<52}" + "".join(f" {f'{p} x {a}':>16}" for p, a in SIZES))
+    failed = False
+    for (url, params), counts in zip(ENDPOINTS, zip(*results, strict=True), strict=True):
+        endpoint = url + ("?" + "&".join(f"{k}={v}" for k, v in params.items()) if params else "")
+        problems = []
+        if len({queries for queries, _, _ in counts}) > 1:
+            problems.append("queries grow with data")
+        if any(objects > items + EXTRA_OBJECTS for _, objects, items in counts):
+            problems.append("loads more objects than returns")
+        failed |= bool(problems)
+        print(
+            f"{endpoint:<52}"
+            + "".join(f" {f'{queries} / {objects} / {items}':>16}" for queries, objects, items in counts)
+            + (f"  <- {', '.join(problems)}" if problems else "")
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
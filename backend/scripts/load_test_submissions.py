@@ -0,0 +1,139 @@
+"""
+Submit applications concurrently to a temporary database and report latency percentiles.
+A query that blocks the event loop stalls every request in flight, which shows up in the tail latency.
+
+Usage: `uv run scripts/load_test_submissions.py`
+"""
+
+import asyncio
+import datetime
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.api.app import app  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.db import apply_sqlite_pragmas, create_writer_engine  # noqa: E402
+from src.db.models import Base, TimeWindow  # noqa: E402
+from src.dependencies import get_db_session, get_write_queue  # noqa: E402
+from src.services import WriteQueue, timewindow_registry  # noqa: E402
+
+SUBMISSIONS = 200
+CONCURRENCY = [1, 10, 50]
+FILE_SIZE = 64 * 1024
+PROBE_INTERVAL = 0.01
+PDF = "application/pdf"
+
+
+def create_database(path: Path) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    now = datetime.datetime.now(datetime.UTC)
+    with Session(engine) as session:
+        session.add(
+            TimeWindow(title="load test", start=now - datetime.timedelta(days=1), end=now + datetime.timedelta(days=1))
+        )
+        session.commit()
+    engine.dispose()
+
+
+async def submit(i: int, content: bytes) -> tuple[float, bool]:
+    """Submit as a new applicant with its own session cookie, return the latency in seconds and if it succeeded"""
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="https://testserver") as client:
+        start = time.perf_counter()
+        response = await client.post(
+            "/applicant/submit",
+            data={"email": f"load{i}@innopolis.university", "full_name": f"Load Test {i}"},
+            files={"cv_file": ("cv.pdf", content, PDF), "motivational_letter_file": ("letter.pdf", content, PDF)},
+        )
+        latency = time.perf_counter() - start
+    return latency, response.status_code == 200
+
+
+async def probe(stop: asyncio.Event) -> list[float]:
+    """Read an application every few milliseconds until stopped, return the latencies in seconds"""
+    latencies = []
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="https://testserver") as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            await client.get("/applicant/my-application")
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+async def run(concurrency: int, offset: int, content: bytes) -> tuple[list[tuple[float, bool]], list[float]]:
+    """Latencies of submissions and of reads made meanwhile"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(i: int) -> tuple[float, bool]:
+        async with semaphore:
+            return await submit(i, content)
+
+    stop = asyncio.Event()
+    reads = asyncio.create_task(probe(stop))
+    results = await asyncio.gather(*(limited(offset + i) for i in range(SUBMISSIONS)))
+    stop.set()
+    return results, await reads
+
+
+def percentile(latencies: list[float], q: int) -> float:
+    return statistics.quantiles(latencies, n=100, method="inclusive")[q - 1] * 1000
+
+
+async def main():
+    content = b"%PDF-1.4\n" + bytes(FILE_SIZE)
+    with tempfile.TemporaryDirectory() as tmp:
+        create_database(Path(tmp) / "db.sqlite")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'db.sqlite'}")
+        event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+        session_maker = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+        async def get_test_session():
+            async with session_maker() as session:
+                yield session
+
+        writer = WriteQueue(create_writer_engine(f"sqlite:///{Path(tmp) / 'db.sqlite'}"), settings.writer_max_batch)
+        app.dependency_overrides[get_db_session] = get_test_session
+        app.dependency_overrides[get_write_queue] = lambda: writer
+        files_dir, settings.files_dir = settings.files_dir, Path(tmp) / "files"
+        timewindow_registry.invalidate()
+        try:
+            print(f"{SUBMISSIONS} submissions of 2 x {FILE_SIZE // 1024} KiB files and reads meanwhile, latency in ms")
+            print(
+                f"{'concurrency':>12} {'submit p50':>11} {'p99':>9} {'max':>9} {'req/s':>7} {'errors':>7}"
+                f" {'read p50':>9} {'p99':>9} {'max':>9}"
+            )
+            for n, concurrency in enumerate(CONCURRENCY):
+                start = time.perf_counter()
+                results, reads = await run(concurrency, n * SUBMISSIONS, content)
+                elapsed = time.perf_counter() - start
+                latencies = [latency for latency, _ in results]
+                errors = sum(not ok for _, ok in results)
+                print(
+                    f"{concurrency:>12} {percentile(latencies, 50):>11.1f} {percentile(latencies, 99):>9.1f}"
+                    f" {max(latencies) * 1000:>9.1f} {SUBMISSIONS / elapsed:>7.0f} {errors:>7}"
+                    f" {percentile(reads, 50):>9.1f} {percentile(reads, 99):>9.1f} {max(reads) * 1000:>9.1f}"
+                )
+        finally:
+            app.dependency_overrides.pop(get_db_session)
+            app.dependency_overrides.pop(get_write_queue)
+            writer.shutdown()
+            settings.files_dir = files_dir
+            timewindow_registry.invalidate()
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
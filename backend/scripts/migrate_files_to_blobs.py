@@ -0,0 +1,62 @@
+"""
+Move files stored as `files_dir/<email>/<document>` into the content-addressed blob store
+and point the applications at the blobs. Files are copied first and deleted only after the commit,
+so the script can be interrupted and run again. Stop the API while it runs.
+
+Usage: `uv run scripts/migrate_files_to_blobs.py`
+"""
+
+import sys
+from pathlib import Path
+
+from sqlalchemy import select
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.config import settings  # noqa: E402
+from src.db import SessionLocal  # noqa: E402
+from src.db.models import Application  # noqa: E402
+from src.services import BLOBS_DIR, bump_data_version, stage_blob  # noqa: E402
+
+FILE_COLUMNS = ("cv", "transcript", "motivational_letter", "recommendation_letter", "almost_a_student")
+
+
+def main():
+    legacy_files: set[Path] = set()
+    missing: set[str] = set()
+    stored = 0
+    with SessionLocal() as session:
+        for application in session.scalars(select(Application)):
+            for column in FILE_COLUMNS:
+                relative_path = getattr(application, column)
+                if relative_path is None or Path(relative_path).parts[:1] == BLOBS_DIR.parts:
+                    continue
+                path = settings.files_dir / relative_path
+                if not path.exists():
+                    missing.add(relative_path)
+                    continue
+                # blobs are put in place before the commit: if it fails, they are merely unreferenced
+                with path.open("rb") as source:
+                    blob, staged_path = stage_blob(source, settings.files_dir, path.suffix, sys.maxsize)
+                if staged_path is not None:
+                    staged_path.replace(settings.files_dir / blob)
+                    stored += 1
+                setattr(application, column, blob.as_posix())
+                legacy_files.add(path)
+        bump_data_version(session)
+        session.commit()
+
+    for path in legacy_files:
+        path.unlink(missing_ok=True)
+        if path.parent != settings.files_dir and not any(path.parent.iterdir()):
+            path.parent.rmdir()
+
+    print(f"{len(legacy_files)} files moved into {stored} blobs")
+    if missing:
+        print(f"{len(missing)} files referenced by applications do not exist:")
+        for relative_path in sorted(missing):
+            print(f"  {relative_path}")
+
+
+if __name__ == "__main__":
+    main()
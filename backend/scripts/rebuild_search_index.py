@@ -0,0 +1,31 @@
+"""
+Index every application for `GET /patron/search` from scratch, extracting the text of the CVs
+and motivational letters again. Run it after the migration adding the index, or after installing `pypdf`.
+
+Usage: `uv run scripts/rebuild_search_index.py`
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.config import settings  # noqa: E402
+from src.db import SessionLocal  # noqa: E402
+from src.services import rebuild_search_index  # noqa: E402
+from src.services.search import pypdf  # noqa: E402
+
+
+def main():
+    if pypdf is None:
+        print("pypdf is not installed, only names, emails and comments are indexed")
+    start = time.perf_counter()
+    with SessionLocal() as session:
+        documents = rebuild_search_index(session, settings.files_dir)
+        session.commit()
+    print(f"{documents} documents indexed in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
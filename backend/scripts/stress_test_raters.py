@@ -0,0 +1,174 @@
+"""
+Let many patrons rate and rank applications at the same time on a temporary database.
+All writes go through the write queue, so there must be no "database is locked" errors,
+the incrementally maintained scores must match the ones recomputed from the raw tables,
+and the daily activity counters must add up to the number of writes.
+
+Usage: `uv run scripts/stress_test_raters.py`
+"""
+
+import asyncio
+import datetime
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+# add parent dir to sys.path
+sys.path.append(str(Path(__file__).parents[1]))
+from src.api.app import app  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.db import apply_sqlite_pragmas, create_writer_engine  # noqa: E402
+from src.db.models import Application, ApplicationScore, Base, Patron, PatronDailyStats, TimeWindow  # noqa: E402
+from src.dependencies import get_db_session, get_write_queue  # noqa: E402
+from src.schemas import Rating  # noqa: E402
+from src.services import (  # noqa: E402
+    WriteQueue,
+    daily_stats,
+    principal_cache,
+    rebuild_scores,
+    timewindow_registry,
+)
+
+RATERS = 200
+RATINGS_PER_RATER = 10
+RANKING_LENGTH = 20
+APPLICATIONS = 100
+BULK_RATINGS = False
+"Send the ratings of each rater in one `POST /patron/rate-applications` instead of one request per rating"
+
+
+def create_database(path: Path) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    now = datetime.datetime.now(datetime.UTC)
+    with Session(engine) as session:
+        session.add(TimeWindow(id=1, title="stress test", start=now - datetime.timedelta(days=1), end=now))
+        session.add_all(Patron(id=i, telegram_id=str(i)) for i in range(1, RATERS + 1))
+        session.add_all(
+            Application(
+                id=i,
+                submitted_at=now - datetime.timedelta(minutes=i),
+                session_id=str(i),
+                email=f"{i}@innopolis.university",
+                full_name=f"Applicant {i}",
+                timewindow_id=1,
+                score=ApplicationScore(),
+            )
+            for i in range(1, APPLICATIONS + 1)
+        )
+        session.commit()
+    engine.dispose()
+
+
+async def rater(patron_id: int) -> tuple[list[float], list[str]]:
+    """Log in, rate applications and put a ranking, return the latencies in seconds and the errors"""
+    rng = random.Random(patron_id)
+    latencies, errors = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="https://testserver") as client:
+        password = f"{patron_id}_{settings.secret_key.get_secret_value()}"
+        await client.post("/auth/login-by-password", params={"telegram_id": str(patron_id), "password": password})
+        if BULK_RATINGS:
+            ratings = [
+                {"application_id": application_id, "rate": rng.choice(list(Rating))}
+                for application_id in rng.sample(range(1, APPLICATIONS + 1), RATINGS_PER_RATER)
+            ]
+            requests = [("POST", "/patron/rate-applications", ratings)]
+        else:
+            requests = [
+                ("POST", f"/patron/rate-application/{rng.randint(1, APPLICATIONS)}", {"rate": rng.choice(list(Rating))})
+                for _ in range(RATINGS_PER_RATER)
+            ]
+        requests.append(("PUT", "/patron/ranking", rng.sample(range(1, APPLICATIONS + 1), RANKING_LENGTH)))
+        for method, url, payload in requests:
+            start = time.perf_counter()
+            try:
+                if method == "POST" and BULK_RATINGS:
+                    response = await client.post(url, json={"ratings": payload})
+                elif method == "POST":
+                    response = await client.post(url, params=payload)
+                else:
+                    response = await client.put(url, json={"application_ids": payload})
+                if response.status_code != 200:
+                    errors.append(f"{method} {url}: {response.status_code} {response.text}")
+            except Exception as e:
+                errors.append(f"{method} {url}: {e!r}")
+            latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def percentile(latencies: list[float], q: int) -> float:
+    return statistics.quantiles(latencies, n=100, method="inclusive")[q - 1] * 1000
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "db.sqlite"
+        create_database(path)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+        session_maker = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+        async def get_test_session():
+            async with session_maker() as session:
+                yield session
+
+        writer_engine = create_writer_engine(f"sqlite:///{path}")
+        writer = WriteQueue(writer_engine, settings.writer_max_batch)
+        app.dependency_overrides[get_db_session] = get_test_session
+        app.dependency_overrides[get_write_queue] = lambda: writer
+        timewindow_registry.invalidate()
+        principal_cache.invalidate()
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(rater(patron_id) for patron_id in range(1, RATERS + 1)))
+            elapsed = time.perf_counter() - start
+            if daily_stats.enabled:
+                await writer.run(daily_stats.flush)
+        finally:
+            app.dependency_overrides.pop(get_db_session)
+            app.dependency_overrides.pop(get_write_queue)
+            writer.shutdown()
+            timewindow_registry.invalidate()
+            principal_cache.invalidate()
+            await engine.dispose()
+
+        with Session(writer_engine) as session:
+            counted = session.execute(
+                select(func.sum(PatronDailyStats.rating_count), func.sum(PatronDailyStats.ranking_count))
+            ).one()
+            report = rebuild_scores(session)
+            session.rollback()
+        writer_engine.dispose()
+
+    latencies = [latency for rater_latencies, _ in results for latency in rater_latencies]
+    errors = [error for _, rater_errors in results for error in rater_errors]
+    lock_errors = [error for error in errors if "database is locked" in error]
+    print(f"{RATERS} concurrent raters, {RATINGS_PER_RATER} ratings and 1 ranking of {RANKING_LENGTH} each")
+    print(f"writes: {len(latencies)} in {elapsed:.1f} s, {len(latencies) / elapsed:.0f} req/s")
+    print(
+        f"latency ms: p50 {percentile(latencies, 50):.1f}, p99 {percentile(latencies, 99):.1f},"
+        f" max {max(latencies) * 1000:.1f}"
+    )
+    print(
+        f"transactions: {writer.transactions}, units per transaction: {writer.units / max(writer.transactions, 1):.1f}"
+    )
+    print(f"errors: {len(errors)}, lock errors: {len(lock_errors)}")
+    print(f"drifted scores: {len(report.drifted_applications)}")
+    expected = (RATERS * RATINGS_PER_RATER, RATERS)
+    print(f"daily stats: {tuple(counted)} ratings and rankings counted, {expected} expected")
+    for error in errors[:10]:
+        print("  " + error)
+    sys.exit(1 if errors or report.drifted_applications or tuple(counted) != expected else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
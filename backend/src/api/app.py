@@ -1,19 +1,61 @@
 import uuid
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_derive_responses import AutoDeriveResponsesAPIRoute
 from fastapi_swagger import patch_fastapi
+from starlette.datastructures import Headers
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 import src.logging_  # noqa: F401
 from src.api.lifespan import lifespan
 from src.config import settings
+from src.metrics import MetricsMiddleware
 
 app = FastAPI(docs_url=None, swagger_ui_oauth2_redirect_url=None, root_path=settings.app_root_path, lifespan=lifespan)
 app.router.route_class = AutoDeriveResponsesAPIRoute
 patch_fastapi(app)
 
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies larger than `max_size` bytes: by `Content-Length` before reading,
+    or as soon as the received chunks exceed it, so an oversized upload is not spooled to disk in full
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int) -> None:
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        detail = f"Request body is larger than {self.max_size // (1024 * 1024)} MB"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_size:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(RequestSizeLimitMiddleware, max_size=settings.upload_max_request_size_mb * 1024 * 1024)
+
+
 # CORS middleware configuration
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +63,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -47,11 +90,15 @@ app.add_middleware(
     https_only=True,
 )
 
+# outermost, so that the time spent in the middlewares above and streaming the response are measured too
+app.add_middleware(MetricsMiddleware)
+
 from src.api.routes import (  # noqa: E402
     admin_router,
     applicant_router,
     auth_router,
     files_router,
+    metrics_router,
     patron_router,
 )
 
@@ -59,4 +106,5 @@ app.include_router(admin_router)
 app.include_router(applicant_router)
 app.include_router(auth_router)
 app.include_router(files_router)
+app.include_router(metrics_router)
 app.include_router(patron_router)
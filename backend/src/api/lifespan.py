@@ -1,28 +1,64 @@
+import asyncio
 from contextlib import asynccontextmanager
 
+from sqlalchemy import select
+
 import src.logging_  # noqa: F401
 from src.config import settings
+from src.db import AsyncSessionLocal, async_engine, read_sqlite_pragmas, writer_engine
 from src.db.models import Patron
-from src.dependencies import get_db_session
 from src.logging_ import logger
+from src.services import daily_stats, export_jobs, write_queue
+
+
+async def flush_daily_stats_periodically():
+    while True:
+        await asyncio.sleep(settings.daily_stats_flush_interval_seconds)
+        try:
+            await write_queue.run(daily_stats.flush)
+        except Exception:
+            logger.exception("Flushing patron daily stats failed")
 
 
 @asynccontextmanager
 async def lifespan(_):
-    session = next(get_db_session())
-    if not session.query(Patron).filter(Patron.telegram_id == settings.superadmin_telegram_id).first():
-        logger.info("Creating superadmin")
-        superadmin = Patron(telegram_id=settings.superadmin_telegram_id, is_admin=True)
-        session.add(superadmin)
-        session.commit()
-
-    if settings.default_patrons:
-        existent_patrons = session.query(Patron).filter(Patron.telegram_id.in_(settings.default_patrons)).all()
-        nonexistent_patrons = set(settings.default_patrons) - {p.telegram_id for p in existent_patrons}
-        if nonexistent_patrons:
-            logger.info("Creating default patrons")
-            for telegram_id in nonexistent_patrons:
-                patron = Patron(telegram_id=telegram_id)
-                session.add(patron)
-            session.commit()
+    async with async_engine.connect() as connection:
+        pragmas = await connection.run_sync(read_sqlite_pragmas)
+    logger.info(
+        "SQLite connections: "
+        + ", ".join(f"{name}={value}" for name, value in pragmas.items())
+        + f", pool_size={settings.database_pool_size}, max_overflow={settings.database_max_overflow}"
+    )
+
+    async with AsyncSessionLocal() as session:
+        superadmin_id = await session.scalar(
+            select(Patron.id).where(Patron.telegram_id == settings.superadmin_telegram_id)
+        )
+        if superadmin_id is None:
+            logger.info("Creating superadmin")
+            superadmin = Patron(telegram_id=settings.superadmin_telegram_id, is_admin=True)
+            session.add(superadmin)
+            await session.commit()
+
+        if settings.default_patrons:
+            existent_patrons = await session.scalars(
+                select(Patron.telegram_id).where(Patron.telegram_id.in_(settings.default_patrons))
+            )
+            nonexistent_patrons = set(settings.default_patrons) - set(existent_patrons)
+            if nonexistent_patrons:
+                logger.info("Creating default patrons")
+                for telegram_id in nonexistent_patrons:
+                    patron = Patron(telegram_id=telegram_id)
+                    session.add(patron)
+                await session.commit()
+
+    export_jobs.evict()
+    flush_task = asyncio.create_task(flush_daily_stats_periodically()) if daily_stats.enabled else None
     yield
+    if flush_task is not None:
+        flush_task.cancel()
+        await write_queue.run(daily_stats.flush)
+    write_queue.shutdown()
+    export_jobs.shutdown()
+    await async_engine.dispose()
+    writer_engine.dispose()
@@ -1,34 +1,67 @@
 from datetime import UTC, datetime, timedelta
-from io import BytesIO
+from pathlib import Path
+from tempfile import NamedTemporaryFile
 
-import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi_derive_responses import AutoDeriveResponsesAPIRoute
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 from src.config import settings
-from src.db.models import Application, Patron, PatronDailyStats, PatronRanking, PatronRateApplication, TimeWindow
-from src.dependencies import admin_auth, get_current_timewindow, get_db_session
+from src.db import SessionLocal
+from src.db.loaders import APPLICATION_DELETE, NO_RELATIONSHIPS, PATRON_DELETE, TIMEWINDOW_DELETE
+from src.db.models import Application, Patron, PatronDailyStats, PatronRateApplication, TimeWindow
+from src.dependencies import (
+    admin_auth,
+    get_current_timewindow,
+    get_db_session,
+    get_requested_timewindow,
+    resolve_timewindow,
+)
 from src.dependencies.timewindow import get_last_timewindow
 from src.schemas import (
     AddPatronRequest,
     ApplicationRankingStats,
-    ApplicationResponse,
+    CreateExportRequest,
     CreateTimeWindowRequest,
     DailyApplicationStats,
     DailyPatronStats,
     EditTimeWindowRequest,
+    ExportFormat,
+    ExportJobResponse,
+    ExportJobStatus,
     OverallStats,
-    PatronRankingResponse,
-    PatronRateApplicationResponse,
     PatronResponse,
     PatronStats,
     PatronWithRatingsAndRankings,
-    Rating,
+    RankingMethod,
+    ScoresRebuildReport,
     TimeWindowResponse,
 )
+from src.services import (
+    DOCUMENT_ROW_COLUMNS,
+    RRF_CONST,
+    Principal,
+    application_documents,
+    apply_application_removal,
+    bump_data_version,
+    export_available,
+    export_jobs,
+    get_aggregated_ranking_stats,
+    get_patrons_with_ratings_and_rankings,
+    iter_csv,
+    iter_ndjson,
+    iter_zip,
+    principal_cache,
+    rebuild_scores,
+    remove_patron_contributions,
+    timewindow_filter,
+    timewindow_registry,
+    write_export,
+)
 
 router = APIRouter(
     prefix="/admin",
@@ -38,13 +71,13 @@ router = APIRouter(
 
 
 @router.post("/add-patron", status_code=status.HTTP_201_CREATED)
-def add_patron(
-    data: AddPatronRequest, admin: Patron = Depends(admin_auth), session: Session = Depends(get_db_session)
+async def add_patron(
+    data: AddPatronRequest, admin: Principal = Depends(admin_auth), session: AsyncSession = Depends(get_db_session)
 ) -> PatronResponse:
     if data.is_admin and admin.telegram_id != settings.superadmin_telegram_id:
         raise HTTPException(status_code=403, detail="Only superadmin can add admin patrons")
 
-    existing_patron = session.query(Patron).filter(Patron.telegram_id == data.telegram_id).first()
+    existing_patron = await session.scalar(select(Patron.id).where(Patron.telegram_id == data.telegram_id))
     if existing_patron:
         raise HTTPException(status_code=403, detail="Patron with such Telegram id already exists")
 
@@ -54,284 +87,210 @@ def add_patron(
         is_admin=data.is_admin,
     )
     session.add(new_patron)
-    session.commit()
+    await session.run_sync(bump_data_version)
+    await session.commit()
+    # load `telegram_data` if it was left to the database default
+    await session.refresh(new_patron)
 
     return PatronResponse.model_validate(new_patron, from_attributes=True)
 
 
 @router.delete("/delete-patron/{telegram_id}")
-def delete_patron(telegram_id: str, admin: Patron = Depends(admin_auth), session: Session = Depends(get_db_session)):
+async def delete_patron(
+    telegram_id: str, admin: Principal = Depends(admin_auth), session: AsyncSession = Depends(get_db_session)
+):
     if telegram_id == admin.telegram_id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
 
     if telegram_id == settings.superadmin_telegram_id:
         raise HTTPException(status_code=403, detail="Superadmin cannot be deleted")
 
-    patron = session.query(Patron).filter(Patron.telegram_id == telegram_id).first()
+    patron = await session.scalar(select(Patron).where(Patron.telegram_id == telegram_id).options(*PATRON_DELETE))
     if not patron:
         raise HTTPException(status_code=404, detail="Patron not found")
 
     if patron.is_admin and admin.telegram_id != settings.superadmin_telegram_id:
         raise HTTPException(status_code=403, detail="Only superadmin can delete admin patrons")
 
-    session.delete(patron)
-    session.commit()
+    await session.run_sync(remove_patron_contributions, patron.id)
+    await session.delete(patron)
+    await session.run_sync(bump_data_version)
+    await session.commit()
+    principal_cache.invalidate(patron.id)
 
     return {"status": "success", "message": f"Patron with Telegram ID {telegram_id} has been deleted"}
 
 
 @router.get("/patrons")
-def get_all_patrons(
-    admin: Patron = Depends(admin_auth), session: Session = Depends(get_db_session)
+async def get_all_patrons(
+    timewindow_id: int | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1),
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> list[PatronWithRatingsAndRankings]:
-    patrons = session.query(Patron).all()
-    result = []
+    """
+    Patrons with their ratings and rankings, only of applications in the timewindow if `timewindow_id` is set
+    """
+    timewindow = None
+    if timewindow_id is not None:
+        timewindow = await session.get(TimeWindow, timewindow_id, options=NO_RELATIONSHIPS)
+        if timewindow is None:
+            raise HTTPException(status_code=404, detail="Timewindow not found")
+    return await session.run_sync(get_patrons_with_ratings_and_rankings, timewindow, offset, limit)
 
-    for patron in patrons:
-        db_ratings = session.query(PatronRateApplication).filter(PatronRateApplication.patron_id == patron.id).all()
-        rated_by_patron = [PatronRateApplicationResponse.model_validate(r, from_attributes=True) for r in db_ratings]
 
-        ranked_applications = (
-            session.query(PatronRanking).filter_by(patron_id=admin.id).order_by(PatronRanking.rank).all()
-        )
+@router.get("/applications/ranking")
+async def get_applications_ranking(
+    method: RankingMethod = RankingMethod.RRF,
+    rrf_k: int = Query(RRF_CONST, ge=0, description="Constant `k` of RRF, larger values flatten the top ranks"),
+    timewindow: TimeWindow | None = Depends(get_requested_timewindow),
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
+) -> list[ApplicationRankingStats]:
+    return await session.run_sync(get_aggregated_ranking_stats, timewindow, method, rrf_k)
 
-        if ranked_applications:
-            application_ids = [r.application_id for r in ranked_applications]
-            db_applications = session.query(Application).filter(Application.id.in_(application_ids)).all()
-            applications = [ApplicationResponse.model_validate(a, from_attributes=True) for a in db_applications]
-            id_x_application = {a.id: a for a in applications}
-            ranking_response = PatronRankingResponse(
-                patron_id=patron.id,
-                applications=[id_x_application[app_id] for app_id in application_ids],
-            )
-        else:
-            ranking_response = PatronRankingResponse(patron_id=patron.id, applications=[])
-
-        result.append(
-            PatronWithRatingsAndRankings(
-                patron=PatronResponse.model_validate(patron, from_attributes=True),
-                ratings=rated_by_patron,
-                ranking=ranking_response,
-            )
-        )
 
-    return [PatronWithRatingsAndRankings.model_validate(patron_data, from_attributes=True) for patron_data in result]
+@router.post("/applications/scores/rebuild")
+async def rebuild_scores_route(
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
+) -> ScoresRebuildReport:
+    """
+    Recompute RRF scores and votes of all applications from patron ratings and rankings, and report the drift
+    """
+    report = await session.run_sync(rebuild_scores)
+    await session.commit()
+    return report
 
 
-@router.get("/applications/ranking")
-def get_applications_ranking(
-    show_last_timewindow: bool = True,
-    show_only_current: bool = False,
-    current_timewindow: TimeWindow | None = Depends(get_current_timewindow),
-    last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
-) -> list[ApplicationRankingStats]:
-    if show_only_current and show_last_timewindow:
-        raise HTTPException(400, "You can only set one of `show_last_timewindow`, `show_only_current`")
-    if show_only_current and current_timewindow is None:
-        raise HTTPException(400, "No current timewindow")
-    if show_last_timewindow and last_timewindow is None:
-        raise HTTPException(400, "No last timewindow")
-
-    applications = session.query(Application).all()
-    if show_only_current:
-        applications = list(
-            filter(
-                lambda application: current_timewindow.start <= application.submitted_at <= current_timewindow.end,
-                applications,
-            )
-        )
-    if show_last_timewindow:
-        applications = list(
-            filter(
-                lambda application: last_timewindow.start <= application.submitted_at <= last_timewindow.end,
-                applications,
-            )
-        )
+def _write_export(timewindow: TimeWindow | None, export_format: ExportFormat, path: Path) -> None:
+    with SessionLocal() as session:
+        write_export(session, timewindow, export_format, path)
 
-    result = []
-
-    rrf_const = 60  # 60 is a common constant for rrf
-
-    for application in applications:
-        rankings = session.query(PatronRanking).filter(PatronRanking.application_id == application.id).all()
-
-        rrf_score = 0
-        if rankings:
-            rrf_score = sum(1 / (rrf_const + ranking.rank + 1) for ranking in rankings)
-
-        votes = session.query(PatronRateApplication).filter(PatronRateApplication.application_id == application.id).all()
-        positive_votes = sum(1 for v in votes if v.rate == Rating.POSITIVE)
-        negative_votes = sum(1 for v in votes if v.rate == Rating.NEGATIVE)
-        neutral_votes = sum(1 for v in votes if v.rate == Rating.NEUTRAL)
-        unrated = sum(1 for v in votes if v.rate == Rating.UNRATED)
-        total_votes = len(votes) - unrated
-
-        result.append(
-            ApplicationRankingStats(
-                application=ApplicationResponse.model_validate(application, from_attributes=True),
-                rrf_score=rrf_score,
-                positive_votes=positive_votes,
-                negative_votes=negative_votes,
-                neutral_votes=neutral_votes,
-                total_votes=total_votes
-            )
-        )
 
-    result.sort(key=lambda x: x.rrf_score, reverse=True)
-    return [ApplicationRankingStats.model_validate(application, from_attributes=True) for application in result]
+@router.get("/applications/export")
+async def export_applications(
+    export_format: ExportFormat = Query(ExportFormat.XLSX, alias="format"),
+    timewindow: TimeWindow | None = Depends(get_requested_timewindow),
+    _: Principal = Depends(admin_auth),
+) -> Response:
+    """
+    Export applications ranking: XLSX workbook, CSV or NDJSON rows, or Parquet rating matrix
+    """
+    if not export_available(export_format):
+        raise HTTPException(501, f"Export to {export_format} is not available on this server")
 
+    filename = f"applications_ranking_{datetime.now(UTC).strftime('%Y_%m_%d__%H_%M_%S')}.{export_format}"
 
-@router.get("/applications/export")
-def export_applications(
-    show_last_timewindow: bool = True,
-    show_only_current: bool = False,
-    current_timewindow: TimeWindow | None = Depends(get_current_timewindow),
-    last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
-) -> StreamingResponse:
-    applications = session.query(Application).all()
-    all_rankings = session.query(PatronRanking).all()
-    all_patrons = session.query(Patron).all()
-
-    if show_only_current and show_last_timewindow:
-        raise HTTPException(400, "You can only set one of `show_last_timewindow`, `show_only_current`")
-    if show_only_current and current_timewindow is None:
-        raise HTTPException(400, "No current timewindow")
-    if show_last_timewindow and last_timewindow is None:
-        raise HTTPException(400, "No last timewindow")
-
-    if show_only_current:
-        applications = list(
-            filter(
-                lambda application: current_timewindow.start <= application.submitted_at <= current_timewindow.end,
-                applications,
-            )
-        )
-        all_rankings = list(
-            filter(
-                lambda ranking: current_timewindow.start <= ranking.application.submitted_at <= current_timewindow.end,
-                all_rankings,
-            )
-        )
-    if show_last_timewindow:
-        applications = list(
-            filter(
-                lambda application: last_timewindow.start <= application.submitted_at <= last_timewindow.end,
-                applications,
-            )
-        )
-        all_rankings = list(
-            filter(
-                lambda ranking: last_timewindow.start <= ranking.application.submitted_at <= last_timewindow.end,
-                all_rankings,
-            )
-        )
+    # exports read the whole timewindow, so they run in the threadpool with a synchronous session
+    if export_format in (ExportFormat.CSV, ExportFormat.NDJSON):
+        iter_lines = iter_csv if export_format == ExportFormat.CSV else iter_ndjson
 
-    applicants_data = []
-
-    rrf_const = 60 # 60 is a common constant for rrf
-
-    for application in applications:
-        rankings = filter(lambda ranking: ranking.application_id == application.id, all_rankings)
-
-        rrf_score = 0
-        if rankings:
-            rrf_score = sum(1 / (rrf_const + ranking.rank + 1) for ranking in rankings)
-
-        votes = session.query(PatronRateApplication).filter(PatronRateApplication.application_id == application.id).all()
-        positive_votes = sum(1 for v in votes if v.rate == Rating.POSITIVE)
-        negative_votes = sum(1 for v in votes if v.rate == Rating.NEGATIVE)
-        neutral_votes = sum(1 for v in votes if v.rate == Rating.NEUTRAL)
-
-        applicants_data.append(
-            {
-                "ID": application.id,
-                "Email": application.email,
-                "Full Name": application.full_name,
-                "Submitted At": application.submitted_at.replace(tzinfo=None),
-                "RRF Score": rrf_score,
-                "Positive Votes": positive_votes,
-                "Negative Votes": negative_votes,
-                "Neutral Votes": neutral_votes,
-                "Total Votes": len(votes),
-                "Has CV": bool(application.cv),
-                "Has Transcript": bool(application.transcript),
-                "Has Motivational Letter": bool(application.motivational_letter),
-                "Has Recommendation Letter": bool(application.recommendation_letter),
-                "Has Almost A Student": bool(application.almost_a_student),
-            }
-        )
+        def lines():
+            with SessionLocal() as session:
+                yield from iter_lines(session, timewindow)
 
-    applicants_df = pd.DataFrame(applicants_data)
-    applicants_df = applicants_df.sort_values("RRF Score", ascending=False)
+        return StreamingResponse(
+            lines(),
+            media_type=export_format.media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
 
-    rankings_data = []
+    # xlsxwriter and pyarrow need a seekable file to build the archive, so it is written to disk and streamed from there
+    with NamedTemporaryFile(suffix=f".{export_format}", delete=False) as file:
+        path = Path(file.name)
+    try:
+        await run_in_threadpool(_write_export, timewindow, export_format, path)
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+
+    return FileResponse(
+        path,
+        media_type=export_format.media_type,
+        filename=filename,
+        background=BackgroundTask(path.unlink, missing_ok=True),
+    )
 
-    for patron in all_patrons:
-        ranks = session.query(PatronRanking).filter(PatronRanking.patron_id == patron.id).all()
-        ranks.sort(key=lambda x: x.rank)
 
-        row = {"patron": patron.telegram_data.get("username", f"id: {patron.id}")}
-        for i, ranking in enumerate(ranks, start=1):
-            application = session.query(Application).filter(Application.id == ranking.application_id).one()
-            row[str(i)] = application.email
-        rankings_data.append(row)
+@router.post("/exports", status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    data: CreateExportRequest,
+    current_timewindow: TimeWindow | None = Depends(get_current_timewindow),
+    last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
+) -> ExportJobResponse:
+    """
+    Start export in the background, or return the cached one if the data has not changed since it was built
+    """
+    timewindow = resolve_timewindow(
+        data.show_last_timewindow, data.show_only_current, current_timewindow, last_timewindow
+    )
+    if not export_available(data.format):
+        raise HTTPException(501, f"Export to {data.format} is not available on this server")
 
-    rankings_df = pd.DataFrame(rankings_data)
+    job = await session.run_sync(export_jobs.submit, timewindow, data.format)
+    return job.to_response()
 
 
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        applicants_df.to_excel(writer, sheet_name='Applications Ranking', index=False)
-        rankings_df.to_excel(writer, sheet_name='Rankings', index=False)
+@router.get("/exports/{job_id}")
+def get_export_job(job_id: str, _: Principal = Depends(admin_auth)) -> ExportJobResponse:
+    job = export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Export job not found")
+    return job.to_response()
 
-    output.seek(0)
 
-    filename = f"applications_ranking_{datetime.now(UTC).strftime('%Y_%m_%d__%H_%M_%S')}.xlsx"
-    headers = {
-        'Content-Disposition': f'attachment; filename="{filename}"'
-    }
+@router.get("/exports/{job_id}/download")
+def download_export(job_id: str, _: Principal = Depends(admin_auth)) -> FileResponse:
+    job = export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Export job not found")
+    if job.status != ExportJobStatus.DONE:
+        raise HTTPException(409, f"Export job is {job.status}")
+    if not job.path.exists():
+        raise HTTPException(410, "Export artifact was evicted, start a new export")
 
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers
-    )
+    filename = f"applications_ranking_{job.finished_at.strftime('%Y_%m_%d__%H_%M_%S')}.{job.format}"
+    return FileResponse(job.path, media_type=job.format.media_type, filename=filename)
 
 
 @router.delete("/applications/delete/{application_id}")
-def delete_application(
+async def delete_application(
     application_id: str,
-    session: Session = Depends(get_db_session),
-    _: Patron = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
+    _: Principal = Depends(admin_auth),
 ):
-    application = session.query(Application).get(application_id)
+    application = await session.get(Application, application_id, options=APPLICATION_DELETE)
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
 
-    session.delete(application)
-    session.commit()
+    await session.run_sync(apply_application_removal, {application.id})
+    await session.delete(application)
+    await session.run_sync(bump_data_version)
+    await session.commit()
     return {"status": "success", "message": f"Application with ID {application_id} has been deleted"}
 
 
 @router.get("/stats")
-def get_statistics(
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
+async def get_statistics(
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
     days: int = Query(30, description="Number of days to include in the activity charts"),
 ) -> OverallStats:
     end_date = datetime.now(UTC)
     start_date = end_date - timedelta(days=days)
 
-    total_patrons = session.query(Patron).count()
-    total_applications = session.query(Application).filter(Application.submitted_at >= start_date).count()
+    total_patrons = await session.scalar(select(func.count(Patron.id)))
+    total_applications = await session.scalar(
+        select(func.count(Application.id)).where(Application.submitted_at >= start_date)
+    )
 
-    applications_query = (
-        session.query(func.date(Application.submitted_at).label("date"), func.count(Application.id).label("count"))
-        .filter(func.date(Application.submitted_at) >= start_date)
+    applications_query = await session.execute(
+        select(func.date(Application.submitted_at).label("date"), func.count(Application.id).label("count"))
+        .where(func.date(Application.submitted_at) >= start_date)
         .group_by(func.date(Application.submitted_at))
         .order_by(func.date(Application.submitted_at))
     )
@@ -340,23 +299,19 @@ def get_statistics(
         DailyApplicationStats(date=row.date, applications_received=row.count) for row in applications_query
     ]
 
-    patron_activity_query = (
-        session.query(
+    patron_activity_query = await session.execute(
+        select(
             PatronDailyStats.date,
             func.sum(PatronDailyStats.rating_count).label("rating_count"),
             func.sum(PatronDailyStats.ranking_count).label("ranking_count"),
         )
-        .filter(PatronDailyStats.date >= start_date.date())
+        .where(PatronDailyStats.date >= start_date.date())
         .group_by(PatronDailyStats.date)
         .order_by(PatronDailyStats.date)
     )
 
     patron_activity_by_day = [
-        DailyPatronStats(
-            date=row.date,
-            rating_count=row.rating_count,
-            ranking_count=row.ranking_count
-        )
+        DailyPatronStats(date=row.date, rating_count=row.rating_count, ranking_count=row.ranking_count)
         for row in patron_activity_query
     ]
 
@@ -371,24 +326,26 @@ def get_statistics(
 
 
 @router.get("/patron-stats/{telegram_id}")
-def get_patron_stats_route(
+async def get_patron_stats_route(
     telegram_id: str,
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
     days: int = Query(30, description="Number of days to include in the activity charts"),
 ) -> PatronStats:
-    patron = session.query(Patron).filter(Patron.telegram_id == telegram_id).first()
+    patron = await session.scalar(select(Patron).where(Patron.telegram_id == telegram_id).options(*NO_RELATIONSHIPS))
     if not patron:
         raise HTTPException(status_code=404, detail="Patron not found")
 
-    total_ratings = session.query(PatronRateApplication).filter(PatronRateApplication.patron_id == patron.id).count()
+    total_ratings = await session.scalar(
+        select(func.count()).select_from(PatronRateApplication).where(PatronRateApplication.patron_id == patron.id)
+    )
 
     end_date = datetime.now(UTC).date()
     start_date = end_date - timedelta(days=days)
 
-    activity_query = (
-        session.query(PatronDailyStats.date, PatronDailyStats.rating_count, PatronDailyStats.ranking_count)
-        .filter(PatronDailyStats.patron_id == patron.id, PatronDailyStats.date >= start_date)
+    activity_query = await session.execute(
+        select(PatronDailyStats.date, PatronDailyStats.rating_count, PatronDailyStats.ranking_count)
+        .where(PatronDailyStats.patron_id == patron.id, PatronDailyStats.date >= start_date)
         .order_by(PatronDailyStats.date)
     )
 
@@ -397,21 +354,17 @@ def get_patron_stats_route(
         for row in activity_query
     ]
 
-    stats = PatronStats(
-        patron_id=patron.id,
-        total_ratings=total_ratings,
-        activity_by_day=activity_by_day
-    )
+    stats = PatronStats(patron_id=patron.id, total_ratings=total_ratings, activity_by_day=activity_by_day)
 
     return PatronStats.model_validate(stats, from_attributes=True)
 
 
 @router.put("/promote")
-def promote_patron(
+async def promote_patron(
     patron_telegram_id: str,
     is_admin: bool,
-    admin: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
+    admin: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> PatronResponse:
     """
     Change admin status of existing patron. Only accessible by superadmins
@@ -422,20 +375,23 @@ def promote_patron(
     if admin.telegram_id == patron_telegram_id:
         raise HTTPException(status_code=403, detail="Cannot change your own admin status")
 
-    patron = session.query(Patron).filter(Patron.telegram_id == patron_telegram_id).first()
+    patron = await session.scalar(
+        select(Patron).where(Patron.telegram_id == patron_telegram_id).options(*NO_RELATIONSHIPS)
+    )
     if patron is None:
         raise HTTPException(status_code=404, detail="Patron not found")
 
     patron.is_admin = is_admin
-    session.commit()
+    await session.commit()
+    principal_cache.invalidate(patron.id)
     return PatronResponse.model_validate(patron, from_attributes=True)
 
 
 @router.post("/create-timewindow", status_code=status.HTTP_201_CREATED)
-def create_timewindow_route(
+async def create_timewindow_route(
     data: CreateTimeWindowRequest,
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> TimeWindowResponse:
     """
     Create timewindow during which applications can be sent
@@ -446,13 +402,15 @@ def create_timewindow_route(
     if start_utc >= end_utc:
         raise HTTPException(status_code=400, detail="Timewindow start must be before end")
 
-    overlapping = session.query(TimeWindow).filter(
-        TimeWindow.start <= end_utc,
-        TimeWindow.end >= start_utc
-    ).first()
+    overlapping = await session.scalar(
+        select(TimeWindow).where(TimeWindow.start <= end_utc, TimeWindow.end >= start_utc).options(*NO_RELATIONSHIPS)
+    )
 
     if overlapping:
-        raise HTTPException(status_code=400, detail=f"New time window overlaps with existing one ({overlapping.title}, start: {overlapping.start}, end: {overlapping.end})")
+        raise HTTPException(
+            status_code=400,
+            detail=f"New time window overlaps with existing one ({overlapping.title}, start: {overlapping.start}, end: {overlapping.end})",
+        )
 
     new_timewindow = TimeWindow(
         title=data.title,
@@ -460,22 +418,23 @@ def create_timewindow_route(
         end=end_utc,
     )
     session.add(new_timewindow)
-    session.commit()
+    await session.commit()
+    timewindow_registry.invalidate()
     return TimeWindowResponse.model_validate(new_timewindow, from_attributes=True)
 
 
 @router.get("/timewindows")
-def get_timewindows(
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
+async def get_timewindows(
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> list[TimeWindowResponse]:
-    timewindows = session.query(TimeWindow).all()
+    timewindows = await session.scalars(select(TimeWindow).options(*NO_RELATIONSHIPS))
     return [TimeWindowResponse.model_validate(tw, from_attributes=True) for tw in timewindows]
 
 
 @router.get("/timewindows/current")
-def get_current_timewindows(
-    _: Patron = Depends(admin_auth),
+async def get_current_timewindows(
+    _: Principal = Depends(admin_auth),
     current_timewindow: TimeWindow | None = Depends(get_current_timewindow),
 ) -> TimeWindowResponse:
     if current_timewindow is None:
@@ -484,57 +443,95 @@ def get_current_timewindows(
 
 
 @router.get("/timewindows/{timewindow_id}")
-def get_one_timewindow(
+async def get_one_timewindow(
     timewindow_id: int,
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> TimeWindowResponse:
-    timewindow = session.query(TimeWindow).get(timewindow_id)
+    timewindow = await session.get(TimeWindow, timewindow_id, options=NO_RELATIONSHIPS)
     if not timewindow:
         raise HTTPException(status_code=404, detail="Timewindow not found")
     return TimeWindowResponse.model_validate(timewindow, from_attributes=True)
 
 
+@router.get("/timewindows/{timewindow_id}/documents.zip", response_class=StreamingResponse)
+async def download_timewindow_documents(
+    timewindow_id: int,
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
+) -> StreamingResponse:
+    """
+    Documents of all applications submitted during the timewindow as a ZIP archive, a folder per applicant
+    """
+    timewindow = await session.get(TimeWindow, timewindow_id, options=NO_RELATIONSHIPS)
+    if not timewindow:
+        raise HTTPException(status_code=404, detail="Timewindow not found")
+    applications = await session.execute(
+        select(*DOCUMENT_ROW_COLUMNS).where(timewindow_filter(timewindow)).order_by(Application.email)
+    )
+    documents = [
+        document
+        for application in applications
+        for document in application_documents(application, settings.files_dir, folder=True)
+    ]
+    # the archive is built in the threadpool while it is sent
+    return StreamingResponse(
+        iter_zip(documents),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="timewindow_{timewindow_id}_documents.zip"'},
+    )
+
+
 @router.delete("/timewindows/{timewindow_id}")
-def delete_timewindow(
+async def delete_timewindow(
     timewindow_id: int,
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
 ):
-    timewindow = session.query(TimeWindow).get(timewindow_id)
+    timewindow = await session.get(TimeWindow, timewindow_id, options=TIMEWINDOW_DELETE)
     if not timewindow:
         raise HTTPException(status_code=404, detail="Timewindow not found")
 
-    session.delete(timewindow)
-    session.commit()
+    await session.run_sync(apply_application_removal, {application.id for application in timewindow.applications})
+    await session.delete(timewindow)
+    await session.run_sync(bump_data_version)
+    await session.commit()
+    timewindow_registry.invalidate()
     return {"status": "success", "message": f"Timewindow with ID {timewindow_id} has been deleted"}
 
 
 @router.patch("/timewindows/{timewindow_id}")
-def update_timewindow(
+async def update_timewindow(
     timewindow_id: int,
     data: EditTimeWindowRequest,
-    _: Patron = Depends(admin_auth),
-    session: Session = Depends(get_db_session),
+    _: Principal = Depends(admin_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> TimeWindowResponse:
     start_utc = data.start.astimezone(UTC) if data.start else None
     end_utc = data.end.astimezone(UTC) if data.end else None
 
-    timewindow = session.query(TimeWindow).get(timewindow_id)
+    timewindow = await session.get(TimeWindow, timewindow_id, options=NO_RELATIONSHIPS)
     if not timewindow:
         raise HTTPException(status_code=404, detail="Timewindow not found")
 
     if (start_utc or timewindow.start) >= (end_utc or timewindow.end):
         raise HTTPException(status_code=400, detail="Timewindow start must be before end")
 
-    overlapping = session.query(TimeWindow).filter(
-        TimeWindow.id != timewindow_id,
-        TimeWindow.start <= (end_utc or timewindow.end),
-        TimeWindow.end >= (start_utc or timewindow.start),
-    ).first()
+    overlapping = await session.scalar(
+        select(TimeWindow)
+        .where(
+            TimeWindow.id != timewindow_id,
+            TimeWindow.start <= (end_utc or timewindow.end),
+            TimeWindow.end >= (start_utc or timewindow.start),
+        )
+        .options(*NO_RELATIONSHIPS)
+    )
 
     if overlapping:
-        raise HTTPException(status_code=400, detail=f"New time window overlaps with existing one ({overlapping.title}, start: {overlapping.start}, end: {overlapping.end})")
+        raise HTTPException(
+            status_code=400,
+            detail=f"New time window overlaps with existing one ({overlapping.title}, start: {overlapping.start}, end: {overlapping.end})",
+        )
 
     if data.title is not None:
         timewindow.title = data.title
@@ -543,5 +540,6 @@ def update_timewindow(
     if end_utc is not None:
         timewindow.end = end_utc
 
-    session.commit()
+    await session.commit()
+    timewindow_registry.invalidate()
     return TimeWindowResponse.model_validate(timewindow, from_attributes=True)
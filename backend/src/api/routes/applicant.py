@@ -1,15 +1,30 @@
-import os
+import asyncio
+from functools import partial
+from pathlib import Path
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, Form, HTTPException, Request
 from fastapi_derive_responses import AutoDeriveResponsesAPIRoute
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from src.api.forms import SubmitForm
 from src.config import settings
-from src.db.models import Application, TimeWindow
-from src.dependencies import get_current_timewindow, get_db_session
-from src.schemas import ApplicationResponse
+from src.db.loaders import APPLICATION_RESPONSE
+from src.db.models import Application, ApplicationScore, TimeWindow
+from src.dependencies import get_current_timewindow, get_db_session, get_write_queue
+from src.schemas import ApplicationResponse, SearchDocumentKind
+from src.services import (
+    WriteQueue,
+    bump_data_version,
+    discard_staged_uploads,
+    extract_pdf_text,
+    finish_staged_uploads,
+    set_search_texts,
+    stage_blob,
+)
 
 router = APIRouter(
     prefix="/applicant",
@@ -17,13 +32,99 @@ router = APIRouter(
     route_class=AutoDeriveResponsesAPIRoute,
 )
 
+SEARCHED_DOCUMENTS = {
+    "cv.pdf": SearchDocumentKind.CV,
+    "motivational-letter.pdf": SearchDocumentKind.MOTIVATIONAL_LETTER,
+}
+"Documents whose text is extracted on upload for the search index"
+
+
+def _check_can_submit(
+    email: str, existing: Application | None, application_same_sessions_and_tw: int, session_id: str | None
+) -> None:
+    """
+    An applicant updates only their own application and submits one per timewindow
+    """
+    if existing is not None and existing.session_id != session_id:
+        raise HTTPException(
+            400, f"Application with email {email} already exists in this timewindow and belongs to another user"
+        )
+    # check if applicant has already submitted an application
+    if (application_same_sessions_and_tw >= 1 and existing is None) or application_same_sessions_and_tw > 1:
+        raise HTTPException(400, "You have already submitted an application for this timewindow")
+
+
+def _save_application(
+    session: Session,
+    email: str,
+    full_name: str,
+    session_id: str | None,
+    timewindow_id: int,
+    on_fs_filenames: dict[str, str | None],
+    document_texts: dict[SearchDocumentKind, str],
+) -> ApplicationResponse:
+    """
+    Unit of work for the write queue. The checks of the request are repeated here: units run one at a time,
+    so a concurrent submission of the same email from another session cannot pass them too
+    """
+    existing = session.scalar(
+        select(Application).where(Application.email == email, Application.timewindow_id == timewindow_id)
+    )
+    application_same_sessions_and_tw = session.scalar(
+        select(func.count(Application.id)).where(
+            Application.session_id == session_id, Application.timewindow_id == timewindow_id
+        )
+    )
+    _check_can_submit(email, existing, application_same_sessions_and_tw, session_id)
+    if existing is None:
+        application = Application(
+            email=email,
+            session_id=session_id,
+            full_name=full_name,
+            cv=on_fs_filenames["cv.pdf"],
+            transcript=on_fs_filenames["transcript.xlsx"],
+            motivational_letter=on_fs_filenames["motivational-letter.pdf"],
+            recommendation_letter=on_fs_filenames["recommendation-letter.pdf"],
+            almost_a_student=on_fs_filenames["almost-a-student.pdf"],
+            timewindow_id=timewindow_id,
+            score=ApplicationScore(),
+        )
+        session.add(application)
+    else:
+        existing.full_name = full_name
+        if on_fs_filenames["cv.pdf"]:
+            existing.cv = on_fs_filenames["cv.pdf"]
+        if on_fs_filenames["transcript.xlsx"]:
+            existing.transcript = on_fs_filenames["transcript.xlsx"]
+        if on_fs_filenames["motivational-letter.pdf"]:
+            existing.motivational_letter = on_fs_filenames["motivational-letter.pdf"]
+        if on_fs_filenames["recommendation-letter.pdf"]:
+            existing.recommendation_letter = on_fs_filenames["recommendation-letter.pdf"]
+        if on_fs_filenames["almost-a-student.pdf"]:
+            existing.almost_a_student = on_fs_filenames["almost-a-student.pdf"]
+        application = existing
+
+    bump_data_version(session)
+    session.flush()
+    set_search_texts(
+        session,
+        [
+            (application.id, None, SearchDocumentKind.APPLICANT, f"{full_name} {email}"),
+            *((application.id, None, kind, text) for kind, text in document_texts.items()),
+        ],
+    )
+    # load `submitted_at` set by the database
+    session.refresh(application)
+    return ApplicationResponse.model_validate(application, from_attributes=True)
+
 
 @router.post("/submit")
 async def submit_application_route(
     request: Request,
     form: Annotated[SubmitForm, Form(media_type="multipart/form-data")],
-    session: Session = Depends(get_db_session),
+    session: AsyncSession = Depends(get_db_session),
     timewindow: TimeWindow | None = Depends(get_current_timewindow),
+    writer: WriteQueue = Depends(get_write_queue),
 ) -> ApplicationResponse:
     """
     Submit an application or update an existing one (if the email is the same)
@@ -32,28 +133,20 @@ async def submit_application_route(
         raise HTTPException(status_code=400, detail="Submission is currently closed")
 
     # check if application with such email already exists
-    existing = (
-        session.query(Application)
-        .filter(
+    # checked again by the write, here to reject the request before the files are stored
+    existing = await session.scalar(
+        select(Application).where(
             Application.email == form.email,
             Application.timewindow_id == timewindow.id,
         )
-        .first()
     )
-    if existing is not None and existing.session_id != request.session.get("session_id"):
-        raise HTTPException(400, f"Application with email {form.email} already exists in this timewindow and belongs to another user")
-
-    # check if applicant has already submitted an application
-    application_same_sessions_and_tw = (
-        session.query(Application)
-        .filter(
+    application_same_sessions_and_tw = await session.scalar(
+        select(func.count(Application.id)).where(
             Application.session_id == request.session.get("session_id"),
             Application.timewindow_id == timewindow.id,
         )
-        .count()
     )
-    if (application_same_sessions_and_tw >= 1 and existing is None) or application_same_sessions_and_tw > 1:
-        raise HTTPException(400, "You have already submitted an application for this timewindow")
+    _check_can_submit(form.email, existing, application_same_sessions_and_tw, request.session.get("session_id"))
 
     if form.cv_file is None or form.motivational_letter_file is None:
         raise HTTPException(status_code=400, detail="CV, and motivational letter files are required")
@@ -72,7 +165,10 @@ async def submit_application_route(
         "recommendation-letter.pdf": "application/pdf",
         "almost-a-student.pdf": "application/pdf",
     }
+    max_file_size = settings.upload_max_file_size_mb * 1024 * 1024
 
+    # check every file before writing any of them
+    uploads = []
     for uploaded, filename_template in [
         (form.cv_file, "cv.pdf"),
         (form.transcript_file, "transcript.xlsx"),
@@ -82,59 +178,70 @@ async def submit_application_route(
     ]:
         if uploaded is None:
             continue
-        filename = filename_template.format(email=form.email)
         # check if file is in correct type
         needed_content_type = needed_content_types[filename_template]
         if uploaded.content_type != needed_content_type:
             raise HTTPException(
                 400, f"File {uploaded.filename} should be of type {needed_content_type} but is {uploaded.content_type}"
             )
-
-        file_path = settings.files_dir / form.email / filename
-        os.makedirs(file_path.parent, exist_ok=True)
-        file_path.write_bytes(uploaded.file.read())
-        uploaded.file.close()
-        on_fs_filenames[filename_template] = file_path.relative_to(settings.files_dir).as_posix()
-
-    # save application to database
-    if existing is None:
-        application = Application(
-            email=form.email,
-            session_id=request.session.get("session_id"),
-            full_name=form.full_name,
-            cv=on_fs_filenames["cv.pdf"],
-            transcript=on_fs_filenames["transcript.xlsx"],
-            motivational_letter=on_fs_filenames["motivational-letter.pdf"],
-            recommendation_letter=on_fs_filenames["recommendation-letter.pdf"],
-            almost_a_student=on_fs_filenames["almost-a-student.pdf"],
-            timewindow_id=timewindow.id,
+        if uploaded.size is not None and uploaded.size > max_file_size:
+            raise HTTPException(413, f"File {uploaded.filename} is larger than {settings.upload_max_file_size_mb} MB")
+        uploads.append((uploaded, filename_template))
+
+    # files are stored as blobs named by their sha256, identical files only once. New blobs are copied
+    # to temporary files off the event loop and moved into place only after the commit
+    staged: dict[Path, Path] = {}  # temporary path -> destination
+    document_texts: dict[SearchDocumentKind, str] = {}
+    try:
+        for uploaded, filename_template in uploads:
+            try:
+                relative_path, staged_path = await run_in_threadpool(
+                    stage_blob, uploaded.file, settings.files_dir, Path(filename_template).suffix, max_file_size
+                )
+                # text of a re-uploaded identical document is indexed already
+                kind = SEARCHED_DOCUMENTS.get(filename_template)
+                if kind is not None and (existing is None or getattr(existing, kind.value) != relative_path.as_posix()):
+                    uploaded.file.seek(0)
+                    document_texts[kind] = await run_in_threadpool(extract_pdf_text, uploaded.file)
+            except ValueError as e:
+                raise HTTPException(413, f"File {uploaded.filename}: {e}")
+            finally:
+                await uploaded.close()
+            if staged_path is not None:
+                staged[staged_path] = settings.files_dir / relative_path
+            on_fs_filenames[filename_template] = relative_path.as_posix()
+
+        future = writer.submit(
+            partial(
+                _save_application,
+                email=form.email,
+                full_name=form.full_name,
+                session_id=request.session.get("session_id"),
+                timewindow_id=timewindow.id,
+                on_fs_filenames=on_fs_filenames,
+                document_texts=document_texts,
+            )
         )
-        session.add(application)
-    else:
-        existing.full_name = form.full_name
-        if on_fs_filenames["cv.pdf"]:
-            existing.cv = on_fs_filenames["cv.pdf"]
-        if on_fs_filenames["transcript.xlsx"]:
-            existing.transcript = on_fs_filenames["transcript.xlsx"]
-        if on_fs_filenames["motivational-letter.pdf"]:
-            existing.motivational_letter = on_fs_filenames["motivational-letter.pdf"]
-        if on_fs_filenames["recommendation-letter.pdf"]:
-            existing.recommendation_letter = on_fs_filenames["recommendation-letter.pdf"]
-        if on_fs_filenames["almost-a-student.pdf"]:
-            existing.almost_a_student = on_fs_filenames["almost-a-student.pdf"]
-        application = existing
-
-    session.commit()
-
-    return ApplicationResponse.model_validate(application, from_attributes=True)
+    except BaseException:
+        await run_in_threadpool(discard_staged_uploads, staged)
+        raise
+    future.add_done_callback(partial(finish_staged_uploads, staged))
+    return await asyncio.wrap_future(future)
 
 
 @router.get("/my-application")
-async def my_application_route(request: Request, session: Session = Depends(get_db_session)) -> ApplicationResponse:
+async def my_application_route(
+    request: Request, session: AsyncSession = Depends(get_db_session)
+) -> ApplicationResponse:
     """
     Get the applications of the current user
     """
-    application = session.query(Application).filter(Application.session_id == request.session.get("session_id")).first()
+    application = await session.scalar(
+        select(Application)
+        .where(Application.session_id == request.session.get("session_id"))
+        .limit(1)
+        .options(*APPLICATION_RESPONSE)
+    )
     if application is None:
         raise HTTPException(404, "Application not found")
     return ApplicationResponse.model_validate(application, from_attributes=True)
@@ -3,7 +3,8 @@ import os
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi_derive_responses import AutoDeriveResponsesAPIRoute
 from pydantic import SecretStr
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import HTMLResponse
 
 import src.logging_  # noqa: F401
@@ -13,6 +14,7 @@ from src.db.models import Patron
 from src.dependencies import get_db_session
 from src.logging_ import logger
 from src.schemas import PatronResponse
+from src.services import bump_data_version, principal_cache
 
 router = APIRouter(
     prefix="/auth",
@@ -20,11 +22,11 @@ router = APIRouter(
     route_class=AutoDeriveResponsesAPIRoute,
 )
 
+
 @router.get("/telegram-widget.html", response_class=HTMLResponse)
 async def telegram_widget(request: Request):
     callback_url = request.url_for("telegram_callback")
-    me_url       = request.url_for("get_me_route")
-
+    me_url = request.url_for("get_me_route")
 
     content = f"""
     <!DOCTYPE html>
@@ -112,14 +114,13 @@ async def telegram_widget(request: Request):
     </body>
     </html>
     """
-    return HTMLResponse(
-        content,
-        headers={"Content-Security-Policy": "frame-ancestors *"}
-    )
+    return HTMLResponse(content, headers={"Content-Security-Policy": "frame-ancestors *"})
 
 
 @router.post("/telegram-callback")
-async def telegram_callback(request: Request, invite_secret: str | None = None, session: Session = Depends(get_db_session)) -> PatronResponse | None:
+async def telegram_callback(
+    request: Request, invite_secret: str | None = None, session: AsyncSession = Depends(get_db_session)
+) -> PatronResponse | None:
     _dict = request.query_params._dict.copy()
     _dict.pop("invite_secret", None)
     result = telegram_check(_dict)
@@ -127,15 +128,19 @@ async def telegram_callback(request: Request, invite_secret: str | None = None,
         raise HTTPException(status_code=403, detail="Telegram data verification failed")
 
     telegram_id = result.telegram_user["id"]
-    patron = session.query(Patron).filter(Patron.telegram_id == telegram_id).first()
+    patron = await session.scalar(select(Patron).where(Patron.telegram_id == telegram_id))
     if patron is not None:
         logger.info(f"Patron {patron.id} authenticated")
         # update existing patron
-        patron.telegram_data = result.telegram_user
-        session.commit()
+        if patron.telegram_data != result.telegram_user:
+            patron.telegram_data = result.telegram_user
+            await session.run_sync(bump_data_version)
+        await session.commit()
     else:
         if os.getenv("ENABLE_REGISTRATION") is None:
-            raise HTTPException(status_code=403, detail="Registration of new patrons is temporary disabled")  # Temporary disable creation of new patron accounts
+            raise HTTPException(
+                status_code=403, detail="Registration of new patrons is temporary disabled"
+            )  # Temporary disable creation of new patron accounts
         if invite_secret != settings.invite_secret_string.get_secret_value():
             raise HTTPException(status_code=403, detail="Invalid invite string")
 
@@ -148,9 +153,12 @@ async def telegram_callback(request: Request, invite_secret: str | None = None,
             is_admin=False,
         )
         session.add(new_patron)
-        session.commit()
+        await session.run_sync(bump_data_version)
+        await session.commit()
         patron = new_patron
 
+    principal_cache.invalidate(patron.id)
+
     # Set session cookie
     request.session["patron_id"] = patron.id
 
@@ -158,8 +166,10 @@ async def telegram_callback(request: Request, invite_secret: str | None = None,
 
 
 @router.post("/login-by-password")
-async def login_by_password(request: Request, telegram_id: str, password: SecretStr, session: Session = Depends(get_db_session)) -> PatronResponse | None:
-    existing_patron = session.query(Patron).filter(Patron.telegram_id == telegram_id).first()
+async def login_by_password(
+    request: Request, telegram_id: str, password: SecretStr, session: AsyncSession = Depends(get_db_session)
+) -> PatronResponse | None:
+    existing_patron = await session.scalar(select(Patron).where(Patron.telegram_id == telegram_id))
     if existing_patron is not None:
         if f"{telegram_id}_{settings.secret_key.get_secret_value()}" == password.get_secret_value():
             logger.info(f"Patron {existing_patron.id} authenticated")
@@ -1,15 +1,19 @@
 import os
+import stat
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from urllib.parse import quote
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi_derive_responses import AutoDeriveResponsesAPIRoute
-from starlette.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
 
-import src.logging_  # noqa: F401
 from src.config import settings
-from src.db.models import Patron
-from src.dependencies import patron_auth
-from src.logging_ import logger
+from src.dependencies import get_db_session, patron_auth
+from src.services import BLOBS_DIR, Principal, document_owner_query, download_name
 
 router = APIRouter(
     prefix="/files",
@@ -25,13 +29,40 @@ def is_subpath(subpath: Path, path: Path) -> bool:
     return os.path.commonpath([parent_path]) == os.path.commonpath([parent_path, child_path])
 
 
+def is_not_modified(request_headers: Headers, response_headers: Headers) -> bool:
+    """
+    If the client already has the file: `If-None-Match` is checked against the ETag,
+    `If-Modified-Since` only when the former is absent
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or response_headers["etag"] in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        return parsedate_to_datetime(response_headers["last-modified"]) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
 @router.get("/{relative_path:path}", response_class=FileResponse)
-def file_route(relative_path: str, request: Request, _: Patron = Depends(patron_auth)) -> FileResponse:
+async def file_route(
+    relative_path: str,
+    request: Request,
+    session: AsyncSession = Depends(get_db_session),
+    _: Principal = Depends(patron_auth),
+) -> Response:
     path = settings.files_dir / relative_path
     if not is_subpath(path, settings.files_dir):
         raise HTTPException(status_code=404, detail="Path not in static files folder.")
-    logger.info(request.headers)
-    if not path.exists():
+    # one stat for the check and the headers, off the event loop
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except OSError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
         raise HTTPException(status_code=404, detail="File not found")
 
     filename = path.parent.name + "_" + path.name
@@ -41,4 +72,44 @@ def file_route(relative_path: str, request: Request, _: Patron = Depends(patron_
     else:
         content_disposition_type = "inline"
 
-    return FileResponse(path, filename=filename, content_disposition_type=content_disposition_type)
+    headers = {}
+    if Path(relative_path).parts[:1] == BLOBS_DIR.parts:
+        # blobs are named by their content, so the same URL always returns the same file
+        owner = (await session.execute(document_owner_query(relative_path))).first()
+        filename = (owner and download_name(owner, relative_path)) or path.name
+        headers["Cache-Control"] = "private, max-age=31536000, immutable"
+        headers["ETag"] = f'"{path.stem}"'
+
+    response = FileResponse(
+        path,
+        filename=filename,
+        content_disposition_type=content_disposition_type,
+        headers=headers,
+        stat_result=stat_result,
+    )
+
+    if settings.files_accel_redirect_location is not None:
+        # nginx sends the file and answers conditional and range requests itself
+        accel_headers = {
+            name: response.headers[name]
+            for name in ("content-type", "content-disposition", "cache-control")
+            if name in response.headers
+        }
+        accel_headers["X-Accel-Redirect"] = (
+            settings.files_accel_redirect_location.rstrip("/")
+            + "/"
+            + quote(Path(os.path.relpath(path, settings.files_dir)).as_posix())
+        )
+        return Response(headers=accel_headers)
+
+    if is_not_modified(request.headers, response.headers):
+        return Response(
+            status_code=304,
+            headers={
+                name: response.headers[name]
+                for name in ("etag", "last-modified", "cache-control")
+                if name in response.headers
+            },
+        )
+    # ranges are handled by `FileResponse`
+    return response
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from fastapi_derive_responses import AutoDeriveResponsesAPIRoute
+from starlette.responses import PlainTextResponse
+
+from src.dependencies import metrics_auth
+from src.metrics import render_metrics
+
+router = APIRouter(
+    tags=["Metrics"],
+    route_class=AutoDeriveResponsesAPIRoute,
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(metrics_auth)])
+def get_metrics() -> PlainTextResponse:
+    """
+    Request latency, statuses, body sizes and SQL statements per route in the Prometheus text format
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
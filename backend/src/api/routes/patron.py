@@ -1,19 +1,59 @@
-import datetime
+from collections import Counter
+from functools import partial
+from typing import Annotated
 
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi_derive_responses import AutoDeriveResponsesAPIRoute
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from src.db.models import Application, Patron, PatronDailyStats, PatronRanking, PatronRateApplication, TimeWindow
-from src.dependencies import get_current_timewindow, get_db_session, patron_auth
+from src.config import settings
+from src.db.loaders import APPLICATION_RESPONSE, APPLICATION_RESPONSE_COLUMNS, NO_RELATIONSHIPS, RATING_RESPONSE
+from src.db.models import Application, Patron, PatronRanking, PatronRateApplication, TimeWindow
+from src.dependencies import (
+    get_current_timewindow,
+    get_db_session,
+    get_requested_timewindow,
+    get_write_queue,
+    patron_auth,
+    resolve_timewindow,
+)
 from src.dependencies.timewindow import get_last_timewindow
 from src.schemas import (
     ApplicationResponse,
+    ApplicationsQuery,
     Docs,
+    PatchRankingRequest,
     PatronRankingResponse,
     PatronRateApplicationResponse,
     PatronResponse,
+    RankingOperation,
+    RankingOperationType,
+    RateApplicationItem,
+    RateApplicationResult,
+    RateApplicationsRequest,
     Rating,
+    SearchDocumentKind,
+    SearchResult,
+)
+from src.services import (
+    DOCUMENT_ROW_COLUMNS,
+    Principal,
+    WriteQueue,
+    application_documents,
+    apply_ranking_operations,
+    apply_rating_delta,
+    comment_search_text,
+    iter_zip,
+    list_applications,
+    save_patron_ranking,
+    save_patron_ratings,
+    search_applications,
+    set_search_texts,
+    timewindow_filter,
+    update_daily_stats,
 )
 
 router = APIRouter(
@@ -23,110 +63,137 @@ router = APIRouter(
 )
 
 
-def update_daily_stats(session: Session, patron_id: int, rating_increment: int = 0, ranking_increment: int = 0):
-    today = datetime.datetime.now(datetime.UTC).date()
-
-    stats = (
-        session.query(PatronDailyStats)
-        .filter(PatronDailyStats.patron_id == patron_id, PatronDailyStats.date == today)
-        .first()
-    )
-
-    if stats:
-        stats.rating_count += rating_increment
-        stats.ranking_count += ranking_increment
-    else:
-        stats = PatronDailyStats(
-            patron_id=patron_id, rating_count=rating_increment, ranking_count=ranking_increment
-        )
-        session.add(stats)
-
-
 @router.get("/me")
-def get_me_route(patron: Patron = Depends(patron_auth)) -> PatronResponse:
+async def get_me_route(
+    principal: Principal = Depends(patron_auth), session: AsyncSession = Depends(get_db_session)
+) -> PatronResponse:
+    patron = await session.get(Patron, principal.id, options=NO_RELATIONSHIPS)
+    if patron is None:
+        raise HTTPException(status_code=403, detail="Patron with such id not found")
     return PatronResponse.model_validate(patron, from_attributes=True)
 
 
 @router.get("/me/rated-applications", generate_unique_id_function=lambda _: "get_rated_applications")
-def get_rated_applications_route(
-    show_only_current: bool = False,
-    show_last_timewindow: bool = True,
-    current_timewindow: TimeWindow | None = Depends(get_current_timewindow),
-    last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
-    patron: Patron = Depends(patron_auth),
-    session: Session = Depends(get_db_session),
+async def get_rated_applications_route(
+    timewindow: TimeWindow | None = Depends(get_requested_timewindow),
+    patron: Principal = Depends(patron_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> list[PatronRateApplicationResponse]:
-    if show_only_current and show_last_timewindow:
-        raise HTTPException(400, "You can only set one of `show_last_timewindow`, `show_only_current`")
-    if show_only_current and current_timewindow is None:
-        raise HTTPException(400, "No current timewindow")
-    if show_last_timewindow and last_timewindow is None:
-        raise HTTPException(400, "No last timewindow")
-
-    rated_by_patron = session.query(PatronRateApplication).filter(PatronRateApplication.patron_id == patron.id).all()
-    if show_only_current:
-        rated_by_patron = list(filter(lambda rate: current_timewindow.start <= rate.application.submitted_at <= current_timewindow.end, rated_by_patron))
-    if show_last_timewindow:
-        rated_by_patron = list(filter(lambda rate: last_timewindow.start <= rate.application.submitted_at <= last_timewindow.end, rated_by_patron))
+    rated_by_patron = await session.scalars(
+        select(PatronRateApplication)
+        .join(Application, Application.id == PatronRateApplication.application_id)
+        .where(PatronRateApplication.patron_id == patron.id, timewindow_filter(timewindow))
+        .options(*RATING_RESPONSE)
+    )
     return [PatronRateApplicationResponse.model_validate(r, from_attributes=True) for r in rated_by_patron]
 
 
-@router.get("/applications", generate_unique_id_function=lambda _: "get_all_applications")
-def get_all_applications_route(
-    show_last_timewindow: bool = True,
-    show_only_current: bool = False,
+@router.get(
+    "/applications",
+    generate_unique_id_function=lambda _: "get_all_applications",
+    responses={
+        200: {
+            "headers": {
+                "X-Next-Cursor": {
+                    "description": "Cursor of the next page, absent on the last one",
+                    "schema": {"type": "string"},
+                }
+            }
+        }
+    },
+)
+async def get_all_applications_route(
+    response: Response,
+    query: Annotated[ApplicationsQuery, Query()],
     current_timewindow: TimeWindow | None = Depends(get_current_timewindow),
     last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
-    _: Patron = Depends(patron_auth),
-    session: Session = Depends(get_db_session),
+    patron: Principal = Depends(patron_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> list[ApplicationResponse]:
-    if show_only_current and show_last_timewindow:
-        raise HTTPException(400, "You can only set one of `show_last_timewindow`, `show_only_current`")
-    if show_only_current and current_timewindow is None:
-        raise HTTPException(400, "No current timewindow")
-    if show_last_timewindow and last_timewindow is None:
-        raise HTTPException(400, "No last timewindow")
-
-    all_applications = session.query(Application).order_by(Application.submitted_at).all()
-    if show_only_current:
-        all_applications = list(filter(lambda application: current_timewindow.start <= application.submitted_at <= current_timewindow.end, all_applications))
-    if show_last_timewindow:
-        all_applications = list(filter(lambda application: last_timewindow.start <= application.submitted_at <= last_timewindow.end, all_applications))
-    return [ApplicationResponse.model_validate(a, from_attributes=True) for a in all_applications]
+    """
+    Applications matching the filters, by default all of them in order of submission.
+    With `limit`, the cursor of the next page is returned in the `X-Next-Cursor` header
+    """
+    timewindow = resolve_timewindow(
+        query.show_last_timewindow, query.show_only_current, current_timewindow, last_timewindow
+    )
+    try:
+        applications, next_cursor = await session.run_sync(list_applications, patron.id, query, timewindow)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return applications
 
 
 @router.get("/applications/{application_id}", generate_unique_id_function=lambda _: "get_application")
-def get_application_route(
-    application_id: int, _: Patron = Depends(patron_auth),
-    session: Session = Depends(get_db_session),
+async def get_application_route(
+    application_id: int,
+    _: Principal = Depends(patron_auth),
+    session: AsyncSession = Depends(get_db_session),
 ) -> ApplicationResponse:
-    application = session.query(Application).get(application_id)
+    application = await session.get(Application, application_id, options=APPLICATION_RESPONSE)
     if application is None:
         raise HTTPException(status_code=404, detail="Application not found")
     return ApplicationResponse.model_validate(application, from_attributes=True)
 
 
-@router.post("/rate-application/{application_id}", generate_unique_id_function=lambda _: "rate_application")
-def rate_application_route(
+@router.get("/search", generate_unique_id_function=lambda _: "search_applications")
+async def search_applications_route(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    timewindow: TimeWindow | None = Depends(get_requested_timewindow),
+    patron: Principal = Depends(patron_auth),
+    session: AsyncSession = Depends(get_db_session),
+) -> list[SearchResult]:
+    """
+    Search applications by name, email, text of the CV and the motivational letter, and own comments.
+    The last word matches as a prefix. Results are ordered by relevance, with snippets of the matching texts
+    """
+    return await session.run_sync(search_applications, patron.id, q, timewindow, limit)
+
+
+@router.get(
+    "/applications/{application_id}/documents.zip",
+    generate_unique_id_function=lambda _: "download_application_documents",
+    response_class=StreamingResponse,
+)
+async def download_application_documents_route(
     application_id: int,
-    comment: str = "",
-    docs: Docs = Docs(),
-    rate: Rating = Rating.UNRATED,
-    patron: Patron = Depends(patron_auth),
-    session: Session = Depends(get_db_session),
-) -> PatronRateApplicationResponse:
-    application = session.query(Application).get(application_id)
+    _: Principal = Depends(patron_auth),
+    session: AsyncSession = Depends(get_db_session),
+) -> StreamingResponse:
+    """
+    All documents of the application as a ZIP archive
+    """
+    application = (await session.execute(select(*DOCUMENT_ROW_COLUMNS).where(Application.id == application_id))).first()
     if application is None:
         raise HTTPException(status_code=404, detail="Application not found")
+    return StreamingResponse(
+        iter_zip(application_documents(application, settings.files_dir, folder=False)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="application_{application_id}_documents.zip"'},
+    )
+
+
+def _rate_application(
+    session: Session, patron_id: int, application_id: int, comment: str, docs: Docs, rate: Rating
+) -> PatronRateApplicationResponse:
+    """
+    Unit of work for the write queue
+    """
+    application_exists = session.scalar(select(Application.id).where(Application.id == application_id))
+    if application_exists is None:
+        raise HTTPException(status_code=404, detail="Application not found")
 
-    existing_rate: PatronRateApplication | None = (
-        session.query(PatronRateApplication)
-        .filter(
+    existing_rate: PatronRateApplication | None = session.scalar(
+        select(PatronRateApplication).where(
             PatronRateApplication.application_id == application_id,
-            PatronRateApplication.patron_id == patron.id,
+            PatronRateApplication.patron_id == patron_id,
         )
-        .first()
     )
+    old_rate = existing_rate.rate if existing_rate is not None else None
+    apply_rating_delta(session, application_id, old_rate, rate)
     if existing_rate is not None:
         existing_rate.rate = rate
         existing_rate.comment = comment
@@ -135,99 +202,199 @@ def rate_application_route(
     else:
         rate_obj = PatronRateApplication(
             application_id=application_id,
-            patron_id=patron.id,
+            patron_id=patron_id,
             comment=comment,
             rate=rate,
             docs=docs.model_dump(exclude_defaults=True),
         )
         session.add(rate_obj)
+    set_search_texts(
+        session, [(application_id, patron_id, SearchDocumentKind.COMMENT, comment_search_text(comment, docs))]
+    )
 
-    update_daily_stats(session, patron.id, rating_increment=1)
-
-    session.commit()
+    update_daily_stats(session, patron_id, rating_increment=1)
     return PatronRateApplicationResponse.model_validate(rate_obj, from_attributes=True)
 
 
-def _get_ranking_logic(
-    patron: Patron,
-    session: Session,
-    show_last_timewindow: bool = False,
-    show_only_current: bool = False,
-    current_timewindow: TimeWindow | None = None,
-    last_timewindow: TimeWindow | None = None,
+@router.post("/rate-application/{application_id}", generate_unique_id_function=lambda _: "rate_application")
+async def rate_application_route(
+    application_id: int,
+    comment: str = "",
+    docs: Docs = Docs(),
+    rate: Rating = Rating.UNRATED,
+    patron: Principal = Depends(patron_auth),
+    writer: WriteQueue = Depends(get_write_queue),
+) -> PatronRateApplicationResponse:
+    return await writer.run(
+        partial(
+            _rate_application,
+            patron_id=patron.id,
+            application_id=application_id,
+            comment=comment,
+            docs=docs,
+            rate=rate,
+        )
+    )
+
+
+def _rate_applications(
+    session: Session, patron_id: int, ratings: list[RateApplicationItem]
+) -> list[RateApplicationResult]:
+    """
+    Unit of work for the write queue. Ratings of missing applications are reported in the results,
+    the others are saved together
+    """
+    application_ids = [rating.application_id for rating in ratings]
+    duplicates = {application_id for application_id, count in Counter(application_ids).items() if count > 1}
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Applications are rated more than once: {duplicates}")
+
+    existing_ids = set(session.scalars(select(Application.id).where(Application.id.in_(application_ids))))
+    saved = [rating for rating in ratings if rating.application_id in existing_ids]
+    save_patron_ratings(session, patron_id, saved)
+    if saved:
+        update_daily_stats(session, patron_id, rating_increment=len(saved))
+    return [
+        RateApplicationResult(
+            application_id=rating.application_id,
+            rating=PatronRateApplicationResponse(patron_id=patron_id, **rating.model_dump()),
+        )
+        if rating.application_id in existing_ids
+        else RateApplicationResult(application_id=rating.application_id, error="Application not found")
+        for rating in ratings
+    ]
+
+
+@router.post("/rate-applications", generate_unique_id_function=lambda _: "rate_applications")
+async def rate_applications_route(
+    request: RateApplicationsRequest,
+    patron: Principal = Depends(patron_auth),
+    writer: WriteQueue = Depends(get_write_queue),
+) -> list[RateApplicationResult]:
+    """
+    Rate several applications at once, e.g. during a first triage pass. Results are in the order of the request
+    """
+    return await writer.run(partial(_rate_applications, patron_id=patron.id, ratings=request.ratings))
+
+
+async def _get_ranking_logic(
+    patron: Principal, session: AsyncSession, timewindow: TimeWindow | None
 ) -> PatronRankingResponse:
-    if show_only_current and show_last_timewindow:
-        raise HTTPException(400, "You can only set one of `show_last_timewindow`, `show_only_current`")
-    if show_only_current and current_timewindow is None:
-        raise HTTPException(400, "No current timewindow")
-    if show_last_timewindow and last_timewindow is None:
-        raise HTTPException(400, "No last timewindow")
-
-    ranked_applications = (
-        session.query(PatronRanking)
-        .filter_by(patron_id=patron.id)
-        .order_by(PatronRanking.rank)
-        .all()
+    ranked_applications = await session.scalars(
+        select(Application)
+        .join(PatronRanking, PatronRanking.application_id == Application.id)
+        .where(PatronRanking.patron_id == patron.id, timewindow_filter(timewindow))
+        .order_by(PatronRanking.rank_key)
+        .options(*APPLICATION_RESPONSE)
     )
-    if not ranked_applications:
-        return PatronRankingResponse(patron_id=patron.id, applications=[])
-
-    if show_only_current:
-        ranked_applications = list(filter(lambda rank: current_timewindow.start <= rank.application.submitted_at <= current_timewindow.end, ranked_applications))
-    if show_last_timewindow:
-        ranked_applications = list(filter(lambda rank: last_timewindow.start <= rank.application.submitted_at <= last_timewindow.end, ranked_applications))
-
-    application_ids = [r.application_id for r in ranked_applications]
-    db_applications = session.query(Application).filter(Application.id.in_(application_ids)).all()
-    applications = [ApplicationResponse.model_validate(a, from_attributes=True) for a in db_applications]
-    id_x_application = {a.id: a for a in applications}
     return PatronRankingResponse(
         patron_id=patron.id,
-        applications=[id_x_application[app_id] for app_id in application_ids],
+        applications=[ApplicationResponse.model_validate(a, from_attributes=True) for a in ranked_applications],
     )
 
 
 @router.get("/ranking")
-def get_ranking_route(
-    show_last_timewindow: bool = True,
-    show_only_current: bool = False,
-    current_timewindow: TimeWindow | None = Depends(get_current_timewindow),
-    last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
-    patron: Patron = Depends(patron_auth),
-    session: Session = Depends(get_db_session),
+async def get_ranking_route(
+    timewindow: TimeWindow | None = Depends(get_requested_timewindow),
+    patron: Principal = Depends(patron_auth),
+    session: AsyncSession = Depends(get_db_session),
+) -> PatronRankingResponse:
+    return await _get_ranking_logic(patron, session, timewindow)
+
+
+def _load_ranked_applications(
+    session: Session, application_ids: list[int], timewindow: TimeWindow | None
+) -> dict[int, Row]:
+    """
+    Response columns of the applications by ID, flagged if they were submitted during the timewindow
+    """
+    return {
+        row.id: row
+        for row in session.execute(
+            select(*APPLICATION_RESPONSE_COLUMNS, timewindow_filter(timewindow).label("in_timewindow")).where(
+                Application.id.in_(application_ids)
+            )
+        )
+    }
+
+
+def _ranking_response(
+    patron_id: int, application_ids: list[int], applications: dict[int, Row]
 ) -> PatronRankingResponse:
-    return _get_ranking_logic(
-        patron=patron,
-        session=session,
-        show_last_timewindow=show_last_timewindow,
-        show_only_current=show_only_current,
-        current_timewindow=current_timewindow,
-        last_timewindow=last_timewindow,
+    return PatronRankingResponse(
+        patron_id=patron_id,
+        applications=[
+            ApplicationResponse.model_validate(applications[application_id], from_attributes=True)
+            for application_id in application_ids
+            if applications[application_id].in_timewindow
+        ],
     )
 
 
+def _put_ranking(
+    session: Session, patron_id: int, application_ids: list[int], timewindow: TimeWindow | None
+) -> PatronRankingResponse:
+    """
+    Unit of work for the write queue. The response is built from the payload and the applications
+    loaded to check that they exist, the saved ranking is not read back
+    """
+    applications = _load_ranked_applications(session, application_ids, timewindow)
+    if len(applications) != len(application_ids):
+        nonexistent = set(application_ids) - applications.keys()
+        raise HTTPException(status_code=400, detail=f"Some applications do not exist: {nonexistent}")
+
+    save_patron_ranking(session, patron_id, application_ids)
+    update_daily_stats(session, patron_id, ranking_increment=1)
+    return _ranking_response(patron_id, application_ids, applications)
+
+
 @router.put("/ranking")
-def put_ranking_route(
+async def put_ranking_route(
     application_ids: list[int] = Body(embed=True),
-    patron: Patron = Depends(patron_auth),
+    patron: Principal = Depends(patron_auth),
     last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
-    session: Session = Depends(get_db_session),
+    writer: WriteQueue = Depends(get_write_queue),
 ) -> PatronRankingResponse:
-    existing_applications = session.query(Application).filter(Application.id.in_(application_ids)).all()
-    if len(existing_applications) != len(application_ids):
-        nonexistent = set(application_ids) - {a.id for a in existing_applications}
-        raise HTTPException(status_code=400, detail=f"Some applications do not exist: {nonexistent}")
+    timewindow = resolve_timewindow(True, False, None, last_timewindow)
+    return await writer.run(
+        partial(_put_ranking, patron_id=patron.id, application_ids=application_ids, timewindow=timewindow)
+    )
+
 
-    session.query(PatronRanking).filter(PatronRanking.patron_id == patron.id).delete()
-    for rank, application_id in enumerate(application_ids):
-        session.add(PatronRanking(patron_id=patron.id, application_id=application_id, rank=rank))
+def _patch_ranking(
+    session: Session, patron_id: int, operations: list[RankingOperation], timewindow: TimeWindow | None
+) -> PatronRankingResponse:
+    """
+    Unit of work for the write queue
+    """
+    inserted_ids = {operation.application_id for operation in operations if operation.op == RankingOperationType.INSERT}
+    if inserted_ids:
+        existing_ids = set(session.scalars(select(Application.id).where(Application.id.in_(inserted_ids))))
+        if existing_ids != inserted_ids:
+            nonexistent = inserted_ids - existing_ids
+            raise HTTPException(status_code=400, detail=f"Some applications do not exist: {nonexistent}")
+
+    try:
+        application_ids = apply_ranking_operations(session, patron_id, operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    update_daily_stats(session, patron_id, ranking_increment=1)
+    return _ranking_response(
+        patron_id, application_ids, _load_ranked_applications(session, application_ids, timewindow)
+    )
 
-    update_daily_stats(session, patron.id, ranking_increment=1)
-    session.commit()
 
-    return _get_ranking_logic(
-        patron=patron,
-        session=session,
-        show_last_timewindow=True,
-        last_timewindow=last_timewindow
+@router.patch("/ranking")
+async def patch_ranking_route(
+    request: PatchRankingRequest,
+    patron: Principal = Depends(patron_auth),
+    last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
+    writer: WriteQueue = Depends(get_write_queue),
+) -> PatronRankingResponse:
+    """
+    Move, insert or remove applications without sending the whole ranking: each move or insert changes one row
+    """
+    timewindow = resolve_timewindow(True, False, None, last_timewindow)
+    return await writer.run(
+        partial(_patch_ranking, patron_id=patron.id, operations=request.operations, timewindow=timewindow)
     )
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 import yaml
 from pydantic import BaseModel, ConfigDict, Field, SecretStr
@@ -8,6 +9,25 @@ class SettingBaseModel(BaseModel):
     model_config = ConfigDict(use_attribute_docstrings=True, extra="forbid")
 
 
+class SQLitePragmas(SettingBaseModel):
+    """Pragmas applied to every new SQLite connection"""
+
+    journal_mode: Literal["delete", "truncate", "persist", "memory", "wal", "off"] = "wal"
+    "Write-ahead log lets readers run while a write transaction is open"
+    synchronous: Literal["off", "normal", "full", "extra"] = "normal"
+    "With WAL, `normal` only syncs on checkpoints: a power loss may drop the last commits, but never corrupts"
+    busy_timeout_ms: int = 5000
+    "How long to wait for the database lock before failing with `database is locked`"
+    cache_size_kib: int = 64 * 1024
+    "Page cache size of each connection"
+    mmap_size_mb: int = 256
+    "Size of the database file mapped into memory, 0 disables memory-mapped reads"
+    temp_store: Literal["default", "file", "memory"] = "memory"
+    "Where temporary tables and indices for sorting and grouping are kept"
+    foreign_keys: bool = True
+    "Enforce foreign key constraints"
+
+
 class Settings(SettingBaseModel):
     """Settings for the application."""
 
@@ -18,12 +38,42 @@ class Settings(SettingBaseModel):
     'Prefix for the API path (e.g. "/api/v0")'
     database_uri: SecretStr = "sqlite:///data/db.sqlite"
     "SQLite database settings"
+    sqlite_pragmas: SQLitePragmas = SQLitePragmas()
+    "Pragmas applied to every connection"
+    database_pool_size: int = 5
+    "Number of connections kept open by each engine"
+    database_max_overflow: int = 10
+    "Number of connections opened above the pool size under load"
+    database_pool_timeout_seconds: float = 30
+    "How long a request waits for a free connection before failing"
     cors_allow_origin_regex: str = ".*"
     "Allowed origins for CORS: from which domains requests to the API are allowed. Specify as a regex: `https://.*.innohassle.ru`"
     session_secret_key: SecretStr
     "Secret key for session management"
     files_dir: Path = Path("data/files")
     "Path to the directory where files will be stored"
+    files_accel_redirect_location: str | None = None
+    "Internal nginx location serving `files_dir`, e.g. `/protected-files/`: if set, nginx sends files via `X-Accel-Redirect`"
+    upload_max_file_size_mb: int = 25
+    "Maximum size of one uploaded file"
+    upload_max_request_size_mb: int = 100
+    "Maximum size of a request body, e.g. all files of one submission together; enforced while the body is received"
+    exports_dir: Path = Path("data/exports")
+    "Path to the directory where export artifacts are cached"
+    exports_max_size_mb: int = 512
+    "Maximum total size of cached export artifacts, the least recently used ones are evicted first"
+    exports_max_age_hours: int = 24
+    "Cached export artifacts older than this are evicted"
+    export_workers: int = 2
+    "Number of threads running export jobs"
+    writer_max_batch: int = 64
+    "Maximum number of queued writes committed in one transaction by the write queue"
+    daily_stats_flush_interval_seconds: float = 0
+    "How often patron activity counters collected in memory are written, 0 writes them with every rating and ranking"
+    principal_cache_ttl_seconds: int = 60
+    "How long the authenticated patron is cached between requests, 0 disables the cache"
+    metrics_token: SecretStr | None = None
+    "Bearer token for scraping `/metrics` without a session, e.g. by a local Prometheus; admins can always open it"
     bot_token: SecretStr
     "Telegram bot token, get it from @BotFather"
     bot_username: str
@@ -1,17 +1,107 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import URL, Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import (
     sessionmaker,
 )
 
 from src.config import settings
+from src.metrics import count_query
+
+pool_options = {
+    "pool_size": settings.database_pool_size,
+    "max_overflow": settings.database_max_overflow,
+    "pool_timeout": settings.database_pool_timeout_seconds,
+}
 
 engine = create_engine(
     settings.database_uri.get_secret_value(),
     connect_args={"check_same_thread": False},
+    **pool_options,
 )
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+"Synchronous sessions for migrations, scripts and work done in background threads"
+
+async_engine = create_async_engine(
+    make_url(settings.database_uri.get_secret_value()).set(drivername="sqlite+aiosqlite"),
+    **pool_options,
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+"""
+Sessions for request handlers, queries do not block the event loop.
+Objects are not expired on commit, because reloading them would need an `await`
+"""
+
+
+def sqlite_pragmas() -> dict[str, str | int]:
+    """
+    Pragmas from the settings, in the order they are applied: the busy timeout first,
+    so that switching the journal mode waits for other connections instead of failing
+    """
+    pragmas = settings.sqlite_pragmas
+    return {
+        "busy_timeout": pragmas.busy_timeout_ms,
+        "journal_mode": pragmas.journal_mode,
+        "synchronous": pragmas.synchronous,
+        "cache_size": -pragmas.cache_size_kib,  # negative values are in KiB, positive ones in pages
+        "mmap_size": pragmas.mmap_size_mb * 1024 * 1024,
+        "temp_store": pragmas.temp_store,
+        "foreign_keys": "ON" if pragmas.foreign_keys else "OFF",
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    """
+    Pragmas are per connection, so they are applied to every connection the pools open
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def read_sqlite_pragmas(connection) -> dict[str, str | int]:
+    """
+    Pragmas as reported by SQLite, e.g. the journal mode stays `memory` for in-memory databases
+    """
+    return {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in sqlite_pragmas()}
+
+
+event.listen(engine, "connect", apply_sqlite_pragmas)
+event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+event.listen(engine, "before_cursor_execute", count_query)
+event.listen(async_engine.sync_engine, "before_cursor_execute", count_query)
+
+
+def create_writer_engine(url: str | URL) -> Engine:
+    """
+    Engine with the single connection of the write queue.
+    The driver's own transaction handling is disabled, so that savepoints work, and transactions start with
+    `BEGIN IMMEDIATE`, taking the write lock up front instead of failing to upgrade a read lock mid-transaction
+    """
+    writer_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.database_pool_timeout_seconds,
+    )
+
+    def on_connect(dbapi_connection, connection_record) -> None:
+        apply_sqlite_pragmas(dbapi_connection, connection_record)
+        dbapi_connection.isolation_level = None
+
+    def on_begin(connection) -> None:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    event.listen(writer_engine, "connect", on_connect)
+    event.listen(writer_engine, "begin", on_begin)
+    event.listen(writer_engine, "before_cursor_execute", count_query)
+    return writer_engine
+
 
-with engine.connect() as conn:
-    conn.execute(text("PRAGMA foreign_keys = ON"))
+writer_engine = create_writer_engine(settings.database_uri.get_secret_value())
+"Connection of the write queue, see `src.services.writer`"
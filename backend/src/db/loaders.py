@@ -0,0 +1,52 @@
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from src.db.models import Application, Patron, PatronRateApplication, TimeWindow
+
+APPLICATION_RESPONSE_COLUMNS = (
+    Application.id,
+    Application.submitted_at,
+    Application.session_id,
+    Application.email,
+    Application.full_name,
+    Application.cv,
+    Application.motivational_letter,
+    Application.recommendation_letter,
+    Application.transcript,
+    Application.almost_a_student,
+)
+"Columns needed to build `ApplicationResponse`, so that relationships of `Application` are not loaded"
+
+RATING_RESPONSE_COLUMNS = (
+    PatronRateApplication.patron_id,
+    PatronRateApplication.application_id,
+    PatronRateApplication.comment,
+    PatronRateApplication.docs,
+    PatronRateApplication.rate,
+)
+"Columns needed to build `PatronRateApplicationResponse`"
+
+APPLICATION_RESPONSE = (load_only(*APPLICATION_RESPONSE_COLUMNS, raiseload=True), raiseload("*"))
+"Applications listed as `ApplicationResponse`, accessing anything else raises instead of querying row by row"
+
+RATING_RESPONSE = (load_only(*RATING_RESPONSE_COLUMNS, raiseload=True), raiseload("*"))
+"Ratings listed as `PatronRateApplicationResponse`"
+
+NO_RELATIONSHIPS = (raiseload("*"),)
+"Plain rows of a model, e.g. patrons as `PatronResponse` or timewindows as `TimeWindowResponse`"
+
+PATRON_DELETE = (
+    selectinload(Patron.ratings),
+    selectinload(Patron.rankings),
+    selectinload(Patron.daily_stats),
+)
+"Patron with the rows deleted together with it by cascade"
+
+APPLICATION_DELETE = (
+    selectinload(Application.ratings),
+    selectinload(Application.rankings),
+    selectinload(Application.score),
+)
+"Application with the rows deleted together with it by cascade"
+
+TIMEWINDOW_DELETE = (selectinload(TimeWindow.applications).options(*APPLICATION_DELETE),)
+"Timewindow with its applications and their rows deleted together with it by cascade"
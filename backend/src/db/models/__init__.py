@@ -1,17 +1,23 @@
-from src.db.models.base import Base # noqa: I001
+from src.db.models.base import Base  # noqa: I001
 
 from src.db.models.applicant import Application
+from src.db.models.data_version import DataVersion
 from src.db.models.patron import Patron
 from src.db.models.rating import PatronRanking, PatronRateApplication
+from src.db.models.score import ApplicationScore
+from src.db.models.search import SearchDocument
 from src.db.models.statistics import PatronDailyStats
 from src.db.models.timewindow import TimeWindow
 
 __all__ = [
     "Base",
     "Application",
+    "ApplicationScore",
+    "DataVersion",
     "Patron",
     "PatronRateApplication",
     "PatronRanking",
     "PatronDailyStats",
+    "SearchDocument",
     "TimeWindow",
 ]
@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.db.models import Base
@@ -12,6 +12,7 @@ from src.db.models.types import UTCDateTime
 if TYPE_CHECKING:
     from src.db.models.patron import Patron
     from src.db.models.rating import PatronRanking, PatronRateApplication
+    from src.db.models.score import ApplicationScore
     from src.db.models.timewindow import TimeWindow
 
 
@@ -20,7 +21,7 @@ class Application(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
-    submitted_at: Mapped[datetime.datetime] = mapped_column(UTCDateTime, server_default=func.now())
+    submitted_at: Mapped[datetime.datetime] = mapped_column(UTCDateTime, server_default=func.now(), index=True)
     "Time when the application was submitted"
 
     session_id: Mapped[str] = mapped_column()
@@ -31,15 +32,15 @@ class Application(Base):
     full_name: Mapped[str]
     "Full name of the participant"
 
-    cv: Mapped[str | None]
+    cv: Mapped[str | None] = mapped_column(index=True)
     "Path to the CV of the participant"
-    motivational_letter: Mapped[str | None]
+    motivational_letter: Mapped[str | None] = mapped_column(index=True)
     "Path to the motivational letter of the participant"
-    recommendation_letter: Mapped[str | None]
+    recommendation_letter: Mapped[str | None] = mapped_column(index=True)
     "Path to the recommendation letter of the participant"
-    transcript: Mapped[str | None]
+    transcript: Mapped[str | None] = mapped_column(index=True)
     "Path to the transcript of the participant"
-    almost_a_student: Mapped[str | None]
+    almost_a_student: Mapped[str | None] = mapped_column(index=True)
     'Path to the "Almost A student" document of the participant'
 
     timewindow_id: Mapped[int] = mapped_column(
@@ -52,33 +53,39 @@ class Application(Base):
     timewindow: Mapped[TimeWindow] = relationship(
         "TimeWindow",
         back_populates="applications",
-        lazy="selectin",
     )
 
     ratings: Mapped[list[PatronRateApplication]] = relationship(
         "PatronRateApplication",
         back_populates="application",
         cascade="all, delete-orphan",
-        lazy="selectin",
     )
     rankings: Mapped[list[PatronRanking]] = relationship(
         "PatronRanking",
         back_populates="application",
         cascade="all, delete-orphan",
-        lazy="selectin",
+    )
+
+    score: Mapped[ApplicationScore | None] = relationship(
+        "ApplicationScore",
+        back_populates="application",
+        cascade="all, delete-orphan",
     )
 
     raters: Mapped[list[Patron]] = relationship(
         "Patron",
         secondary="patron_x_application",
         viewonly=True,
-        lazy="selectin",
         overlaps="ratings,patron",
     )
     rankers: Mapped[list[Patron]] = relationship(
         "Patron",
         secondary="patron_ranking",
         viewonly=True,
-        lazy="selectin",
         overlaps="rankings,patron",
     )
+
+
+# prefix filters and sorting by name of `GET /patron/applications` are ranges and orderings of these
+Index("ix_applications_lower_full_name", func.lower(Application.full_name))
+Index("ix_applications_lower_email", func.lower(Application.email))
@@ -0,0 +1,16 @@
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.db.models import Base
+
+
+class DataVersion(Base):
+    """
+    Model representing a counter bumped on every write that changes exported data,
+    so that cached exports can be keyed by it
+    """
+
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    "Always 1, the table has a single row"
+    version: Mapped[int] = mapped_column(default=0)
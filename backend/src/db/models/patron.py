@@ -28,27 +28,23 @@ class Patron(Base):
         "PatronRateApplication",
         back_populates="patron",
         cascade="all, delete-orphan",
-        lazy="selectin",
     )
     rankings: Mapped[list[PatronRanking]] = relationship(
         "PatronRanking",
         back_populates="patron",
         cascade="all, delete-orphan",
-        lazy="selectin",
     )
 
     rated_applications: Mapped[list[Application]] = relationship(
         "Application",
         secondary="patron_x_application",
         viewonly=True,
-        lazy="selectin",
         overlaps="ratings,application",
     )
     ranked_applications: Mapped[list[Application]] = relationship(
         "Application",
         secondary="patron_ranking",
         viewonly=True,
-        lazy="selectin",
         overlaps="rankings,application",
     )
 
@@ -57,5 +53,4 @@ class Patron(Base):
         back_populates="patron",
         cascade="all, delete-orphan",
         order_by="desc(PatronDailyStats.date)",
-        lazy="selectin",
     )
@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import JSON, ForeignKey, func
+from sqlalchemy import JSON, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.db.models import Base
@@ -44,10 +44,15 @@ class PatronRanking(Base):
     """
 
     __tablename__ = "patron_ranking"
+    __table_args__ = (Index("ix_patron_ranking_patron_id_rank_key", "patron_id", "rank_key"),)
 
     patron_id: Mapped[int] = mapped_column(ForeignKey("patron.id", ondelete="CASCADE"), primary_key=True)
     application_id: Mapped[int] = mapped_column(ForeignKey("applications.id", ondelete="CASCADE"), primary_key=True)
-    rank: Mapped[int] = mapped_column()
+    rank_key: Mapped[str] = mapped_column()
+    """
+    Position in the ranking: keys of a patron sort as strings in ranked order, so moving an application changes
+    only its own key. Dense 0-based ranks are computed from them by `src.services.ranking.dense_rankings`
+    """
     updated_at: Mapped[datetime.datetime] = mapped_column(server_default=func.now())
     "Datetime of the last update"
 
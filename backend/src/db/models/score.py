@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from src.db.models import Base
+from src.db.models.types import UTCDateTime
+
+if TYPE_CHECKING:
+    from src.db.models.applicant import Application
+
+
+class ApplicationScore(Base):
+    """
+    Model representing aggregated RRF score and votes of an application,
+    maintained incrementally on every rating and ranking write
+    """
+
+    __tablename__ = "application_scores"
+
+    application_id: Mapped[int] = mapped_column(
+        ForeignKey("applications.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    rrf_score: Mapped[float] = mapped_column(default=0.0, index=True)
+    "Sum of RRF scores given by patron rankings"
+    positive_votes: Mapped[int] = mapped_column(default=0)
+    negative_votes: Mapped[int] = mapped_column(default=0)
+    neutral_votes: Mapped[int] = mapped_column(default=0)
+    unrated_votes: Mapped[int] = mapped_column(default=0)
+    rater_count: Mapped[int] = mapped_column(default=0)
+    "Number of patrons who rated the application (including unrated)"
+    last_updated: Mapped[datetime.datetime] = mapped_column(UTCDateTime, server_default=func.now(), onupdate=func.now())
+    "Datetime of the last update"
+
+    application: Mapped[Application] = relationship("Application", back_populates="score")
@@ -0,0 +1,43 @@
+from sqlalchemy import DDL, ForeignKey, Index, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.db.models import Base
+from src.schemas.search import SearchDocumentKind
+
+SEARCH_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE search_index USING fts5("
+    "text, content='search_documents', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER search_documents_after_insert AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_index (rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER search_documents_after_delete AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_index (search_index, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER search_documents_after_update AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_index (search_index, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO search_index (rowid, text) VALUES (new.id, new.text); END",
+)
+"FTS5 index over `search_documents.text` and the triggers keeping it in sync, also created by the migration"
+
+
+class SearchDocument(Base):
+    """
+    Model representing a piece of text searched by `GET /patron/search`.
+    The FTS5 table `search_index` indexes it, so rows are written here and never to the index directly
+    """
+
+    __tablename__ = "search_documents"
+    __table_args__ = (Index("ix_search_documents_application_id_kind", "application_id", "kind"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    application_id: Mapped[int] = mapped_column(ForeignKey("applications.id", ondelete="CASCADE"))
+    "ID of the application the text belongs to"
+    patron_id: Mapped[int | None] = mapped_column(ForeignKey("patron.id", ondelete="CASCADE"))
+    "ID of the patron who wrote the comment, None for text searched by every patron"
+    kind: Mapped[SearchDocumentKind]
+    "What the text is"
+    text: Mapped[str]
+    "Indexed text"
+
+
+for statement in SEARCH_INDEX_DDL:
+    event.listen(SearchDocument.__table__, "after_create", DDL(statement))
+event.listen(SearchDocument.__table__, "before_drop", DDL("DROP TABLE IF EXISTS search_index"))
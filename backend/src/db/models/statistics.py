@@ -40,6 +40,4 @@ class PatronDailyStats(Base):
         nullable=False,
     )
 
-    patron: Mapped[Patron] = relationship(
-        "Patron", back_populates="daily_stats", lazy="joined"
-    )
+    patron: Mapped[Patron] = relationship("Patron", back_populates="daily_stats")
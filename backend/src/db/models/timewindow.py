@@ -41,5 +41,4 @@ class TimeWindow(Base):
         "Application",
         back_populates="timewindow",
         cascade="all, delete-orphan",
-        lazy="selectin",
     )
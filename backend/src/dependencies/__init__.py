@@ -1,10 +1,15 @@
-from src.dependencies.auth import admin_auth, patron_auth
+from src.dependencies.auth import admin_auth, metrics_auth, patron_auth
 from src.dependencies.db_session import get_db_session
-from src.dependencies.timewindow import get_current_timewindow
+from src.dependencies.timewindow import get_current_timewindow, get_requested_timewindow, resolve_timewindow
+from src.dependencies.writer import get_write_queue
 
 __all__ = [
     "admin_auth",
+    "metrics_auth",
     "patron_auth",
     "get_db_session",
     "get_current_timewindow",
+    "get_requested_timewindow",
+    "resolve_timewindow",
+    "get_write_queue",
 ]
@@ -1,31 +1,49 @@
+import secrets
+
 from fastapi import Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import settings
-from src.db.models import Patron
 from src.dependencies.db_session import get_db_session
+from src.services import Principal, principal_cache
+
+
+async def _get_principal(patron_id: int, session: AsyncSession) -> Principal:
+    principal = principal_cache.get(patron_id)
+    if principal is None:
+        principal = await session.run_sync(principal_cache.load, patron_id)
+    if principal is None:
+        raise HTTPException(status_code=403, detail="Patron with such id not found")
+    return principal
 
 
-async def patron_auth(request: Request, session: Session = Depends(get_db_session)) -> Patron:
+async def patron_auth(request: Request, session: AsyncSession = Depends(get_db_session)) -> Principal:
     patron_id = request.session.get("patron_id")
     if patron_id is None:
         raise HTTPException(status_code=403, detail="Only patrons can access this endpoint")
-    patron_obj = session.query(Patron).get(patron_id)
-    if patron_obj is None:
-        raise HTTPException(status_code=403, detail="Patron with such id not found")
-    return patron_obj
+    return await _get_principal(patron_id, session)
 
 
-async def admin_auth(request: Request, session: Session = Depends(get_db_session)) -> Patron:
+async def admin_auth(request: Request, session: AsyncSession = Depends(get_db_session)) -> Principal:
     patron_id = request.session.get("patron_id")
     if patron_id is None:
         raise HTTPException(status_code=403, detail="Only admins can access this endpoint")
 
-    patron_obj = session.query(Patron).get(patron_id)
-    if patron_obj is None:
-        raise HTTPException(status_code=403, detail="Patron with such id not found")
+    principal = await _get_principal(patron_id, session)
 
-    if not patron_obj.is_admin and patron_obj.telegram_id != settings.superadmin_telegram_id:
+    if not principal.is_admin and principal.telegram_id != settings.superadmin_telegram_id:
         raise HTTPException(status_code=403, detail="Only admins can access this endpoint")
 
-    return patron_obj
+    return principal
+
+
+async def metrics_auth(request: Request, session: AsyncSession = Depends(get_db_session)) -> None:
+    """
+    Scrapers authenticate with `Authorization: Bearer <metrics_token>`, people with an admin session
+    """
+    authorization = request.headers.get("authorization")
+    if settings.metrics_token is not None and authorization is not None:
+        expected = f"Bearer {settings.metrics_token.get_secret_value()}"
+        if secrets.compare_digest(authorization.encode(), expected.encode()):
+            return
+    await admin_auth(request, session)
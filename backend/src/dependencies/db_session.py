@@ -1,13 +1,15 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator
 
-from src.db import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.db import AsyncSessionLocal
 
-def get_db_session() -> Generator:
-    """Yield a DB session and close it afterwards."""
 
-    db = SessionLocal()
+async def get_db_session() -> AsyncGenerator[AsyncSession]:
+    """Yield an async DB session and close it afterwards."""
+
+    db = AsyncSessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
@@ -1,23 +1,55 @@
-import datetime
-
-from fastapi import Depends
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.models import TimeWindow
 from src.dependencies.db_session import get_db_session
+from src.services import timewindow_registry
 
 
-def get_current_timewindow(session: Session = Depends(get_db_session)) -> TimeWindow | None:
+async def get_current_timewindow(session: AsyncSession = Depends(get_db_session)) -> TimeWindow | None:
     """
     Returns timewindow related to current date
     """
-    today = datetime.datetime.now(datetime.UTC)
-    return session.query(TimeWindow).filter(TimeWindow.start <= today, today <= TimeWindow.end).first()
+    return await session.run_sync(timewindow_registry.current)
 
 
-def get_last_timewindow(session: Session = Depends(get_db_session)) -> TimeWindow | None:
+async def get_last_timewindow(session: AsyncSession = Depends(get_db_session)) -> TimeWindow | None:
     """
     Returns last timewindow. Last timewindow may be current one, but not future one
     """
-    today = datetime.datetime.now(datetime.UTC)
-    return session.query(TimeWindow).filter(TimeWindow.start <= today).order_by(TimeWindow.start.desc()).first()
+    return await session.run_sync(timewindow_registry.last)
+
+
+def resolve_timewindow(
+    show_last_timewindow: bool,
+    show_only_current: bool,
+    current_timewindow: TimeWindow | None,
+    last_timewindow: TimeWindow | None,
+) -> TimeWindow | None:
+    """
+    Returns timewindow chosen by the flags, None means all timewindows
+    """
+    if show_only_current and show_last_timewindow:
+        raise HTTPException(400, "You can only set one of `show_last_timewindow`, `show_only_current`")
+    if show_only_current and current_timewindow is None:
+        raise HTTPException(400, "No current timewindow")
+    if show_last_timewindow and last_timewindow is None:
+        raise HTTPException(400, "No last timewindow")
+
+    if show_only_current:
+        return current_timewindow
+    if show_last_timewindow:
+        return last_timewindow
+    return None
+
+
+def get_requested_timewindow(
+    show_last_timewindow: bool = True,
+    show_only_current: bool = False,
+    current_timewindow: TimeWindow | None = Depends(get_current_timewindow),
+    last_timewindow: TimeWindow | None = Depends(get_last_timewindow),
+) -> TimeWindow | None:
+    """
+    Returns timewindow requested by `show_last_timewindow` and `show_only_current` query flags, None means all
+    """
+    return resolve_timewindow(show_last_timewindow, show_only_current, current_timewindow, last_timewindow)
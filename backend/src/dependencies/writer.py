@@ -0,0 +1,7 @@
+from src.services import WriteQueue, write_queue
+
+
+def get_write_queue() -> WriteQueue:
+    """Write queue of the application, overridden by scripts that run against their own database."""
+
+    return write_queue
@@ -0,0 +1,253 @@
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsMiddleware",
+    "count_query",
+    "render_metrics",
+]
+
+import bisect
+import contextvars
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LabelValues = tuple[str, ...]
+
+_registry: list["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+class _Metric(ABC):
+    """
+    Metric family with fixed label names, kept in the process-wide registry and rendered by `render_metrics`.
+    The server runs one worker process, so a plain in-memory registry is enough and there is nothing to aggregate
+    """
+
+    type_: str
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: LabelValues) -> LabelValues:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {labels}")
+        return labels
+
+    def _format_labels(self, values: LabelValues, extra: tuple[str, str] | None = None) -> str:
+        pairs = list(zip(self.labels, values, strict=True))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """
+        Sample lines of the metric in the text exposition format
+        """
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_}", *self._samples()]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(label_value: str) -> str:
+    return label_value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter(_Metric):
+    type_ = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    type_ = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """
+    Cumulative histogram: counts per bucket are kept separately and summed up when rendered
+    """
+
+    type_ = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), *, buckets: Sequence[float]) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = sorted(buckets)
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+        "Labels -> (count per bucket with +Inf last, [sum])"
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0])
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip([*self.buckets, float("inf")], counts, strict=True):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format 0.0.4
+    """
+    with _registry_lock:
+        metrics = list(_registry)
+    return "".join(metric.render() for metric in metrics)
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (0, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+http_requests = Counter("http_requests_total", "Finished HTTP requests", ["method", "route", "status"])
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+http_requests_in_progress = Gauge("http_requests_in_progress", "HTTP requests being handled", ["method"])
+http_request_size = Histogram(
+    "http_request_size_bytes", "Size of request bodies", ["method", "route"], buckets=SIZE_BUCKETS
+)
+http_response_size = Histogram(
+    "http_response_size_bytes", "Size of response bodies", ["method", "route"], buckets=SIZE_BUCKETS
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed for one HTTP request, including its units in the write queue",
+    ["method", "route"],
+    buckets=QUERY_BUCKETS,
+)
+db_queries = Counter("db_queries_total", "SQL statements executed, by requests and background work")
+
+_request_queries: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar("request_queries", default=None)
+"Counter of the SQL statements of the current request, a list so that copies of the context share it"
+
+
+def count_query(*_args) -> None:
+    """
+    `before_cursor_execute` listener counting statements, attached to every engine in `src.db`
+    """
+    db_queries.inc()
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+"Route label of requests to unknown paths, so that scanners do not create a series per path"
+
+
+class MetricsMiddleware:
+    """
+    Record latency, in-flight requests, statuses, body sizes and SQL statements per route.
+    Requests are labelled by the path template of the route the router put into the scope,
+    e.g. `/patron/applications/{application_id}`, so no handler is inspected while serving a request
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = "500"  # unless a response is started, the server answers with an error
+        request_size = response_size = 0
+        queries = [0]
+        queries_token = _request_queries.set(queries)
+
+        async def counting_receive() -> Message:
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message) -> None:
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        # the route is known only once the router has matched it, so requests in flight are counted per method
+        http_requests_in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            duration = time.perf_counter() - start
+            _request_queries.reset(queries_token)
+            http_requests_in_progress.dec(method)
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            http_requests.inc(method, route, status)
+            http_request_duration.observe(duration, method, route)
+            http_request_size.observe(request_size, method, route)
+            http_response_size.observe(response_size, method, route)
+            db_queries_per_request.observe(queries[0], method, route)
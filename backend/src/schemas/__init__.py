@@ -1,36 +1,63 @@
 from src.schemas.admin import AddPatronRequest
 from src.schemas.applicant import ApplicationResponse
-from src.schemas.patron import PatronResponse, PatronWithRatingsAndRankings
+from src.schemas.export import CreateExportRequest, ExportFormat, ExportJobResponse, ExportJobStatus
+from src.schemas.patron import ApplicationSort, ApplicationsQuery, PatronResponse, PatronWithRatingsAndRankings
 from src.schemas.rating import (
     Docs,
+    PatchRankingRequest,
     PatronRankingResponse,
     PatronRateApplicationResponse,
+    RankingOperation,
+    RankingOperationType,
+    RateApplicationItem,
+    RateApplicationResult,
+    RateApplicationsRequest,
     Rating,
 )
+from src.schemas.search import SearchDocumentKind, SearchResult, SearchSnippet
 from src.schemas.statistics import (
     ApplicationRankingStats,
     DailyApplicationStats,
     DailyPatronStats,
     OverallStats,
     PatronStats,
+    RankingMethod,
+    ScoresRebuildReport,
 )
 from src.schemas.timewindow import CreateTimeWindowRequest, EditTimeWindowRequest, TimeWindowResponse
 
 __all__ = [
     "AddPatronRequest",
     "ApplicationResponse",
+    "CreateExportRequest",
+    "ExportFormat",
+    "ExportJobResponse",
+    "ExportJobStatus",
+    "ApplicationSort",
+    "ApplicationsQuery",
     "PatronResponse",
     "PatronWithRatingsAndRankings",
     "Docs",
     "PatronRateApplicationResponse",
     "PatronRankingResponse",
+    "PatchRankingRequest",
+    "RankingOperation",
+    "RankingOperationType",
+    "RateApplicationItem",
+    "RateApplicationResult",
+    "RateApplicationsRequest",
     "ApplicationRankingStats",
     "DailyPatronStats",
     "DailyApplicationStats",
     "OverallStats",
     "PatronStats",
+    "RankingMethod",
+    "ScoresRebuildReport",
+    "SearchDocumentKind",
+    "SearchResult",
+    "SearchSnippet",
     "CreateTimeWindowRequest",
     "EditTimeWindowRequest",
     "TimeWindowResponse",
-    "Rating"
+    "Rating",
 ]
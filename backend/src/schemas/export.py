@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import datetime
+from enum import StrEnum
+
+from src.schemas.pydantic_base import BaseSchema
+
+
+class ExportFormat(StrEnum):
+    XLSX = "xlsx"
+    "Applications ranking and patron rankings sheets"
+    CSV = "csv"
+    "Applications ranking rows"
+    NDJSON = "ndjson"
+    "Applications ranking rows, one JSON object per line"
+    PARQUET = "parquet"
+    "Application x patron rating matrix (requires pyarrow)"
+
+    @property
+    def media_type(self) -> str:
+        return {
+            ExportFormat.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            ExportFormat.CSV: "text/csv",
+            ExportFormat.NDJSON: "application/x-ndjson",
+            ExportFormat.PARQUET: "application/vnd.apache.parquet",
+        }[self]
+
+
+class ExportJobStatus(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class CreateExportRequest(BaseSchema):
+    format: ExportFormat = ExportFormat.XLSX
+    show_last_timewindow: bool = True
+    show_only_current: bool = False
+
+
+class ExportJobResponse(BaseSchema):
+    id: str
+    format: ExportFormat
+    status: ExportJobStatus
+    cached: bool
+    "Whether the artifact was served from the cache without recomputing"
+    rows_written: int
+    rows_total: int | None
+    "Number of rows to write, None until the job starts"
+    error: str | None
+    created_at: datetime.datetime
+    finished_at: datetime.datetime | None
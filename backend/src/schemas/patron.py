@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from enum import StrEnum
+
+from pydantic import Field
+
 from src.schemas.pydantic_base import BaseSchema
-from src.schemas.rating import PatronRankingResponse, PatronRateApplicationResponse
+from src.schemas.rating import PatronRankingResponse, PatronRateApplicationResponse, Rating
 
 
 class PatronResponse(BaseSchema):
@@ -17,3 +21,45 @@ class PatronWithRatingsAndRankings(BaseSchema):
     patron: PatronResponse
     ratings: list[PatronRateApplicationResponse]
     ranking: PatronRankingResponse
+
+
+class ApplicationSort(StrEnum):
+    SUBMITTED_AT = "submitted_at"
+    "Time of submission"
+    FULL_NAME = "full_name"
+    "Full name, case-insensitive for Latin letters"
+    MY_RANK = "my_rank"
+    "Position in the ranking of the patron, applications they have not ranked are last"
+
+
+class ApplicationsQuery(BaseSchema):
+    """
+    Filters, sorting and pagination of `GET /patron/applications`, all filters are combined
+    """
+
+    show_last_timewindow: bool = True
+    "Only applications of the last timewindow"
+    show_only_current: bool = False
+    "Only applications of the current timewindow"
+    prefix: str | None = Field(None, min_length=1, max_length=200)
+    "Start of the full name or email, case-insensitive for Latin letters"
+    has_cv: bool | None = None
+    "Only applications with (true) or without (false) a CV"
+    has_motivational_letter: bool | None = None
+    "Only applications with (true) or without (false) a motivational letter"
+    has_recommendation_letter: bool | None = None
+    "Only applications with (true) or without (false) a recommendation letter"
+    has_transcript: bool | None = None
+    "Only applications with (true) or without (false) a transcript"
+    has_almost_a_student: bool | None = None
+    'Only applications with (true) or without (false) an "Almost A student" document'
+    rated: bool | None = None
+    "Only applications the patron has rated (true) or not (false), an `unrated` rating counts as not rated"
+    rating: list[Rating] = []
+    "Only applications the patron has rated with one of these values, `unrated` also matches not rated ones"
+    sort: ApplicationSort = ApplicationSort.SUBMITTED_AT
+    descending: bool = False
+    limit: int | None = Field(None, ge=1, le=1000)
+    "Size of a page, all applications if not set"
+    cursor: str | None = None
+    "`X-Next-Cursor` header of the previous page, the same filters and sorting must be passed with it"
@@ -47,9 +47,54 @@ class PatronRateApplicationResponse(BaseSchema):
     "Rating value"
 
 
+class RateApplicationItem(BaseSchema):
+    application_id: int
+    "ID of the application to rate"
+    comment: str = ""
+    "Comment for whole application"
+    docs: Docs = Docs()
+    "Per-document comments/flags"
+    rate: Rating = Rating.UNRATED
+    "Rating value"
+
+
+class RateApplicationsRequest(BaseSchema):
+    ratings: list[RateApplicationItem]
+    "Ratings to save, each application at most once"
+
+
+class RateApplicationResult(BaseSchema):
+    application_id: int
+    "ID of the application from the request"
+    rating: PatronRateApplicationResponse | None = None
+    "Saved rating, None if it was not saved"
+    error: str | None = None
+    "Why the rating was not saved"
+
+
 class PatronRankingResponse(BaseSchema):
     patron_id: int
     """ID of the patron who produced this ranking"""
 
     applications: list[ApplicationResponse]
     """Applications listed in ranked order"""
+
+
+class RankingOperationType(StrEnum):
+    MOVE = "move"
+    INSERT = "insert"
+    REMOVE = "remove"
+
+
+class RankingOperation(BaseSchema):
+    op: RankingOperationType
+    "What to do with the application"
+    application_id: int
+    "ID of the application to move, insert or remove"
+    after: int | None = None
+    "ID of the ranked application to place it after, None to place it first. Ignored for removal"
+
+
+class PatchRankingRequest(BaseSchema):
+    operations: list[RankingOperation]
+    "Operations applied in order, all or none of them"
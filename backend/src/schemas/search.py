@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from enum import StrEnum
+
+from src.schemas.applicant import ApplicationResponse
+from src.schemas.pydantic_base import BaseSchema
+
+
+class SearchDocumentKind(StrEnum):
+    APPLICANT = "applicant"
+    "Full name and email of the applicant"
+    CV = "cv"
+    "Text of the CV"
+    MOTIVATIONAL_LETTER = "motivational_letter"
+    "Text of the motivational letter"
+    COMMENT = "comment"
+    "Comment of a patron and their comments on the documents, searched only by that patron"
+
+
+class SearchSnippet(BaseSchema):
+    kind: SearchDocumentKind
+    "Where the match was found"
+    text: str
+    "Text around the match, matched terms wrapped in `<mark>` tags. The text itself is not HTML-escaped"
+
+
+class SearchResult(BaseSchema):
+    application: ApplicationResponse
+    snippets: list[SearchSnippet]
+    "Matches in the application, the best first"
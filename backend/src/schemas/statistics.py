@@ -1,13 +1,29 @@
 from __future__ import annotations
 
 import datetime
+from enum import StrEnum
 
 from src.schemas.applicant import ApplicationResponse
 from src.schemas.pydantic_base import BaseSchema
 
 
+class RankingMethod(StrEnum):
+    RRF = "rrf"
+    "Reciprocal rank fusion: sum of 1 / (k + rank + 1) over patron rankings"
+    BORDA = "borda"
+    "Borda count: number of applications placed below, unranked ones share the remaining places"
+    COPELAND = "copeland"
+    "Number of applications beaten by patron majority, ties count as half"
+    SCHULZE = "schulze"
+    "Number of applications beaten by the strongest path of patron majorities"
+    KEMENY = "kemeny"
+    "Order that no swap of two neighbours brings closer to patron rankings (local Kemeny optimum)"
+
+
 class ApplicationRankingStats(BaseSchema):
     application: ApplicationResponse
+    score: float
+    "Score by the requested ranking method, higher is better"
     rrf_score: float
     positive_votes: int
     negative_votes: int
@@ -15,6 +31,17 @@ class ApplicationRankingStats(BaseSchema):
     total_votes: int
 
 
+class ScoresRebuildReport(BaseSchema):
+    applications: int
+    "Number of applications whose scores were recomputed"
+    drifted_applications: list[int]
+    "IDs of applications whose stored scores differed from the recomputed ones"
+    orphaned_scores: int
+    "Number of stored scores that belonged to no application"
+    max_rrf_drift: float
+    "Maximum absolute difference between stored and recomputed RRF scores"
+
+
 class DailyPatronStats(BaseSchema):
     date: datetime.date
     rating_count: int
@@ -0,0 +1,104 @@
+from src.services.aggregation import aggregate_rankings, get_aggregated_ranking_stats, load_rank_matrix
+from src.services.applications import list_applications
+from src.services.daily_stats import DailyStatsAggregator, daily_stats, update_daily_stats, upsert_daily_stats
+from src.services.data_version import bump_data_version, get_data_version
+from src.services.documents import (
+    DOCUMENT_ROW_COLUMNS,
+    application_documents,
+    document_owner_query,
+    download_name,
+    iter_zip,
+)
+from src.services.export import export_available, iter_csv, iter_ndjson, write_export
+from src.services.export_jobs import ExportJob, export_jobs
+from src.services.patron_ranking import apply_ranking_operations, load_patron_ranking, save_patron_ranking
+from src.services.patrons import get_patrons_with_ratings_and_rankings
+from src.services.principals import Principal, PrincipalCache, principal_cache
+from src.services.ranking import RRF_CONST, compute_application_ranking_stats, dense_rankings, timewindow_filter
+from src.services.ratings import save_patron_ratings
+from src.services.scores import (
+    apply_application_removal,
+    apply_ranking_delta,
+    apply_rating_delta,
+    apply_rating_deltas,
+    get_application_ranking_stats,
+    rebuild_scores,
+    remove_patron_contributions,
+)
+from src.services.search import (
+    build_match_query,
+    comment_search_text,
+    extract_pdf_text,
+    rebuild_search_index,
+    search_applications,
+    set_search_texts,
+)
+from src.services.timewindows import TimeWindowRegistry, timewindow_registry
+from src.services.uploads import (
+    BLOBS_DIR,
+    blob_path,
+    discard_staged_uploads,
+    finish_staged_uploads,
+    stage_blob,
+    stage_upload,
+)
+from src.services.writer import WriteQueue, write_queue
+
+__all__ = [
+    "BLOBS_DIR",
+    "DOCUMENT_ROW_COLUMNS",
+    "RRF_CONST",
+    "DailyStatsAggregator",
+    "ExportJob",
+    "Principal",
+    "PrincipalCache",
+    "TimeWindowRegistry",
+    "WriteQueue",
+    "aggregate_rankings",
+    "application_documents",
+    "apply_application_removal",
+    "apply_ranking_delta",
+    "apply_ranking_operations",
+    "apply_rating_delta",
+    "apply_rating_deltas",
+    "blob_path",
+    "build_match_query",
+    "bump_data_version",
+    "comment_search_text",
+    "compute_application_ranking_stats",
+    "daily_stats",
+    "dense_rankings",
+    "discard_staged_uploads",
+    "document_owner_query",
+    "download_name",
+    "export_available",
+    "export_jobs",
+    "extract_pdf_text",
+    "finish_staged_uploads",
+    "get_aggregated_ranking_stats",
+    "get_application_ranking_stats",
+    "get_data_version",
+    "get_patrons_with_ratings_and_rankings",
+    "iter_csv",
+    "iter_ndjson",
+    "iter_zip",
+    "list_applications",
+    "load_patron_ranking",
+    "load_rank_matrix",
+    "principal_cache",
+    "rebuild_scores",
+    "rebuild_search_index",
+    "remove_patron_contributions",
+    "save_patron_ranking",
+    "save_patron_ratings",
+    "search_applications",
+    "set_search_texts",
+    "stage_blob",
+    "stage_upload",
+    "timewindow_filter",
+    "timewindow_registry",
+    "update_daily_stats",
+    "upsert_daily_stats",
+    "write_export",
+    "write_queue",
+]
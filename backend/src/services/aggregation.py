@@ -0,0 +1,190 @@
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.db.models import Application, TimeWindow
+from src.schemas import ApplicationRankingStats, RankingMethod
+from src.services.ranking import RRF_CONST, dense_rankings, timewindow_filter
+from src.services.scores import get_application_ranking_stats
+
+
+@dataclass
+class RankMatrix:
+    """
+    Dense patron x application matrix of rankings
+    """
+
+    application_ids: np.ndarray
+    "Sorted IDs of applications, columns of the matrix"
+    ranked: np.ndarray
+    "Whether the patron ranked the application"
+    ranks: np.ndarray
+    "Stored rank of the application in the patron ranking, 0 where not ranked"
+    positions: np.ndarray
+    "Position of the application among ones the patron ranked within the matrix, number of applications if not ranked"
+
+
+def build_rank_matrix(application_ids: np.ndarray, patron_ids: np.ndarray, rankings: np.ndarray) -> RankMatrix:
+    """
+    Build the matrix from (patron_id, application_id, rank) rows, applications not in `application_ids` are dropped
+    """
+    application_ids = np.asarray(application_ids, dtype=np.int64)
+    rankings = np.asarray(rankings, dtype=np.int64).reshape(-1, 3)
+    rankings = rankings[np.isin(rankings[:, 1], application_ids)]
+    n_applications = len(application_ids)
+
+    rows = np.searchsorted(patron_ids, rankings[:, 0])
+    columns = np.searchsorted(application_ids, rankings[:, 1])
+    ranked = np.zeros((len(patron_ids), n_applications), dtype=bool)
+    ranked[rows, columns] = True
+    ranks = np.zeros((len(patron_ids), n_applications), dtype=np.int64)
+    ranks[rows, columns] = rankings[:, 2]
+
+    # ranked applications go first in the order of their ranks, so their positions are dense
+    order = np.argsort(np.where(ranked, ranks, np.iinfo(np.int64).max), axis=1, kind="stable")
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.broadcast_to(np.arange(n_applications), order.shape), axis=1)
+    positions[~ranked] = n_applications
+    return RankMatrix(application_ids=application_ids, ranked=ranked, ranks=ranks, positions=positions)
+
+
+def load_rank_matrix(session: Session, timewindow: TimeWindow | None) -> RankMatrix:
+    """
+    Build the matrix of all applications in the timewindow and the rankings of them
+    """
+    application_ids = np.fromiter(
+        session.scalars(select(Application.id).where(timewindow_filter(timewindow)).order_by(Application.id)),
+        dtype=np.int64,
+    )
+    ranked = dense_rankings()
+    rankings = np.array(
+        session.execute(
+            select(ranked.c.patron_id, ranked.c.application_id, ranked.c.rank)
+            .join(Application, Application.id == ranked.c.application_id)
+            .where(timewindow_filter(timewindow))
+        ).all(),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    return build_rank_matrix(application_ids, np.unique(rankings[:, 0]), rankings)
+
+
+def rrf_scores(matrix: RankMatrix, k: int = RRF_CONST) -> np.ndarray:
+    return np.where(matrix.ranked, 1.0 / (k + matrix.ranks + 1), 0.0).sum(axis=0)
+
+
+def borda_scores(matrix: RankMatrix) -> np.ndarray:
+    n_applications = len(matrix.application_ids)
+    n_ranked = matrix.ranked.sum(axis=1, keepdims=True)
+    points = np.where(matrix.ranked, n_applications - 1 - matrix.positions, (n_applications - n_ranked - 1) / 2)
+    return points.sum(axis=0)
+
+
+def ranked_candidates(matrix: RankMatrix) -> np.ndarray:
+    """
+    Columns of applications ranked by at least one patron. Every other application is preferred by nobody and loses
+    to each candidate, so pairwise methods only need to order the candidates
+    """
+    return np.flatnonzero(matrix.ranked.any(axis=0))
+
+
+def pairwise_preferences(matrix: RankMatrix, candidates: np.ndarray) -> np.ndarray:
+    """
+    Number of patrons preferring candidate i to candidate j, ranked applications are preferred to unranked ones
+    """
+    positions = matrix.positions[:, candidates]
+    dtype = np.uint8 if len(positions) <= np.iinfo(np.uint8).max else np.int32
+    preferences = np.zeros((len(candidates), len(candidates)), dtype=dtype)
+    for patron_positions in positions:
+        preferences += patron_positions[:, None] < patron_positions[None, :]
+    return preferences
+
+
+def copeland_scores(matrix: RankMatrix) -> np.ndarray:
+    candidates = ranked_candidates(matrix)
+    preferences = pairwise_preferences(matrix, candidates)
+    n_others = len(matrix.application_ids) - len(candidates)
+
+    scores = np.full(len(matrix.application_ids), (n_others - 1) / 2)
+    wins = (preferences > preferences.T).sum(axis=1)
+    ties = (preferences == preferences.T).sum(axis=1) - 1  # excluding itself
+    scores[candidates] = wins + ties / 2 + n_others
+    return scores
+
+
+def schulze_scores(matrix: RankMatrix) -> np.ndarray:
+    candidates = ranked_candidates(matrix)
+    preferences = pairwise_preferences(matrix, candidates)
+    n_others = len(matrix.application_ids) - len(candidates)
+
+    # widest paths by Floyd-Warshall, each step relaxes all pairs through one candidate at once
+    strengths = np.where(preferences > preferences.T, preferences, 0).astype(preferences.dtype)
+    for k in range(len(candidates)):
+        np.maximum(strengths, np.minimum(strengths[:, k : k + 1], strengths[k : k + 1, :]), out=strengths)
+
+    scores = np.zeros(len(matrix.application_ids))
+    scores[candidates] = (strengths > strengths.T).sum(axis=1) + n_others
+    return scores
+
+
+def kemeny_scores(matrix: RankMatrix, max_passes: int | None = None) -> np.ndarray:
+    """
+    Start from Copeland order and swap neighbours while more patrons prefer the lower one (local Kemenization).
+    Odd and even pairs are swapped in turn, so that all swaps of a pass are independent and done at once
+    """
+    candidates = ranked_candidates(matrix)
+    preferences = pairwise_preferences(matrix, candidates).astype(np.int32)
+    n_others = len(matrix.application_ids) - len(candidates)
+    n_candidates = len(candidates)
+
+    wins = (preferences > preferences.T).sum(axis=1) + (preferences == preferences.T).sum(axis=1) / 2
+    order = np.argsort(-wins, kind="stable")
+    for _ in range(max_passes or n_candidates + 1):
+        swapped = False
+        for start in (0, 1):
+            upper = np.arange(start, n_candidates - 1, 2)
+            gain = preferences[order[upper + 1], order[upper]] - preferences[order[upper], order[upper + 1]]
+            upper = upper[gain > 0]
+            if len(upper):
+                order[upper], order[upper + 1] = order[upper + 1], order[upper].copy()
+                swapped = True
+        if not swapped:
+            break
+
+    scores = np.zeros(len(matrix.application_ids))
+    scores[candidates[order]] = np.arange(n_candidates)[::-1] + n_others
+    return scores
+
+
+def aggregate_rankings(matrix: RankMatrix, method: RankingMethod, rrf_k: int = RRF_CONST) -> np.ndarray:
+    """
+    Score of every application of the matrix by the method, higher is better
+    """
+    if method == RankingMethod.RRF:
+        return rrf_scores(matrix, rrf_k)
+    if method == RankingMethod.BORDA:
+        return borda_scores(matrix)
+    if method == RankingMethod.COPELAND:
+        return copeland_scores(matrix)
+    if method == RankingMethod.SCHULZE:
+        return schulze_scores(matrix)
+    return kemeny_scores(matrix)
+
+
+def get_aggregated_ranking_stats(
+    session: Session, timewindow: TimeWindow | None, method: RankingMethod, rrf_k: int = RRF_CONST
+) -> list[ApplicationRankingStats]:
+    """
+    Applications of the timewindow with their stored votes, ordered by the score of the aggregation method
+    """
+    stats = get_application_ranking_stats(session, timewindow)
+    if method == RankingMethod.RRF and rrf_k == RRF_CONST:
+        return stats
+
+    matrix = load_rank_matrix(session, timewindow)
+    scores = dict(zip(matrix.application_ids.tolist(), aggregate_rankings(matrix, method, rrf_k).tolist(), strict=True))
+    for s in stats:
+        s.score = scores.get(s.application.id, 0.0)
+    stats.sort(key=lambda s: (-s.score, s.application.id))
+    return stats
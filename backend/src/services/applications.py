@@ -0,0 +1,197 @@
+import base64
+import json
+import string
+
+from sqlalchemy import (
+    Boolean,
+    ColumnElement,
+    Select,
+    String,
+    and_,
+    func,
+    literal,
+    literal_column,
+    not_,
+    or_,
+    select,
+    type_coerce,
+    union_all,
+)
+from sqlalchemy.orm import Session
+
+from src.db.loaders import APPLICATION_RESPONSE_COLUMNS
+from src.db.models import Application, PatronRanking, PatronRateApplication, TimeWindow
+from src.schemas import ApplicationResponse, ApplicationSort, ApplicationsQuery, Rating
+from src.services.ranking import timewindow_filter
+
+DOCUMENT_FILTERS = {
+    "has_cv": Application.cv,
+    "has_motivational_letter": Application.motivational_letter,
+    "has_recommendation_letter": Application.recommendation_letter,
+    "has_transcript": Application.transcript,
+    "has_almost_a_student": Application.almost_a_student,
+}
+"Flags of `ApplicationsQuery` and the document columns they check"
+
+UNRANKED_FIRST, UNRANKED_LAST = "", "~"
+"Sort keys of applications the patron has not ranked: rank keys are non-empty and made of digits and letters"
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+"`lower()` of SQLite changes only Latin letters"
+
+SUBMITTED_AT_TEXT = type_coerce(Application.submitted_at, String)
+"""
+`submitted_at` as stored, sorted and compared without conversion so that its index is used.
+The server default stores whole seconds while `UTCDateTime` binds microseconds, so a cursor keeps the stored text:
+a datetime bound for the comparison would sort after every row of its second
+"""
+
+
+def _prefix_filter(column: ColumnElement[str], prefix: str) -> ColumnElement[bool]:
+    """
+    Prefix match as a range of `lower(column)`, so that the expression index is used, unlike with `LIKE`
+    """
+    start = prefix.translate(_ASCII_LOWER)
+    end = start[:-1] + chr(ord(start[-1]) + 1)
+    return and_(func.lower(column) >= start, func.lower(column) < end)
+
+
+def _encode_cursor(query: ApplicationsQuery, application_id: int, sort_value: object) -> str:
+    """
+    Opaque cursor pointing after the application, it remembers the sorting to reject a cursor of another one
+    """
+    payload = [query.sort.value, query.descending, sort_value, application_id]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(query: ApplicationsQuery) -> tuple[str, int]:
+    """
+    Sort value and ID of the last application of the previous page
+    """
+    try:
+        padded = query.cursor + "=" * (-len(query.cursor) % 4)
+        sort, descending, sort_value, application_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if sort != query.sort.value or descending != query.descending or not isinstance(application_id, int):
+        raise ValueError("Cursor belongs to another sorting")
+    if not isinstance(sort_value, str):
+        raise ValueError("Invalid cursor")
+    return sort_value, application_id
+
+
+def _select(patron_id: int, query: ApplicationsQuery, timewindow: TimeWindow | None, sort_value) -> Select:
+    """
+    Response columns and `sort_value` of the applications matching the filters
+    """
+    in_timewindow = timewindow_filter(timewindow)
+    if query.sort != ApplicationSort.SUBMITTED_AT:
+        # a timewindow holds a large part of the applications: without the hint SQLite would rather search
+        # all of them by `submitted_at` and sort them than walk the index of the requested order
+        in_timewindow = func.likelihood(in_timewindow, literal_column("0.9"), type_=Boolean)
+    statement = select(*APPLICATION_RESPONSE_COLUMNS, sort_value.label("sort_value")).where(in_timewindow)
+    if query.prefix is not None:
+        statement = statement.where(
+            or_(_prefix_filter(Application.full_name, query.prefix), _prefix_filter(Application.email, query.prefix))
+        )
+    for flag, column in DOCUMENT_FILTERS.items():
+        has_document = getattr(query, flag)
+        if has_document is not None:
+            statement = statement.where(column.is_not(None) if has_document else column.is_(None))
+
+    if query.rated is not None or query.rating:
+        statement = statement.outerjoin(
+            PatronRateApplication,
+            and_(PatronRateApplication.application_id == Application.id, PatronRateApplication.patron_id == patron_id),
+        )
+    if query.rated is not None:
+        rated = and_(PatronRateApplication.rate.is_not(None), PatronRateApplication.rate != Rating.UNRATED)
+        statement = statement.where(rated if query.rated else not_(rated))
+    if query.rating:
+        matches_rating = PatronRateApplication.rate.in_(query.rating)
+        if Rating.UNRATED in query.rating:
+            matches_rating = or_(matches_rating, PatronRateApplication.rate.is_(None))
+        statement = statement.where(matches_rating)
+    return statement
+
+
+def _after(
+    sort_column: ColumnElement, id_column: ColumnElement[int], cursor: tuple[str, int], descending: bool
+) -> ColumnElement[bool]:
+    """
+    Rows after the cursor, spelled out instead of a row value comparison, so that SQLite seeks the index
+    of an expression like `lower(full_name)` to the cursor instead of scanning it from the start
+    """
+    sort_value, application_id = cursor
+    if descending:
+        return and_(sort_column <= sort_value, or_(sort_column < sort_value, id_column < application_id))
+    return and_(sort_column >= sort_value, or_(sort_column > sort_value, id_column > application_id))
+
+
+def _ordered(statement: Select, sort_column: ColumnElement, id_column: ColumnElement[int], descending: bool) -> Select:
+    if descending:
+        return statement.order_by(sort_column.desc(), id_column.desc())
+    return statement.order_by(sort_column, id_column)
+
+
+def _applications_query(
+    patron_id: int, query: ApplicationsQuery, timewindow: TimeWindow | None, limit: int | None
+) -> Select:
+    """
+    Applications matching the filters in the requested order, starting after the cursor
+    """
+    cursor = _decode_cursor(query) if query.cursor is not None else None
+
+    if query.sort != ApplicationSort.MY_RANK:
+        if query.sort == ApplicationSort.SUBMITTED_AT:
+            sort_column = SUBMITTED_AT_TEXT
+        else:
+            sort_column = func.lower(Application.full_name)
+        statement = _select(patron_id, query, timewindow, sort_column)
+        if cursor is not None:
+            statement = statement.where(_after(sort_column, Application.id, cursor, query.descending))
+        return _ordered(statement, sort_column, Application.id, query.descending).limit(limit)
+
+    # applications the patron has ranked in the order of the ranking index, then the others by ID.
+    # Each part reads its own index in order, sorting by a coalesced rank key would sort the whole timewindow
+    unranked_key = UNRANKED_FIRST if query.descending else UNRANKED_LAST
+    ranked = _select(patron_id, query, timewindow, PatronRanking.rank_key).join(
+        PatronRanking,
+        and_(PatronRanking.application_id == Application.id, PatronRanking.patron_id == patron_id),
+    )
+    is_ranked = (
+        select(PatronRanking.application_id)
+        .where(PatronRanking.application_id == Application.id, PatronRanking.patron_id == patron_id)
+        .exists()
+    )
+    unranked = _select(patron_id, query, timewindow, literal(unranked_key)).where(~is_ranked)
+    if cursor is not None:
+        ranked = ranked.where(_after(PatronRanking.rank_key, Application.id, cursor, query.descending))
+        sort_value, application_id = cursor
+        if sort_value == unranked_key:
+            unranked = unranked.where(
+                Application.id < application_id if query.descending else Application.id > application_id
+            )
+    ranked = _ordered(ranked, PatronRanking.rank_key, Application.id, query.descending).limit(limit)
+    unranked = _ordered(unranked, Application.id, Application.id, query.descending).limit(limit)
+    # the key of unranked applications sorts after the rank keys in both directions
+    parts = union_all(select(ranked.subquery()), select(unranked.subquery())).subquery()
+    return _ordered(select(parts), parts.c.sort_value, parts.c.id, query.descending).limit(limit)
+
+
+def list_applications(
+    session: Session, patron_id: int, query: ApplicationsQuery, timewindow: TimeWindow | None
+) -> tuple[list[ApplicationResponse], str | None]:
+    """
+    A page of applications and the cursor of the next one, None if it is the last page.
+    Raises ValueError for a cursor that is invalid or belongs to another sorting
+    """
+    # one more row tells if there is a next page
+    limit = query.limit + 1 if query.limit is not None else None
+    rows = session.execute(_applications_query(patron_id, query, timewindow, limit)).all()
+
+    has_next_page = query.limit is not None and len(rows) > query.limit
+    rows = rows[: query.limit]
+    applications = [ApplicationResponse.model_validate(row, from_attributes=True) for row in rows]
+    next_cursor = _encode_cursor(query, rows[-1].id, rows[-1].sort_value) if has_next_page else None
+    return applications, next_cursor
@@ -0,0 +1,122 @@
+import datetime
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, SessionTransaction
+
+from src.config import settings
+from src.db.models import Patron, PatronDailyStats
+
+Increments = dict[tuple[datetime.date, int], list[int]]
+"(date, patron ID) -> [rating increment, ranking increment]"
+
+PENDING_INCREMENTS = "daily_stats_increments"
+"Key in `Session.info` of the increments waiting for the commit when the aggregator is enabled"
+
+
+def upsert_daily_stats(session: Session, increments: Increments) -> None:
+    """
+    Add the increments to the counters with one `INSERT ... ON CONFLICT DO UPDATE`,
+    so concurrent writes for the same patron and day cannot race on the primary key
+    """
+    if not increments:
+        return
+    statement = insert(PatronDailyStats)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PatronDailyStats.date, PatronDailyStats.patron_id],
+        set_={
+            "rating_count": PatronDailyStats.rating_count + statement.excluded.rating_count,
+            "ranking_count": PatronDailyStats.ranking_count + statement.excluded.ranking_count,
+        },
+    )
+    session.execute(
+        statement,
+        [
+            {"date": date, "patron_id": patron_id, "rating_count": rating_count, "ranking_count": ranking_count}
+            for (date, patron_id), (rating_count, ranking_count) in increments.items()
+        ],
+    )
+
+
+class DailyStatsAggregator:
+    """
+    Increments of daily activity counters coalesced in memory, written by `flush()`.
+    When enabled, a rating or ranking does not touch `patron_daily_stats` at all, and the lifespan flushes
+    every `settings.daily_stats_flush_interval_seconds` and at shutdown; increments are lost if the process is killed
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._increments: Increments = defaultdict(lambda: [0, 0])
+
+    def add(
+        self, patron_id: int, rating_increment: int = 0, ranking_increment: int = 0, date: datetime.date | None = None
+    ) -> None:
+        date = date or datetime.datetime.now(datetime.UTC).date()
+        with self._lock:
+            counters = self._increments[(date, patron_id)]
+            counters[0] += rating_increment
+            counters[1] += ranking_increment
+
+    def flush(self, session: Session) -> None:
+        """
+        Write the increments collected so far, skipping patrons deleted meanwhile
+        """
+        with self._lock:
+            increments, self._increments = self._increments, defaultdict(lambda: [0, 0])
+        if not increments:
+            return
+        patron_ids = {patron_id for _, patron_id in increments}
+        existing = set(session.scalars(select(Patron.id).where(Patron.id.in_(patron_ids))))
+        upsert_daily_stats(session, {key: value for key, value in increments.items() if key[1] in existing})
+
+
+daily_stats = DailyStatsAggregator(enabled=settings.daily_stats_flush_interval_seconds > 0)
+
+
+def update_daily_stats(session: Session, patron_id: int, rating_increment: int = 0, ranking_increment: int = 0):
+    """
+    Count the activity of the patron, in the current transaction or in the aggregator if it is enabled.
+    The aggregator gets the increment only after the commit, so a rolled back write is not counted
+    """
+    today = datetime.datetime.now(datetime.UTC).date()
+    if daily_stats.enabled:
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        pending = session.info.setdefault(PENDING_INCREMENTS, [])
+        pending.append((transaction, today, patron_id, rating_increment, ranking_increment))
+    else:
+        upsert_daily_stats(session, {(today, patron_id): [rating_increment, ranking_increment]})
+
+
+def _is_within(transaction: SessionTransaction | None, ancestor: SessionTransaction) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+def _drop_rolled_back_increments(session: Session, previous_transaction: SessionTransaction) -> None:
+    """
+    Forget the increments of a rolled back savepoint, e.g. a failed unit of a write queue batch, or of the transaction
+    """
+    pending = session.info.get(PENDING_INCREMENTS)
+    if pending:
+        session.info[PENDING_INCREMENTS] = [item for item in pending if not _is_within(item[0], previous_transaction)]
+
+
+def _add_committed_increments(session: Session) -> None:
+    """
+    Pass the increments to the aggregator once the outermost transaction is committed
+    """
+    if session.in_nested_transaction():
+        return
+    for _, date, patron_id, rating_increment, ranking_increment in session.info.pop(PENDING_INCREMENTS, []):
+        daily_stats.add(patron_id, rating_increment, ranking_increment, date)
+
+
+event.listen(Session, "after_soft_rollback", _drop_rolled_back_increments)
+event.listen(Session, "after_commit", _add_committed_increments)
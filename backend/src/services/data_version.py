@@ -0,0 +1,21 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from src.db.models import DataVersion
+
+
+def bump_data_version(session: Session) -> None:
+    """
+    Mark exported data as changed, must be called in the same transaction as the write
+    """
+    statement = insert(DataVersion).values(id=1, version=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[DataVersion.id],
+        set_={"version": DataVersion.version + 1},
+    )
+    session.execute(statement)
+
+
+def get_data_version(session: Session) -> int:
+    return session.scalar(select(DataVersion.version).where(DataVersion.id == 1)) or 0
@@ -0,0 +1,107 @@
+import zipfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from sqlalchemy import Row, Select, or_, select
+
+from src.db.models import Application
+from src.logging_ import logger
+from src.services.uploads import UPLOAD_CHUNK_SIZE
+
+DOCUMENT_COLUMNS = (
+    (Application.cv, "cv"),
+    (Application.transcript, "transcript"),
+    (Application.motivational_letter, "motivational-letter"),
+    (Application.recommendation_letter, "recommendation-letter"),
+    (Application.almost_a_student, "almost-a-student"),
+)
+"Document columns of `Application` and names of their files in archives"
+
+DOCUMENT_ROW_COLUMNS = (Application.email, *(column for column, _ in DOCUMENT_COLUMNS))
+"Columns needed by `application_documents`"
+
+
+def application_documents(application: Row, files_dir: Path, folder: bool) -> list[tuple[str, Path]]:
+    """
+    Names in an archive and paths of the documents of the application, in a folder named by the email if asked
+    """
+    documents = []
+    for column, name in DOCUMENT_COLUMNS:
+        relative_path = getattr(application, column.key)
+        if relative_path is None:
+            continue
+        path = files_dir / relative_path
+        archive_name = f"{name}{path.suffix}"
+        documents.append((f"{application.email}/{archive_name}" if folder else archive_name, path))
+    return documents
+
+
+def document_owner_query(relative_path: str) -> Select:
+    """
+    Email and documents of the latest application storing a document at the path, for `download_name`
+    """
+    return (
+        select(*DOCUMENT_ROW_COLUMNS)
+        .where(or_(*(column == relative_path for column, _ in DOCUMENT_COLUMNS)))
+        .order_by(Application.id.desc())
+        .limit(1)
+    )
+
+
+def download_name(application: Row, relative_path: str) -> str | None:
+    """
+    Name of a downloaded document, `<email>_<document>.<ext>`, as it was before documents became blobs
+    """
+    for column, name in DOCUMENT_COLUMNS:
+        if getattr(application, column.key) == relative_path:
+            return f"{application.email}_{name}{Path(relative_path).suffix}"
+    return None
+
+
+class _ChunkSink:
+    """
+    Write-only file object collecting what `zipfile` writes, so that the archive can be yielded in pieces.
+    It cannot seek, so `zipfile` writes sizes and checksums after the data of each entry
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        """
+        Bytes written since the last call
+        """
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def iter_zip(documents: Iterable[tuple[str, Path]]) -> Iterator[bytes]:
+    """
+    ZIP archive of the files built while it is sent: memory use does not depend on the size of the files
+    and nothing is written to disk. PDFs and XLSX workbooks are compressed already, so entries are stored as is.
+    Missing files are skipped, the response has started by the time they are noticed
+    """
+    sink = _ChunkSink()
+    missing = []
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for archive_name, path in documents:
+            try:
+                source = path.open("rb")
+            except FileNotFoundError:
+                missing.append(archive_name)
+                continue
+            with source, archive.open(zipfile.ZipInfo.from_file(path, archive_name), "w") as entry:
+                while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                    entry.write(chunk)
+                    yield sink.pop()
+    # the data descriptor of the last entry and the central directory
+    yield sink.pop()
+    if missing:
+        logger.warning(f"{len(missing)} missing files skipped in archive: {missing[:10]}")
@@ -0,0 +1,323 @@
+import csv
+import io
+import itertools
+import json
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+
+import xlsxwriter
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+
+from src.db.models import Application, ApplicationScore, Patron, PatronRanking, PatronRateApplication, TimeWindow
+from src.schemas import ExportFormat
+from src.services.ranking import dense_rankings, timewindow_filter
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow is in the optional "parquet" extra, needed only for Parquet export
+    pyarrow = None
+
+YIELD_PER = 500
+"Number of rows fetched from the database cursor at once"
+
+ProgressCallback = Callable[[int], None]
+"Called with the number of rows written so far"
+
+APPLICATION_COLUMNS = (
+    "ID",
+    "Email",
+    "Full Name",
+    "Submitted At",
+    "RRF Score",
+    "Positive Votes",
+    "Negative Votes",
+    "Neutral Votes",
+    "Total Votes",
+    "Has CV",
+    "Has Transcript",
+    "Has Motivational Letter",
+    "Has Recommendation Letter",
+    "Has Almost A Student",
+)
+
+
+def iter_application_rows(session: Session, timewindow: TimeWindow | None) -> Iterator[dict]:
+    """
+    Stream applications of the timewindow with their scores, ordered by RRF score
+    """
+    query = (
+        select(
+            Application.id,
+            Application.email,
+            Application.full_name,
+            Application.submitted_at,
+            ApplicationScore.rrf_score,
+            ApplicationScore.positive_votes,
+            ApplicationScore.negative_votes,
+            ApplicationScore.neutral_votes,
+            ApplicationScore.rater_count,
+            Application.cv,
+            Application.transcript,
+            Application.motivational_letter,
+            Application.recommendation_letter,
+            Application.almost_a_student,
+        )
+        .select_from(ApplicationScore)
+        .join(Application, Application.id == ApplicationScore.application_id)
+        .where(timewindow_filter(timewindow))
+        .order_by(ApplicationScore.rrf_score.desc(), Application.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for row in session.execute(query):
+        yield {
+            "ID": row.id,
+            "Email": row.email,
+            "Full Name": row.full_name,
+            "Submitted At": row.submitted_at,
+            "RRF Score": row.rrf_score,
+            "Positive Votes": row.positive_votes,
+            "Negative Votes": row.negative_votes,
+            "Neutral Votes": row.neutral_votes,
+            "Total Votes": row.rater_count,
+            "Has CV": bool(row.cv),
+            "Has Transcript": bool(row.transcript),
+            "Has Motivational Letter": bool(row.motivational_letter),
+            "Has Recommendation Letter": bool(row.recommendation_letter),
+            "Has Almost A Student": bool(row.almost_a_student),
+        }
+
+
+def get_max_ranking_length(session: Session, timewindow: TimeWindow | None) -> int:
+    """
+    Length of the longest patron ranking within the timewindow
+    """
+    lengths = (
+        select(func.count().label("length"))
+        .select_from(PatronRanking)
+        .join(Application, Application.id == PatronRanking.application_id)
+        .where(timewindow_filter(timewindow))
+        .group_by(PatronRanking.patron_id)
+        .subquery()
+    )
+    return session.scalar(select(func.coalesce(func.max(lengths.c.length), 0)))
+
+
+def iter_ranking_rows(session: Session, timewindow: TimeWindow | None) -> Iterator[tuple[str, list[str]]]:
+    """
+    Stream every patron with emails of the applications they ranked within the timewindow, in ranked order
+    """
+    patrons = session.execute(select(Patron.id, Patron.telegram_data).order_by(Patron.id)).all()
+    rankings = session.execute(
+        select(PatronRanking.patron_id, Application.email)
+        .join(Application, Application.id == PatronRanking.application_id)
+        .where(timewindow_filter(timewindow))
+        .order_by(PatronRanking.patron_id, PatronRanking.rank_key)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    emails_by_patron = itertools.groupby(rankings, key=lambda row: row.patron_id)
+    patron_id, emails = next(emails_by_patron, (None, iter(())))
+
+    for patron in patrons:
+        name = patron.telegram_data.get("username", f"id: {patron.id}")
+        if patron.id == patron_id:
+            yield name, [row.email for row in emails]
+            patron_id, emails = next(emails_by_patron, (None, iter(())))
+        else:
+            yield name, []
+
+
+def track_progress(rows: Iterable, progress: ProgressCallback | None, start: int = 0) -> Iterator:
+    """
+    Report number of rows consumed from the iterable every `YIELD_PER` rows and at the end
+    """
+    count = start
+    for count, row in enumerate(rows, start=start + 1):  # noqa: B007
+        yield row
+        if progress is not None and count % YIELD_PER == 0:
+            progress(count)
+    if progress is not None:
+        progress(count)
+
+
+def count_export_rows(session: Session, timewindow: TimeWindow | None, export_format: ExportFormat) -> int:
+    """
+    Number of rows the export will contain, to report progress
+    """
+    applications = session.scalar(
+        select(func.count())
+        .select_from(ApplicationScore)
+        .join(Application, Application.id == ApplicationScore.application_id)
+        .where(timewindow_filter(timewindow))
+    )
+    if export_format in (ExportFormat.CSV, ExportFormat.NDJSON):
+        return applications
+    patrons = session.scalar(select(func.count()).select_from(Patron))
+    if export_format == ExportFormat.XLSX:
+        return applications + patrons
+    return applications * patrons
+
+
+def write_xlsx(
+    session: Session, timewindow: TimeWindow | None, path: Path, progress: ProgressCallback | None = None
+) -> None:
+    """
+    Write applications ranking and patron rankings to the XLSX file row by row, keeping only one row in memory
+    """
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    header_format = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    datetime_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+
+    applications_sheet = workbook.add_worksheet("Applications Ranking")
+    applications_sheet.write_row(0, 0, APPLICATION_COLUMNS, header_format)
+    application_rows = track_progress(iter_application_rows(session, timewindow), progress)
+    row_number = 0
+    for row_number, row in enumerate(application_rows, start=1):
+        for column_number, column in enumerate(APPLICATION_COLUMNS):
+            if column == "Submitted At":
+                applications_sheet.write_datetime(
+                    row_number, column_number, row[column].replace(tzinfo=None), datetime_format
+                )
+            else:
+                applications_sheet.write(row_number, column_number, row[column])
+
+    rankings_sheet = workbook.add_worksheet("Rankings")
+    max_ranking_length = get_max_ranking_length(session, timewindow)
+    rankings_sheet.write_row(0, 0, ["patron", *map(str, range(1, max_ranking_length + 1))], header_format)
+    ranking_rows = track_progress(iter_ranking_rows(session, timewindow), progress, start=row_number)
+    for row_number, (patron, emails) in enumerate(ranking_rows, start=1):
+        rankings_sheet.write_row(row_number, 0, [patron, *emails])
+
+    workbook.close()
+
+
+def iter_csv(session: Session, timewindow: TimeWindow | None) -> Iterator[str]:
+    """
+    Stream applications ranking as CSV lines
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=APPLICATION_COLUMNS)
+
+    def flush() -> str:
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writeheader()
+    yield flush()
+    for row in iter_application_rows(session, timewindow):
+        writer.writerow({**row, "Submitted At": row["Submitted At"].isoformat()})
+        yield flush()
+
+
+def iter_ndjson(session: Session, timewindow: TimeWindow | None) -> Iterator[str]:
+    """
+    Stream applications ranking as newline-delimited JSON objects
+    """
+    for row in iter_application_rows(session, timewindow):
+        yield json.dumps({**row, "Submitted At": row["Submitted At"].isoformat()}, ensure_ascii=False) + "\n"
+
+
+def iter_rating_matrix_rows(session: Session, timewindow: TimeWindow | None) -> Iterator[dict]:
+    """
+    Stream rating and rank of every (application, patron) pair within the timewindow, None if absent
+    """
+    rankings = dense_rankings()
+    query = (
+        select(
+            Application.id.label("application_id"),
+            Application.email,
+            Application.full_name,
+            ApplicationScore.rrf_score,
+            Patron.id.label("patron_id"),
+            Patron.telegram_data,
+            PatronRateApplication.rate,
+            rankings.c.rank,
+        )
+        .select_from(ApplicationScore)
+        .join(Application, Application.id == ApplicationScore.application_id)
+        .join(Patron, true())
+        .outerjoin(
+            PatronRateApplication,
+            (PatronRateApplication.application_id == Application.id) & (PatronRateApplication.patron_id == Patron.id),
+        )
+        .outerjoin(
+            rankings,
+            (rankings.c.application_id == Application.id) & (rankings.c.patron_id == Patron.id),
+        )
+        .where(timewindow_filter(timewindow))
+        .order_by(ApplicationScore.rrf_score.desc(), Application.id, Patron.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for row in session.execute(query):
+        yield {
+            "application_id": row.application_id,
+            "email": row.email,
+            "full_name": row.full_name,
+            "rrf_score": row.rrf_score,
+            "patron_id": row.patron_id,
+            "patron": row.telegram_data.get("username", f"id: {row.patron_id}"),
+            "rate": row.rate.value if row.rate is not None else None,
+            "rank": row.rank,
+        }
+
+
+def write_parquet(
+    session: Session, timewindow: TimeWindow | None, path: Path, progress: ProgressCallback | None = None
+) -> None:
+    """
+    Write application x patron rating matrix to the Parquet file in row groups of bounded size
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet export requires pyarrow to be installed")
+
+    schema = pyarrow.schema(
+        [
+            ("application_id", pyarrow.int64()),
+            ("email", pyarrow.string()),
+            ("full_name", pyarrow.string()),
+            ("rrf_score", pyarrow.float64()),
+            ("patron_id", pyarrow.int64()),
+            ("patron", pyarrow.string()),
+            ("rate", pyarrow.string()),
+            ("rank", pyarrow.int64()),
+        ]
+    )
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        rows = track_progress(iter_rating_matrix_rows(session, timewindow), progress)
+        for batch in itertools.batched(rows, YIELD_PER * 10):
+            writer.write_batch(pyarrow.RecordBatch.from_pylist(list(batch), schema=schema))
+
+
+def export_available(export_format: ExportFormat) -> bool:
+    """
+    Whether dependencies needed for the export format are installed
+    """
+    return export_format != ExportFormat.PARQUET or pyarrow is not None
+
+
+def write_export(
+    session: Session,
+    timewindow: TimeWindow | None,
+    export_format: ExportFormat,
+    path: Path,
+    progress: ProgressCallback | None = None,
+) -> None:
+    """
+    Write export of the given format to the file
+    """
+    if export_format == ExportFormat.XLSX:
+        write_xlsx(session, timewindow, path, progress)
+    elif export_format == ExportFormat.PARQUET:
+        write_parquet(session, timewindow, path, progress)
+    else:
+        if export_format == ExportFormat.CSV:
+            lines = iter_csv(session, timewindow)
+            header = [next(lines)]
+        else:
+            lines, header = iter_ndjson(session, timewindow), []
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.writelines(header)
+            f.writelines(track_progress(lines, progress))
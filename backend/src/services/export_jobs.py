@@ -0,0 +1,186 @@
+import datetime
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.db import SessionLocal
+from src.db.models import TimeWindow
+from src.logging_ import logger
+from src.schemas import ExportFormat, ExportJobResponse, ExportJobStatus
+from src.services.data_version import get_data_version
+from src.services.export import count_export_rows, write_export
+
+
+def export_cache_key(timewindow: TimeWindow | None, export_format: ExportFormat, data_version: int) -> str:
+    """
+    Identify export artifact by everything its content depends on
+    """
+    if timewindow is None:
+        scope = "all"
+    else:
+        scope = f"{timewindow.id}:{timewindow.start.isoformat()}:{timewindow.end.isoformat()}"
+    return hashlib.sha256(f"{scope}|{export_format}|{data_version}".encode()).hexdigest()
+
+
+@dataclass
+class ExportJob:
+    id: str
+    format: ExportFormat
+    timewindow_id: int | None
+    key: str
+    status: ExportJobStatus = ExportJobStatus.PENDING
+    cached: bool = False
+    rows_written: int = 0
+    rows_total: int | None = None
+    error: str | None = None
+    created_at: datetime.datetime = field(default_factory=lambda: datetime.datetime.now(datetime.UTC))
+    finished_at: datetime.datetime | None = None
+    path: Path | None = None
+
+    def to_response(self) -> ExportJobResponse:
+        return ExportJobResponse.model_validate(self, from_attributes=True)
+
+
+class ExportJobManager:
+    """
+    Run exports in a thread pool and keep their artifacts in `settings.exports_dir`, keyed by the data version,
+    so that repeated exports of unchanged data are served from the disk
+    """
+
+    def __init__(self, exports_dir: Path, workers: int, max_size_bytes: int, max_age: datetime.timedelta):
+        self.exports_dir = exports_dir
+        self.max_size_bytes = max_size_bytes
+        self.max_age = max_age
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._jobs: dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+
+    def artifact_path(self, key: str, export_format: ExportFormat) -> Path:
+        return self.exports_dir / f"{key}.{export_format}"
+
+    def submit(self, session: Session, timewindow: TimeWindow | None, export_format: ExportFormat) -> ExportJob:
+        """
+        Return a finished job if the artifact is cached, a running job for the same export, or start a new one
+        """
+        key = export_cache_key(timewindow, export_format, get_data_version(session))
+        path = self.artifact_path(key, export_format)
+        timewindow_id = timewindow.id if timewindow is not None else None
+
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and job.status in (ExportJobStatus.PENDING, ExportJobStatus.RUNNING):
+                    return job
+
+            job = ExportJob(id=uuid.uuid4().hex, format=export_format, timewindow_id=timewindow_id, key=key)
+            self._jobs[job.id] = job
+            if path.exists():
+                os.utime(path)  # mark as recently used for eviction
+                job.status, job.cached, job.path = ExportJobStatus.DONE, True, path
+                job.finished_at = job.created_at
+                return job
+
+            # started on demand, so that the manager keeps working after `shutdown`, e.g. when the app restarts
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export")
+            self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> ExportJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: ExportJob) -> None:
+        job.status = ExportJobStatus.RUNNING
+        tmp_path = path = None
+        try:
+            with SessionLocal() as session:
+                # pysqlite begins transactions only before writes, so each read would see the latest commit.
+                # In an explicit one the whole export reads the snapshot of the data version read first
+                session.connection().exec_driver_sql("BEGIN")
+                timewindow = session.get(TimeWindow, job.timewindow_id) if job.timewindow_id is not None else None
+                key = export_cache_key(timewindow, job.format, get_data_version(session))
+                path = self.artifact_path(key, job.format)
+                if not path.exists():
+                    job.rows_total = count_export_rows(session, timewindow, job.format)
+                    self.exports_dir.mkdir(parents=True, exist_ok=True)
+                    tmp_path = path.with_name(f"{path.name}.{job.id}.tmp")
+
+                    def progress(rows_written: int) -> None:
+                        job.rows_written = rows_written
+
+                    write_export(session, timewindow, job.format, tmp_path, progress)
+                    tmp_path.replace(path)
+                else:
+                    job.cached = True
+            job.path = path
+            job.status = ExportJobStatus.DONE
+        except Exception as e:
+            logger.exception(f"Export job {job.id} failed")
+            job.error = str(e)
+            job.status = ExportJobStatus.FAILED
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+        finally:
+            job.finished_at = datetime.datetime.now(datetime.UTC)
+            self.evict(keep=path)
+
+    def evict(self, keep: Path | None = None) -> None:
+        """
+        Delete artifacts older than `max_age`, then the least recently used ones until total size fits the limit.
+        The `keep` artifact is not deleted, even if it is larger than the limit alone: its job has just finished
+        """
+        if not self.exports_dir.exists():
+            return
+        with self._lock:
+            artifacts = []
+            for path in self.exports_dir.iterdir():
+                if path.suffix == ".tmp":  # being written right now
+                    continue
+                stat = path.stat()
+                artifacts.append((stat.st_mtime, stat.st_size, path))
+            artifacts.sort()
+
+            now = datetime.datetime.now(datetime.UTC)
+            expire_before = (now - self.max_age).timestamp()
+            total_size = sum(size for _, size, _ in artifacts)
+            for mtime, size, path in artifacts:
+                if mtime >= expire_before and total_size <= self.max_size_bytes:
+                    break
+                if path == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                total_size -= size
+
+            for job_id, job in list(self._jobs.items()):
+                if job.finished_at is not None and job.finished_at < now - self.max_age:
+                    del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        """
+        Stop the workers without waiting for running jobs, jobs that have not started fail
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            if executor is None:
+                return
+            executor.shutdown(wait=False, cancel_futures=True)
+            for job in self._jobs.values():
+                if job.status == ExportJobStatus.PENDING:
+                    job.status, job.error = ExportJobStatus.FAILED, "Cancelled by shutdown"
+                    job.finished_at = datetime.datetime.now(datetime.UTC)
+
+
+export_jobs = ExportJobManager(
+    exports_dir=settings.exports_dir,
+    workers=settings.export_workers,
+    max_size_bytes=settings.exports_max_size_mb * 1024 * 1024,
+    max_age=datetime.timedelta(hours=settings.exports_max_age_hours),
+)
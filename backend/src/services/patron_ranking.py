@@ -0,0 +1,219 @@
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from src.db.models import PatronRanking
+from src.schemas import RankingOperation, RankingOperationType
+from src.services.scores import apply_ranking_delta
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+"""
+Rank keys are base-62 fractions between 0 and 1 written without `0.` and trailing zeros.
+The digits are in ASCII order, so keys compare as strings the same way as the fractions they encode
+"""
+MAX_KEY_LENGTH = 12
+"Keys grow when applications are put between close neighbours again and again, longer keys trigger a rebalance"
+
+
+def _midpoint(before: str, after: str | None) -> str:
+    if after is not None:
+        common = 0
+        while common < len(after) and (before[common] if common < len(before) else DIGITS[0]) == after[common]:
+            common += 1
+        if common > 0:
+            return after[:common] + _midpoint(before[common:], after[common:])
+    digit_before = DIGITS.index(before[0]) if before else 0
+    digit_after = DIGITS.index(after[0]) if after is not None else len(DIGITS)
+    if digit_after - digit_before > 1:
+        return DIGITS[(digit_before + digit_after + 1) // 2]
+    if after is not None and len(after) > 1:
+        return after[0]
+    return DIGITS[digit_before] + _midpoint(before[1:], None)
+
+
+def key_between(before: str | None, after: str | None) -> str:
+    """
+    Key between two keys, None meaning the start or the end of the ranking
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Rank key {before!r} is not before {after!r}")
+    return _midpoint(before or "", after)
+
+
+def keys_between(before: str | None, after: str | None, count: int) -> list[str]:
+    """
+    Keys between two keys, splitting the gap in halves so that their length grows with the logarithm of the count
+    """
+    if count == 0:
+        return []
+    middle = key_between(before, after)
+    left = (count - 1) // 2
+    return keys_between(before, middle, left) + [middle] + keys_between(middle, after, count - 1 - left)
+
+
+def evenly_spaced_keys(count: int) -> list[str]:
+    """
+    Shortest keys of equal length spread over the whole range
+    """
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    step = len(DIGITS) ** width // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value, digits = i * step, []
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip(DIGITS[0]))
+    return keys
+
+
+def load_patron_ranking(session: Session, patron_id: int) -> dict[int, str]:
+    """
+    Stored ranking of the patron in ranked order: application id -> rank key
+    """
+    return {
+        row.application_id: row.rank_key
+        for row in session.execute(
+            select(PatronRanking.application_id, PatronRanking.rank_key)
+            .where(PatronRanking.patron_id == patron_id)
+            .order_by(PatronRanking.rank_key)
+        )
+    }
+
+
+def _save_keys(session: Session, patron_id: int, old_keys: dict[int, str], new_keys: dict[int, str]) -> None:
+    """
+    Write the new ranking, both given in ranked order, and update the RRF scores.
+    Only the difference is written: one delete for removed applications, one executemany for applications with
+    a new key and one for added ones. Keys are rebalanced if any of them became too long
+    """
+    if any(len(key) > MAX_KEY_LENGTH for key in new_keys.values()):
+        new_keys = dict(zip(new_keys, evenly_spaced_keys(len(new_keys)), strict=True))
+
+    apply_ranking_delta(
+        session,
+        {application_id: rank for rank, application_id in enumerate(old_keys)},
+        {application_id: rank for rank, application_id in enumerate(new_keys)},
+    )
+
+    removed = old_keys.keys() - new_keys.keys()
+    moved = [
+        {"b_application_id": application_id, "b_rank_key": key}
+        for application_id, key in new_keys.items()
+        if application_id in old_keys and old_keys[application_id] != key
+    ]
+    added = [
+        {"patron_id": patron_id, "application_id": application_id, "rank_key": key}
+        for application_id, key in new_keys.items()
+        if application_id not in old_keys
+    ]
+
+    # plain executemany on the connection: the ORM would treat a list of parameters as an update by primary key
+    connection = session.connection()
+    if removed:
+        connection.execute(
+            delete(PatronRanking).where(PatronRanking.patron_id == patron_id, PatronRanking.application_id.in_(removed))
+        )
+    if moved:
+        connection.execute(
+            update(PatronRanking)
+            .where(
+                PatronRanking.patron_id == patron_id,
+                PatronRanking.application_id == bindparam("b_application_id"),
+            )
+            .values(rank_key=bindparam("b_rank_key"), updated_at=func.now()),
+            moved,
+        )
+    if added:
+        connection.execute(insert(PatronRanking), added)
+
+
+def save_patron_ranking(session: Session, patron_id: int, application_ids: list[int]) -> None:
+    """
+    Replace the ranking of the patron. Applications that keep their relative order, the longest increasing
+    subsequence of their old positions, keep their keys, the others get keys between them
+    """
+    old_keys = load_patron_ranking(session, patron_id)
+    old_positions = {application_id: position for position, application_id in enumerate(old_keys)}
+
+    # longest increasing subsequence of old positions in O(n log n)
+    tails: list[int] = []
+    "Index in `application_ids` of the last element of the best subsequence of each length"
+    previous: dict[int, int | None] = {}
+    for index, application_id in enumerate(application_ids):
+        position = old_positions.get(application_id)
+        if position is None:
+            continue
+        low, high = 0, len(tails)
+        while low < high:
+            middle = (low + high) // 2
+            if old_positions[application_ids[tails[middle]]] < position:
+                low = middle + 1
+            else:
+                high = middle
+        previous[index] = tails[low - 1] if low > 0 else None
+        if low == len(tails):
+            tails.append(index)
+        else:
+            tails[low] = index
+    kept = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        kept.add(index)
+        index = previous[index]
+
+    new_keys: dict[int, str] = {}
+    pending: list[int] = []
+    "Applications after the last kept one, waiting for the key of the next kept one"
+    last_key = None
+    for index, application_id in enumerate(application_ids + [None]):
+        if application_id is not None and index not in kept:
+            pending.append(application_id)
+            continue
+        next_key = old_keys[application_id] if application_id is not None else None
+        new_keys.update(zip(pending, keys_between(last_key, next_key, len(pending)), strict=True))
+        pending = []
+        if application_id is not None:
+            new_keys[application_id] = last_key = next_key
+
+    _save_keys(session, patron_id, old_keys, new_keys)
+
+
+def apply_ranking_operations(session: Session, patron_id: int, operations: list[RankingOperation]) -> list[int]:
+    """
+    Apply the operations in order and return the new ranking, application ids in ranked order.
+    A move or an insert writes one row, unless the keys have to be rebalanced.
+    Raises ValueError if an operation refers to an application missing from the ranking or inserts one twice;
+    the caller checks that inserted applications exist
+    """
+    old_keys = load_patron_ranking(session, patron_id)
+    order = list(old_keys)
+    keys = dict(old_keys)
+
+    for operation in operations:
+        application_id = operation.application_id
+        if operation.op == RankingOperationType.INSERT:
+            if application_id in keys:
+                raise ValueError(f"Application {application_id} is already ranked")
+        elif application_id not in keys:
+            raise ValueError(f"Application {application_id} is not ranked")
+        else:
+            order.remove(application_id)
+            del keys[application_id]
+        if operation.op == RankingOperationType.REMOVE:
+            continue
+
+        if operation.after is None:
+            position = 0
+        elif operation.after in keys:
+            position = order.index(operation.after) + 1
+        else:
+            raise ValueError(f"Application {operation.after} to place after is not ranked")
+        before_key = keys[order[position - 1]] if position > 0 else None
+        after_key = keys[order[position]] if position < len(order) else None
+        order.insert(position, application_id)
+        keys[application_id] = key_between(before_key, after_key)
+
+    _save_keys(session, patron_id, old_keys, {application_id: keys[application_id] for application_id in order})
+    return order
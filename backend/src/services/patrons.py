@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.db.loaders import APPLICATION_RESPONSE_COLUMNS, NO_RELATIONSHIPS, RATING_RESPONSE_COLUMNS
+from src.db.models import Application, Patron, PatronRanking, PatronRateApplication, TimeWindow
+from src.schemas import (
+    ApplicationResponse,
+    PatronRankingResponse,
+    PatronRateApplicationResponse,
+    PatronResponse,
+    PatronWithRatingsAndRankings,
+)
+from src.services.ranking import timewindow_filter
+
+
+def get_patrons_with_ratings_and_rankings(
+    session: Session, timewindow: TimeWindow | None = None, offset: int = 0, limit: int | None = None
+) -> list[PatronWithRatingsAndRankings]:
+    """
+    Patrons ordered by ID with their ratings and rankings of applications in the timewindow.
+    Ratings, rankings and ranked applications are fetched with one query each and grouped in memory
+    """
+    patrons = session.scalars(
+        select(Patron).order_by(Patron.id).offset(offset).limit(limit).options(*NO_RELATIONSHIPS)
+    ).all()
+    if not patrons:
+        return []
+    patron_ids = [patron.id for patron in patrons]
+    scope = timewindow_filter(timewindow)
+
+    ratings_by_patron = defaultdict(list)
+    for row in session.execute(
+        select(*RATING_RESPONSE_COLUMNS)
+        .join(Application, Application.id == PatronRateApplication.application_id)
+        .where(PatronRateApplication.patron_id.in_(patron_ids), scope)
+        .order_by(PatronRateApplication.patron_id, PatronRateApplication.application_id)
+    ):
+        ratings_by_patron[row.patron_id].append(PatronRateApplicationResponse.model_validate(row, from_attributes=True))
+
+    rankings = (
+        select(PatronRanking.patron_id, PatronRanking.application_id)
+        .join(Application, Application.id == PatronRanking.application_id)
+        .where(PatronRanking.patron_id.in_(patron_ids), scope)
+    )
+    applications = {
+        row.id: ApplicationResponse.model_validate(row, from_attributes=True)
+        for row in session.execute(
+            select(*APPLICATION_RESPONSE_COLUMNS).where(
+                Application.id.in_(rankings.with_only_columns(PatronRanking.application_id))
+            )
+        )
+    }
+    ranked_by_patron = defaultdict(list)
+    for row in session.execute(rankings.order_by(PatronRanking.patron_id, PatronRanking.rank_key)):
+        ranked_by_patron[row.patron_id].append(applications[row.application_id])
+
+    return [
+        PatronWithRatingsAndRankings(
+            patron=PatronResponse.model_validate(patron, from_attributes=True),
+            ratings=ratings_by_patron[patron.id],
+            ranking=PatronRankingResponse(patron_id=patron.id, applications=ranked_by_patron[patron.id]),
+        )
+        for patron in patrons
+    ]
@@ -0,0 +1,84 @@
+import datetime
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.db.models import Patron
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Authenticated patron: only what is needed to authorize a request
+    """
+
+    id: int
+    telegram_id: str
+    is_admin: bool
+
+
+class PrincipalCache:
+    """
+    Principals by patron ID, so that authentication does not query the database on every request.
+
+    Entries expire after `ttl` as a safety net, but routes changing the patron ID, Telegram ID or admin status
+    must call `invalidate()` after commit.
+    """
+
+    def __init__(self, ttl: datetime.timedelta):
+        self.ttl = ttl.total_seconds()
+        self._lock = threading.Lock()
+        self._principals: dict[int, tuple[float, Principal]] = {}
+        "Patron ID -> expiration time by `time.monotonic()` and principal"
+        self._generation = 0
+        "Incremented on invalidation, so that a load racing with a write does not store a stale principal"
+
+    def get(self, patron_id: int) -> Principal | None:
+        """
+        Cached principal, None if it is not cached or has expired
+        """
+        entry = self._principals.get(patron_id)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                if self._principals.get(patron_id) is entry:
+                    del self._principals[patron_id]
+            return None
+        return principal
+
+    def load(self, session: Session, patron_id: int) -> Principal | None:
+        """
+        Query the principal and cache it, None if there is no such patron
+        """
+        generation = self._generation
+        row = session.execute(
+            select(Patron.id, Patron.telegram_id, Patron.is_admin).where(Patron.id == patron_id)
+        ).first()
+        if row is None:
+            return None
+        principal = Principal(id=row.id, telegram_id=row.telegram_id, is_admin=row.is_admin)
+        if self.ttl > 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._principals[patron_id] = (time.monotonic() + self.ttl, principal)
+        return principal
+
+    def invalidate(self, patron_id: int | None = None) -> None:
+        """
+        Forget the principal of the patron, or all principals if no ID is given
+        """
+        with self._lock:
+            self._generation += 1
+            if patron_id is None:
+                self._principals.clear()
+            else:
+                self._principals.pop(patron_id, None)
+
+
+principal_cache = PrincipalCache(ttl=datetime.timedelta(seconds=settings.principal_cache_ttl_seconds))
@@ -0,0 +1,121 @@
+from sqlalchemy import ColumnElement, Subquery, case, func, select, true
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from src.db.loaders import APPLICATION_RESPONSE_COLUMNS
+from src.db.models import Application, PatronRanking, PatronRateApplication, TimeWindow
+from src.schemas import ApplicationRankingStats, ApplicationResponse, Rating
+
+RRF_CONST = 60
+"60 is a common constant for RRF"
+
+
+def rrf_contribution(rank: int) -> float:
+    """
+    RRF score given to an application by one patron ranking
+    """
+    return 1 / (RRF_CONST + rank + 1)
+
+
+def timewindow_filter(timewindow: TimeWindow | None) -> ColumnElement[bool]:
+    """
+    Filter applications submitted during the timewindow, or all applications if timewindow is None
+    """
+    if timewindow is None:
+        return true()
+    return Application.submitted_at.between(timewindow.start, timewindow.end)
+
+
+def dense_rankings() -> Subquery:
+    """
+    Patron rankings with the 0-based position of every application as `rank`, numbered in the order of rank keys.
+    Filter by application after joining, so that positions count the whole ranking of the patron
+    """
+    return select(
+        PatronRanking.patron_id,
+        PatronRanking.application_id,
+        (func.row_number().over(partition_by=PatronRanking.patron_id, order_by=PatronRanking.rank_key) - 1).label(
+            "rank"
+        ),
+    ).subquery()
+
+
+def scores_subquery(scope: ColumnElement[bool]) -> Subquery:
+    """
+    RRF score and votes of every application in scope, aggregated from `patron_ranking` and `patron_x_application`
+    """
+    rankings = dense_rankings()
+    rrf_subquery = (
+        select(
+            rankings.c.application_id,
+            func.sum(1.0 / (RRF_CONST + 1 + rankings.c.rank)).label("rrf_score"),
+        )
+        .join(Application, Application.id == rankings.c.application_id)
+        .where(scope)
+        .group_by(rankings.c.application_id)
+        .subquery()
+    )
+
+    def count_rate(rate: Rating):
+        return func.sum(case((PatronRateApplication.rate == rate, 1), else_=0))
+
+    votes_subquery = (
+        select(
+            PatronRateApplication.application_id,
+            count_rate(Rating.POSITIVE).label("positive_votes"),
+            count_rate(Rating.NEGATIVE).label("negative_votes"),
+            count_rate(Rating.NEUTRAL).label("neutral_votes"),
+            count_rate(Rating.UNRATED).label("unrated_votes"),
+            func.count().label("rater_count"),
+        )
+        .join(Application, Application.id == PatronRateApplication.application_id)
+        .where(scope)
+        .group_by(PatronRateApplication.application_id)
+        .subquery()
+    )
+
+    return (
+        select(
+            Application.id.label("application_id"),
+            func.coalesce(rrf_subquery.c.rrf_score, 0.0).label("rrf_score"),
+            func.coalesce(votes_subquery.c.positive_votes, 0).label("positive_votes"),
+            func.coalesce(votes_subquery.c.negative_votes, 0).label("negative_votes"),
+            func.coalesce(votes_subquery.c.neutral_votes, 0).label("neutral_votes"),
+            func.coalesce(votes_subquery.c.unrated_votes, 0).label("unrated_votes"),
+            func.coalesce(votes_subquery.c.rater_count, 0).label("rater_count"),
+        )
+        .outerjoin(rrf_subquery, rrf_subquery.c.application_id == Application.id)
+        .outerjoin(votes_subquery, votes_subquery.c.application_id == Application.id)
+        .where(scope)
+        .subquery()
+    )
+
+
+def to_ranking_stats(row: Row) -> ApplicationRankingStats:
+    """
+    Build `ApplicationRankingStats` from a row with application columns, RRF score and votes
+    """
+    return ApplicationRankingStats(
+        application=ApplicationResponse.model_validate(row, from_attributes=True),
+        score=row.rrf_score,
+        rrf_score=row.rrf_score,
+        positive_votes=row.positive_votes,
+        negative_votes=row.negative_votes,
+        neutral_votes=row.neutral_votes,
+        total_votes=row.positive_votes + row.negative_votes + row.neutral_votes,
+    )
+
+
+def compute_application_ranking_stats(
+    session: Session, timewindow: TimeWindow | None = None
+) -> list[ApplicationRankingStats]:
+    """
+    Compute RRF score and votes of every application in the timewindow from the raw tables with a single grouped query
+    """
+    scores = scores_subquery(timewindow_filter(timewindow))
+    query = (
+        select(*APPLICATION_RESPONSE_COLUMNS, scores)
+        .join(scores, scores.c.application_id == Application.id)
+        .order_by(scores.c.rrf_score.desc(), Application.id)
+    )
+    return [to_ranking_stats(row) for row in session.execute(query)]
@@ -0,0 +1,65 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from src.db.models import PatronRateApplication
+from src.schemas import RateApplicationItem, SearchDocumentKind
+from src.services.scores import apply_rating_deltas
+from src.services.search import comment_search_text, set_search_texts
+
+
+def save_patron_ratings(session: Session, patron_id: int, ratings: list[RateApplicationItem]) -> None:
+    """
+    Create or replace ratings of the patron with one `INSERT ... ON CONFLICT DO UPDATE`,
+    update the scores and the comments in the search index.
+    The applications must exist and appear at most once
+    """
+    if not ratings:
+        return
+    old_rates = dict(
+        session.execute(
+            select(PatronRateApplication.application_id, PatronRateApplication.rate).where(
+                PatronRateApplication.patron_id == patron_id,
+                PatronRateApplication.application_id.in_([rating.application_id for rating in ratings]),
+            )
+        ).all()
+    )
+    apply_rating_deltas(
+        session, {rating.application_id: (old_rates.get(rating.application_id), rating.rate) for rating in ratings}
+    )
+
+    statement = insert(PatronRateApplication)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PatronRateApplication.patron_id, PatronRateApplication.application_id],
+        set_={
+            "rate": statement.excluded.rate,
+            "comment": statement.excluded.comment,
+            "docs": statement.excluded.docs,
+            "updated_at": func.now(),
+        },
+    )
+    session.execute(
+        statement,
+        [
+            {
+                "patron_id": patron_id,
+                "application_id": rating.application_id,
+                "rate": rating.rate,
+                "comment": rating.comment,
+                "docs": rating.docs.model_dump(exclude_defaults=True),
+            }
+            for rating in ratings
+        ],
+    )
+    set_search_texts(
+        session,
+        (
+            (
+                rating.application_id,
+                patron_id,
+                SearchDocumentKind.COMMENT,
+                comment_search_text(rating.comment, rating.docs),
+            )
+            for rating in ratings
+        ),
+    )
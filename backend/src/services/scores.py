@@ -0,0 +1,208 @@
+import itertools
+from collections.abc import Collection
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from src.db.models import Application, ApplicationScore, PatronRanking, PatronRateApplication, TimeWindow
+from src.schemas import ApplicationRankingStats, Rating, ScoresRebuildReport
+from src.services.data_version import bump_data_version
+from src.services.ranking import (
+    APPLICATION_RESPONSE_COLUMNS,
+    rrf_contribution,
+    scores_subquery,
+    timewindow_filter,
+    to_ranking_stats,
+)
+
+SCORE_COLUMNS = (
+    "rrf_score",
+    "positive_votes",
+    "negative_votes",
+    "neutral_votes",
+    "unrated_votes",
+    "rater_count",
+)
+
+RATE_COLUMNS = {
+    Rating.POSITIVE: "positive_votes",
+    Rating.NEGATIVE: "negative_votes",
+    Rating.NEUTRAL: "neutral_votes",
+    Rating.UNRATED: "unrated_votes",
+}
+
+RRF_DRIFT_TOLERANCE = 1e-9
+"Stored RRF score is accumulated from float deltas, so it may differ from the recomputed one by rounding errors"
+
+
+def apply_score_deltas(session: Session, deltas: dict[int, dict[str, float]]) -> None:
+    """
+    Add deltas to the scores of applications in a single upsert statement, creating missing rows
+    """
+    deltas = {application_id: delta for application_id, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return
+    statement = insert(ApplicationScore)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ApplicationScore.application_id],
+        set_={
+            **{
+                column: getattr(ApplicationScore, column) + getattr(statement.excluded, column)
+                for column in SCORE_COLUMNS
+            },
+            "last_updated": func.now(),
+        },
+    )
+    session.execute(
+        statement,
+        [
+            {"application_id": application_id, **{column: delta.get(column, 0) for column in SCORE_COLUMNS}}
+            for application_id, delta in deltas.items()
+        ],
+    )
+    bump_data_version(session)
+
+
+def apply_rating_delta(session: Session, application_id: int, old_rate: Rating | None, new_rate: Rating | None) -> None:
+    """
+    Update votes of the application after a patron rating changed from `old_rate` to `new_rate` (None if absent)
+    """
+    apply_rating_deltas(session, {application_id: (old_rate, new_rate)})
+
+
+def apply_rating_deltas(session: Session, changes: dict[int, tuple[Rating | None, Rating | None]]) -> None:
+    """
+    Same as `apply_rating_delta` for several applications at once: application id -> (old rate, new rate)
+    """
+    deltas: dict[int, dict[str, float]] = {}
+    for application_id, (old_rate, new_rate) in changes.items():
+        if old_rate == new_rate:
+            continue
+        delta = deltas[application_id] = {}
+        if old_rate is not None:
+            delta[RATE_COLUMNS[old_rate]] = -1
+            delta["rater_count"] = -1
+        if new_rate is not None:
+            delta[RATE_COLUMNS[new_rate]] = delta.get(RATE_COLUMNS[new_rate], 0) + 1
+            delta["rater_count"] = delta.get("rater_count", 0) + 1
+    apply_score_deltas(session, deltas)
+
+
+def apply_ranking_delta(session: Session, old_ranks: dict[int, int], new_ranks: dict[int, int]) -> None:
+    """
+    Update RRF scores after a patron ranking changed from `old_ranks` to `new_ranks` (application id -> rank)
+    """
+    deltas: dict[int, dict[str, float]] = {}
+    for application_id in old_ranks.keys() | new_ranks.keys():
+        old_rank, new_rank = old_ranks.get(application_id), new_ranks.get(application_id)
+        if old_rank == new_rank:
+            continue
+        delta = 0.0
+        if old_rank is not None:
+            delta -= rrf_contribution(old_rank)
+        if new_rank is not None:
+            delta += rrf_contribution(new_rank)
+        deltas[application_id] = {"rrf_score": delta}
+    apply_score_deltas(session, deltas)
+
+
+def remove_patron_contributions(session: Session, patron_id: int) -> None:
+    """
+    Subtract ratings and ranking of the patron from the scores, e.g. before the patron is deleted
+    """
+    deltas: dict[int, dict[str, float]] = {}
+    for application_id, rate in session.execute(
+        select(PatronRateApplication.application_id, PatronRateApplication.rate).where(
+            PatronRateApplication.patron_id == patron_id
+        )
+    ):
+        deltas[application_id] = {RATE_COLUMNS[rate]: -1, "rater_count": -1}
+    ranked_ids = session.scalars(
+        select(PatronRanking.application_id)
+        .where(PatronRanking.patron_id == patron_id)
+        .order_by(PatronRanking.rank_key)
+    )
+    for rank, application_id in enumerate(ranked_ids):
+        deltas.setdefault(application_id, {})["rrf_score"] = -rrf_contribution(rank)
+    apply_score_deltas(session, deltas)
+
+
+def apply_application_removal(session: Session, application_ids: Collection[int]) -> None:
+    """
+    Update RRF scores of applications ranked below the given ones, which move up when those are deleted.
+    Must be called before the applications are deleted
+    """
+    patron_ids = select(PatronRanking.patron_id).where(PatronRanking.application_id.in_(application_ids))
+    rankings = session.execute(
+        select(PatronRanking.patron_id, PatronRanking.application_id)
+        .where(PatronRanking.patron_id.in_(patron_ids))
+        .order_by(PatronRanking.patron_id, PatronRanking.rank_key)
+    )
+    deltas: dict[int, dict[str, float]] = {}
+    for _, ranking in itertools.groupby(rankings, key=lambda row: row.patron_id):
+        rank = 0
+        for old_rank, row in enumerate(ranking):
+            if row.application_id in application_ids:
+                continue
+            if rank != old_rank:
+                delta = deltas.setdefault(row.application_id, {"rrf_score": 0.0})
+                delta["rrf_score"] += rrf_contribution(rank) - rrf_contribution(old_rank)
+            rank += 1
+    apply_score_deltas(session, deltas)
+
+
+def get_application_ranking_stats(
+    session: Session, timewindow: TimeWindow | None = None
+) -> list[ApplicationRankingStats]:
+    """
+    Read RRF score and votes of every application in the timewindow from `application_scores`
+    """
+    query = (
+        select(
+            *APPLICATION_RESPONSE_COLUMNS,
+            *(getattr(ApplicationScore, column) for column in SCORE_COLUMNS),
+        )
+        .select_from(ApplicationScore)
+        .join(Application, Application.id == ApplicationScore.application_id)
+        .where(timewindow_filter(timewindow))
+        .order_by(ApplicationScore.rrf_score.desc(), Application.id)
+    )
+    return [to_ranking_stats(row) for row in session.execute(query)]
+
+
+def rebuild_scores(session: Session) -> ScoresRebuildReport:
+    """
+    Recompute `application_scores` from the raw tables and report applications whose stored scores drifted
+    """
+    stored = {
+        row.application_id: row
+        for row in session.execute(
+            select(ApplicationScore.application_id, *(getattr(ApplicationScore, c) for c in SCORE_COLUMNS))
+        )
+    }
+    recomputed = [row._asdict() for row in session.execute(select(scores_subquery(timewindow_filter(None))))]
+
+    drifted = []
+    max_rrf_drift = 0.0
+    for row in recomputed:
+        old = stored.pop(row["application_id"], None)
+        if old is None:
+            drifted.append(row["application_id"])
+            continue
+        rrf_drift = abs(old.rrf_score - row["rrf_score"])
+        max_rrf_drift = max(max_rrf_drift, rrf_drift)
+        if rrf_drift > RRF_DRIFT_TOLERANCE or any(getattr(old, c) != row[c] for c in SCORE_COLUMNS[1:]):
+            drifted.append(row["application_id"])
+
+    session.execute(delete(ApplicationScore))
+    if recomputed:
+        session.execute(insert(ApplicationScore), recomputed)
+    bump_data_version(session)
+
+    return ScoresRebuildReport(
+        applications=len(recomputed),
+        drifted_applications=sorted(drifted),
+        orphaned_scores=len(stored),
+        max_rrf_drift=max_rrf_drift,
+    )
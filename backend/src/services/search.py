@@ -0,0 +1,195 @@
+import itertools
+import re
+from collections.abc import Iterable
+from pathlib import Path
+from typing import BinaryIO
+
+import pypdf
+from sqlalchemy import Row, bindparam, column, delete, func, insert, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+from src.db.loaders import APPLICATION_RESPONSE_COLUMNS
+from src.db.models import Application, PatronRateApplication, SearchDocument, TimeWindow
+from src.logging_ import logger
+from src.schemas import ApplicationResponse, Docs, SearchDocumentKind, SearchResult, SearchSnippet
+from src.services.ranking import timewindow_filter
+
+MAX_DOCUMENT_TEXT = 100_000
+"Characters of a document that are indexed, the rest of a long document is left out"
+MAX_SNIPPETS = 3
+"Snippets returned per application"
+SNIPPET_TOKENS = 12
+
+SearchText = tuple[int, int | None, SearchDocumentKind, str]
+"(application ID, patron ID or None, kind, text), empty text removes the document"
+
+search_index = table("search_index", column("rowid"))
+SEARCH_INDEX = literal_column("search_index")
+"The FTS5 table as the argument of its auxiliary functions and `MATCH`"
+
+
+def extract_pdf_text(source: BinaryIO) -> str:
+    """
+    Text of a PDF for the search index, empty if the file cannot be parsed.
+    Blocking, run it in a thread
+    """
+    parts, length = [], 0
+    try:
+        for page in pypdf.PdfReader(source).pages:
+            part = page.extract_text() or ""
+            parts.append(part)
+            length += len(part)
+            if length >= MAX_DOCUMENT_TEXT:
+                break
+    except Exception as e:
+        logger.warning(f"Failed to extract text from PDF: {e!r}")
+    return " ".join(" ".join(parts).split())[:MAX_DOCUMENT_TEXT]
+
+
+def comment_search_text(comment: str, docs: Docs | dict) -> str:
+    """
+    Comment of a patron on the application together with their comments on the documents
+    """
+    docs = docs if isinstance(docs, Docs) else Docs.model_validate(docs)
+    comments = [comment, *(value for key, value in docs.model_dump().items() if key.endswith("_comments"))]
+    return "\n".join(part for part in comments if part.strip())
+
+
+def set_search_texts(session: Session, texts: Iterable[SearchText]) -> None:
+    """
+    Replace indexed documents, one executemany to delete the old versions and one to insert the new ones
+    """
+    texts = list(texts)
+    if not texts:
+        return
+    # plain executemany on the connection: the ORM does not run a delete with a list of parameters
+    session.connection().execute(
+        delete(SearchDocument).where(
+            SearchDocument.application_id == bindparam("b_application_id"),
+            SearchDocument.kind == bindparam("b_kind"),
+            # `IS` of SQLite compares NULLs as equal
+            SearchDocument.patron_id.is_(bindparam("b_patron_id")),
+        ),
+        [
+            {"b_application_id": application_id, "b_patron_id": patron_id, "b_kind": kind}
+            for application_id, patron_id, kind, _ in texts
+        ],
+    )
+    inserted = [
+        {"application_id": application_id, "patron_id": patron_id, "kind": kind, "text": text}
+        for application_id, patron_id, kind, text in texts
+        if text
+    ]
+    if inserted:
+        session.execute(insert(SearchDocument), inserted)
+
+
+def build_match_query(query: str) -> str | None:
+    """
+    FTS5 query matching documents that contain all words of the user query, the last one as a prefix,
+    so that results appear while typing. None if the query has no words
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+
+
+def search_applications(
+    session: Session, patron_id: int, query: str, timewindow: TimeWindow | None, limit: int
+) -> list[SearchResult]:
+    """
+    Applications matching the query, the most relevant first by BM25 of their best matching document.
+    Comments are searched only among the ones written by the patron
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+    # snippets are the expensive part, so documents are ranked first and only the returned ones get them
+    ranked = session.execute(
+        select(SearchDocument.id, SearchDocument.application_id, SearchDocument.kind)
+        .select_from(search_index)
+        .join(SearchDocument, SearchDocument.id == search_index.c.rowid)
+        .join(Application, Application.id == SearchDocument.application_id)
+        .where(
+            SEARCH_INDEX.op("MATCH")(match),
+            or_(SearchDocument.patron_id.is_(None), SearchDocument.patron_id == patron_id),
+            timewindow_filter(timewindow),
+        )
+        .order_by(func.bm25(SEARCH_INDEX))
+    )
+    documents: dict[int, list[Row]] = {}
+    "Application ID -> matching documents, in order of relevance"
+    for row in ranked:
+        if row.application_id not in documents:
+            if len(documents) == limit:
+                break
+            documents[row.application_id] = []
+        if len(documents[row.application_id]) < MAX_SNIPPETS:
+            documents[row.application_id].append(row)
+    ranked.close()
+    if not documents:
+        return []
+
+    snippets = dict(
+        session.execute(
+            select(search_index.c.rowid, func.snippet(SEARCH_INDEX, 0, "<mark>", "</mark>", "…", SNIPPET_TOKENS)).where(
+                SEARCH_INDEX.op("MATCH")(match),
+                search_index.c.rowid.in_([row.id for rows in documents.values() for row in rows]),
+            )
+        ).all()
+    )
+    applications = {
+        row.id: row
+        for row in session.execute(select(*APPLICATION_RESPONSE_COLUMNS).where(Application.id.in_(documents)))
+    }
+    return [
+        SearchResult(
+            application=ApplicationResponse.model_validate(applications[application_id], from_attributes=True),
+            snippets=[SearchSnippet(kind=row.kind, text=snippets[row.id]) for row in rows],
+        )
+        for application_id, rows in documents.items()
+    ]
+
+
+def rebuild_search_index(session: Session, files_dir: Path) -> int:
+    """
+    Index every application from scratch, extracting the text of PDFs again. Returns the number of documents
+    """
+    session.execute(delete(SearchDocument))
+    texts: list[SearchText] = []
+    for application in session.execute(
+        select(
+            Application.id, Application.email, Application.full_name, Application.cv, Application.motivational_letter
+        )
+    ):
+        texts.append(
+            (application.id, None, SearchDocumentKind.APPLICANT, f"{application.full_name} {application.email}")
+        )
+        for kind, relative_path in (
+            (SearchDocumentKind.CV, application.cv),
+            (SearchDocumentKind.MOTIVATIONAL_LETTER, application.motivational_letter),
+        ):
+            path = files_dir / relative_path if relative_path is not None else None
+            if path is not None and path.is_file():
+                with path.open("rb") as source:
+                    texts.append((application.id, None, kind, extract_pdf_text(source)))
+    for rating in session.execute(
+        select(
+            PatronRateApplication.application_id,
+            PatronRateApplication.patron_id,
+            PatronRateApplication.comment,
+            PatronRateApplication.docs,
+        )
+    ):
+        texts.append(
+            (
+                rating.application_id,
+                rating.patron_id,
+                SearchDocumentKind.COMMENT,
+                comment_search_text(rating.comment, rating.docs),
+            )
+        )
+    for batch in itertools.batched(texts, 1000):
+        set_search_texts(session, batch)
+    return sum(1 for *_, document_text in texts if document_text)
@@ -0,0 +1,73 @@
+import bisect
+import datetime
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.db.models import TimeWindow
+
+
+class TimeWindowRegistry:
+    """
+    In-memory copy of all timewindows sorted by start, loaded on first use and reloaded after `invalidate()`.
+    Timewindows do not overlap, so the one containing a moment is found by binary search over their starts.
+
+    Returned timewindows are transient copies not bound to any session, so they never load relationships.
+    They must not be modified or added to a session.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: tuple[list[datetime.datetime], list[TimeWindow]] | None = None
+        "Starts and timewindows sorted by start"
+        self._generation = 0
+        "Incremented on invalidation, so that a load racing with a write does not store stale timewindows"
+
+    def _get_snapshot(self, session: Session) -> tuple[list[datetime.datetime], list[TimeWindow]]:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        generation = self._generation
+        # a new session starts a new transaction, which sees all writes committed before the invalidation
+        with Session(session.get_bind()) as load_session:
+            rows = load_session.execute(
+                select(TimeWindow.id, TimeWindow.title, TimeWindow.start, TimeWindow.end).order_by(TimeWindow.start)
+            ).all()
+        timewindows = [TimeWindow(id=row.id, title=row.title, start=row.start, end=row.end) for row in rows]
+        snapshot = ([timewindow.start for timewindow in timewindows], timewindows)
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        """
+        Must be called after timewindows are created, updated or deleted
+        """
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def _last_started(self, session: Session, moment: datetime.datetime) -> TimeWindow | None:
+        starts, timewindows = self._get_snapshot(session)
+        index = bisect.bisect_right(starts, moment) - 1
+        return timewindows[index] if index >= 0 else None
+
+    def current(self, session: Session, moment: datetime.datetime | None = None) -> TimeWindow | None:
+        """
+        Timewindow containing the moment, now by default
+        """
+        moment = moment or datetime.datetime.now(datetime.UTC)
+        timewindow = self._last_started(session, moment)
+        return timewindow if timewindow is not None and moment <= timewindow.end else None
+
+    def last(self, session: Session, moment: datetime.datetime | None = None) -> TimeWindow | None:
+        """
+        Timewindow with the latest start before the moment, now by default
+        """
+        return self._last_started(session, moment or datetime.datetime.now(datetime.UTC))
+
+
+timewindow_registry = TimeWindowRegistry()
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Future
+from pathlib import Path
+from typing import BinaryIO
+
+from src.logging_ import logger
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+BLOBS_DIR = Path("blobs")
+"Directory of the content-addressed blob store, relative to `settings.files_dir`"
+
+
+def blob_path(digest: str, suffix: str) -> Path:
+    """
+    Path of the blob with the given sha256 relative to `settings.files_dir`, sharded by its first bytes
+    so that no directory grows too large. The content of a path never changes, so it can be cached forever
+    """
+    return BLOBS_DIR / digest[:2] / digest[2:4] / f"{digest}{suffix}"
+
+
+def _copy_upload(
+    source: BinaryIO, staged: Path, max_size: int, on_chunk: Callable[[bytes], object] | None = None
+) -> None:
+    """
+    Copy an uploaded file in chunks to `staged`, passing every chunk to `on_chunk` if given.
+    Deletes `staged` and raises ValueError as soon as more than `max_size` bytes were read
+    """
+    size = 0
+    try:
+        with staged.open("wb") as target:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError(f"File is larger than {max_size // (1024 * 1024)} MB")
+                if on_chunk is not None:
+                    on_chunk(chunk)
+                target.write(chunk)
+    except BaseException:
+        staged.unlink(missing_ok=True)
+        raise
+
+
+def stage_upload(source: BinaryIO, destination: Path, max_size: int) -> Path:
+    """
+    Copy an uploaded file in chunks to a temporary file next to `destination` and return its path.
+    Blocking, run it in a thread. Raises ValueError as soon as more than `max_size` bytes were read
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    staged = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.tmp")
+    _copy_upload(source, staged, max_size)
+    return staged
+
+
+def stage_blob(source: BinaryIO, files_dir: Path, suffix: str, max_size: int) -> tuple[Path, Path | None]:
+    """
+    Copy an uploaded file in chunks to a temporary file in the blob store, hashing it on the way.
+    Blocking, run it in a thread. Returns the blob path relative to `files_dir` and the temporary file,
+    None if the same content is stored already. Raises ValueError if the file is larger than `max_size` bytes
+    """
+    staging_dir = files_dir / BLOBS_DIR
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    staged = staging_dir / f".{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
+    _copy_upload(source, staged, max_size, digest.update)
+    relative_path = blob_path(digest.hexdigest(), suffix)
+    destination = files_dir / relative_path
+    if destination.exists():
+        staged.unlink(missing_ok=True)
+        return relative_path, None
+    # the temporary file is renamed into the shard directory after the commit
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    return relative_path, staged
+
+
+def discard_staged_uploads(staged: dict[Path, Path]) -> None:
+    """
+    Delete temporary files of `stage_upload`: temporary path -> destination
+    """
+    for path in staged:
+        path.unlink(missing_ok=True)
+
+
+def finish_staged_uploads(staged: dict[Path, Path], future: Future) -> None:
+    """
+    Done callback of the write that saves the paths: move the files into place if it was committed,
+    delete them otherwise. Callbacks run on the writer thread, so renames of concurrent submissions do not interleave;
+    a blob uploaded twice meanwhile is replaced with the same content
+    """
+    if future.cancelled() or future.exception() is not None:
+        discard_staged_uploads(staged)
+        return
+    try:
+        for path, destination in staged.items():
+            os.replace(path, destination)
+    except OSError:
+        logger.exception(f"Failed to move uploaded files into place: {list(staged.values())}")
+        discard_staged_uploads(staged)
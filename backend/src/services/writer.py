@@ -0,0 +1,119 @@
+import asyncio
+import contextvars
+import queue
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.config import settings
+from src.db import writer_engine
+from src.logging_ import logger
+
+T = TypeVar("T")
+
+WriteUnit = Callable[[Session], Any]
+"Unit of work: does its reads and writes with the given session, must not commit it"
+
+
+class WriteQueue:
+    """
+    Run writes one transaction at a time on a dedicated thread with its own connection,
+    so that request handlers never compete for the SQLite write lock.
+
+    Units queued while a transaction is running are committed together in the next one, each in its own savepoint:
+    a unit that raises is rolled back alone and its caller gets the exception, the others are committed.
+    The session is shared by the batch, so units must return schemas or plain values, not ORM objects.
+    """
+
+    def __init__(self, engine: Engine, max_batch: int):
+        self.max_batch = max_batch
+        self._session_maker = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        self._queue: queue.SimpleQueue[tuple[WriteUnit, contextvars.Context, Future] | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.transactions = 0
+        "Number of committed transactions, for benchmarks"
+        self.units = 0
+        "Number of units in committed transactions, for benchmarks"
+
+    async def run(self, unit: Callable[[Session], T]) -> T:
+        """
+        Queue the unit and wait until its transaction is committed, return its result or raise its exception
+        """
+        return await asyncio.wrap_future(self.submit(unit))
+
+    def submit(self, unit: Callable[[Session], T]) -> "Future[T]":
+        """
+        Queue the unit, it runs in a copy of the caller's context, e.g. so that its queries count for the request
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="writer", daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put((unit, contextvars.copy_context(), future))
+        return future
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: list[tuple[WriteUnit, contextvars.Context, Future]]) -> None:
+        # callers that gave up waiting are skipped
+        batch = [(unit, context, future) for unit, context, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            with self._session_maker() as session, session.begin():
+                for unit, context, _ in batch:
+                    try:
+                        with session.begin_nested():
+                            outcomes.append((context.run(unit, session), None))
+                    except Exception as e:
+                        outcomes.append((None, e))
+        except Exception as e:
+            logger.exception(f"Write transaction of {len(batch)} units failed")
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+        self.transactions += 1
+        self.units += len(batch)
+        for (*_, future), (result, error) in zip(batch, outcomes, strict=True):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def shutdown(self) -> None:
+        """
+        Commit the units queued so far and stop the thread
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+write_queue = WriteQueue(writer_engine, max_batch=settings.writer_max_batch)